@@ -23,7 +23,7 @@ class DepartmentAdmin(admin.ModelAdmin):
             'fields': ('name', 'code', 'description', 'type')
         }),
         ('层级关系', {
-            'fields': ('parent', 'sort_order')
+            'fields': ('parent', 'sort_order', 'level', 'full_name')
         }),
         ('管理信息', {
             'fields': ('status',)
@@ -33,7 +33,7 @@ class DepartmentAdmin(admin.ModelAdmin):
         }),
     )
     
-    readonly_fields = ['level']
+    readonly_fields = ['level', 'full_name']
     
     def users_count(self, obj):
         """用户数量"""
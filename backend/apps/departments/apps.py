@@ -5,3 +5,6 @@ class DepartmentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.departments'
     verbose_name = '部门管理'
+    
+    def ready(self):
+        import apps.departments.signals
@@ -0,0 +1,146 @@
+"""
+部门层级查询基准测试
+生成一棵测试部门树，对比旧实现（逐节点查询子部门、逐级读取上级）与新实现（递归CTE单次查询、存储的部门路径）的耗时和查询次数
+"""
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.departments.models import Department
+from apps.users.models import User
+
+
+def legacy_descendants(department):
+    """旧版下级部门查询：每个节点查询一次子部门"""
+    descendants = []
+
+    def collect_children(dept):
+        for child in dept.children.filter(status=Department.DepartmentStatus.ACTIVE):
+            descendants.append(child)
+            collect_children(child)
+
+    collect_children(department)
+    return descendants
+
+
+def legacy_all_users(department):
+    """旧版部门用户查询：先逐节点展开下级部门"""
+    department_ids = [department.id] + [dept.id for dept in legacy_descendants(department)]
+    return User.objects.filter(department_id__in=department_ids, status=User.UserStatus.ACTIVE)
+
+
+def legacy_full_name(department):
+    """旧版部门路径：每级读取一次上级部门"""
+    if department.parent:
+        return f"{legacy_full_name(department.parent)} > {department.name}"
+    return department.name
+
+
+class Command(BaseCommand):
+    help = '生成测试部门树并对比部门层级查询新旧实现的耗时和查询次数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depth', type=int, default=4, help='部门树深度（不含根部门）')
+        parser.add_argument('--fanout', type=int, default=5, help='每个部门的下级部门数量')
+        parser.add_argument('--users', type=int, default=3, help='每个部门的用户数量')
+        parser.add_argument('--repeat', type=int, default=10, help='每种实现的重复执行次数')
+        parser.add_argument('--keep', action='store_true', help='保留生成的测试数据')
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8]
+        root, leaf = self._seed(suffix, options['depth'], options['fanout'], options['users'])
+
+        try:
+            cases = [
+                ('下级部门', lambda: legacy_descendants(root), lambda: root.get_descendants(), len),
+                ('部门用户', lambda: list(legacy_all_users(root)), lambda: list(root.get_all_users()), len),
+                (
+                    '部门路径',
+                    lambda: legacy_full_name(Department.objects.get(pk=leaf.pk)),
+                    lambda: Department.objects.get(pk=leaf.pk).full_name,
+                    None
+                ),
+            ]
+
+            self.stdout.write(f"部门数: {self.department_count}, 重复次数: {options['repeat']}")
+            for name, legacy, current, summarize in cases:
+                legacy_stats = self._measure(legacy, options['repeat'])
+                current_stats = self._measure(current, options['repeat'])
+
+                legacy_result, current_result = legacy_stats['result'], current_stats['result']
+                if summarize:
+                    legacy_result = sorted(obj.pk for obj in legacy_result)
+                    current_result = sorted(obj.pk for obj in current_result)
+                if legacy_result != current_result:
+                    self.stderr.write(self.style.ERROR(f'{name}: 新旧实现结果不一致'))
+
+                for label, stats in [('旧实现', legacy_stats), ('新实现', current_stats)]:
+                    self.stdout.write(
+                        f"{name} {label}: 平均 {stats['avg_ms']:.1f} ms, "
+                        f"最大 {stats['max_ms']:.1f} ms, 查询次数 {stats['queries']}"
+                    )
+        finally:
+            if not options['keep']:
+                self._cleanup(root)
+
+    def _measure(self, func, repeat):
+        """执行查询并记录耗时和查询次数"""
+        durations = []
+        queries = 0
+        result = None
+
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                result = func()
+                durations.append((time.perf_counter() - start) * 1000)
+            queries = len(ctx.captured_queries)
+
+        return {
+            'avg_ms': sum(durations) / len(durations),
+            'max_ms': max(durations),
+            'queries': queries,
+            'result': result
+        }
+
+    @transaction.atomic
+    def _seed(self, suffix, depth, fanout, users_per_department):
+        """逐层生成测试部门树和用户，返回根部门和最深层的一个部门"""
+        root = Department.objects.create(name=f'基准测试-{suffix}', code=f'BT-{suffix}')
+        departments = [root]
+        level = [root]
+
+        for _ in range(depth):
+            next_level = []
+            for parent in level:
+                for i in range(fanout):
+                    next_level.append(Department.objects.create(
+                        name=f'{parent.name}-{i}'[-100:],
+                        code=f'BT{suffix}{len(departments) + len(next_level)}',
+                        parent=parent
+                    ))
+            departments.extend(next_level)
+            level = next_level
+
+        User.objects.bulk_create([
+            User(
+                username=f'bench_dept_{suffix}_{dept.id}_{i}',
+                employee_id=f'BD{suffix}{dept.id}x{i}',
+                real_name=f'基准测试用户{i}',
+                department=dept
+            )
+            for dept in departments
+            for i in range(users_per_department)
+        ])
+
+        self.department_count = len(departments)
+        return root, level[-1]
+
+    def _cleanup(self, root):
+        """删除生成的测试数据（下级部门随根部门级联删除）"""
+        department_ids = [root.id] + root.get_descendant_ids()
+        User.objects.filter(department_id__in=department_ids).delete()
+        root.delete()
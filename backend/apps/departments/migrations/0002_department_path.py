@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:57
+
+from django.db import migrations, models
+
+
+def build_department_paths(apps, schema_editor):
+    """根据现有上级关系回填部门的层级、路径和完整名称"""
+    Department = apps.get_model('departments', 'Department')
+
+    departments = {dept.id: dept for dept in Department.objects.order_by().only('id', 'name', 'parent_id')}
+    resolved = {}
+
+    def resolve(dept):
+        if dept.id in resolved:
+            return resolved[dept.id]
+        parent = departments.get(dept.parent_id)
+        if parent is None:
+            result = (0, '/', dept.name)
+        else:
+            level, path, full_name = resolve(parent)
+            result = (level + 1, f'{path}{parent.id}/', f'{full_name} > {dept.name}')
+        resolved[dept.id] = result
+        return result
+
+    for dept in departments.values():
+        dept.level, dept.path, dept.full_name = resolve(dept)
+
+    Department.objects.bulk_update(departments.values(), ['level', 'path', 'full_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('departments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='full_name',
+            field=models.CharField(blank=True, editable=False, help_text='保存时自动维护', max_length=1000, verbose_name='完整部门路径'),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='path',
+            field=models.CharField(db_index=True, default='/', editable=False, help_text='由根到直接上级的部门ID，如 /1/5/，保存时自动维护', max_length=255, verbose_name='上级路径'),
+        ),
+        migrations.RunPython(build_department_paths, migrations.RunPython.noop),
+    ]
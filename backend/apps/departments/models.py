@@ -2,7 +2,10 @@
 部门模型
 支持层级部门结构和专业分类
 """
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import F, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Concat, Substr
 from django.core.validators import RegexValidator
 
 
@@ -42,6 +45,21 @@ class Department(models.Model):
         verbose_name='上级部门'
     )
     level = models.PositiveIntegerField(default=0, verbose_name='层级')
+    path = models.CharField(
+        max_length=255,
+        default='/',
+        editable=False,
+        db_index=True,
+        verbose_name='上级路径',
+        help_text='由根到直接上级的部门ID，如 /1/5/，保存时自动维护'
+    )
+    full_name = models.CharField(
+        max_length=1000,
+        blank=True,
+        editable=False,
+        verbose_name='完整部门路径',
+        help_text='保存时自动维护'
+    )
     
     # 部门属性
     type = models.CharField(
@@ -89,46 +107,102 @@ class Department(models.Model):
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """从数据库加载时记录层级、路径和完整名称的原始值"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_hierarchy = instance._get_hierarchy()
+        return instance
+    
+    def _get_hierarchy(self):
+        """层级、路径和完整名称的当前值（未加载的字段为None）"""
+        return (self.__dict__.get('level'), self.__dict__.get('path'), self.__dict__.get('full_name'))
+    
     def save(self, *args, **kwargs):
-        """保存时自动计算层级"""
-        if self.parent:
-            self.level = self.parent.level + 1
+        """保存时根据上级部门计算层级、路径和完整名称，发生变化时同步更新所有下级部门"""
+        if self.parent_id:
+            parent = self.parent
+            self.level = parent.level + 1
+            self.path = f'{parent.path}{parent.id}/'
+            self.full_name = f'{parent.full_name} > {self.name}'
         else:
             self.level = 0
-        super().save(*args, **kwargs)
+            self.path = '/'
+            self.full_name = self.name
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'level', 'path', 'full_name'}
+        
+        loaded = getattr(self, '_loaded_hierarchy', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if loaded and None not in loaded and loaded != self._get_hierarchy():
+                self._update_descendants(*loaded)
+        
+        self._loaded_hierarchy = self._get_hierarchy()
     
-    @property
-    def full_name(self):
-        """获取完整部门路径"""
-        if self.parent:
-            return f"{self.parent.full_name} > {self.name}"
-        return self.name
+    def _update_descendants(self, old_level, old_path, old_full_name):
+        """一条UPDATE替换所有下级部门的路径前缀和完整名称前缀，并调整层级"""
+        old_prefix = f'{old_path}{self.id}/'
+        Department.objects.filter(path__startswith=old_prefix).update(
+            path=Concat(Value(f'{self.path}{self.id}/'), Substr('path', len(old_prefix) + 1)),
+            full_name=Concat(Value(self.full_name), Substr('full_name', len(old_full_name) + 1)),
+            level=F('level') + (self.level - old_level),
+        )
+    
+    def get_ancestor_ids(self):
+        """获取所有上级部门ID（由根到直接上级），直接解析存储的路径"""
+        return [int(dept_id) for dept_id in self.path.split('/') if dept_id]
+    
+    @classmethod
+    def _descendants_sql(cls):
+        """下级部门递归查询：从起始部门逐层连接启用状态的子部门，depth为相对层级"""
+        table = cls._meta.db_table
+        return (
+            f'WITH RECURSIVE dept_tree (id, depth) AS ('
+            f' SELECT id, 0 FROM {table} WHERE id = %s'
+            f' UNION ALL'
+            f' SELECT d.id, t.depth + 1 FROM {table} d'
+            f' INNER JOIN dept_tree t ON d.parent_id = t.id'
+            f' WHERE d.status = %s'
+            f')'
+        )
     
     def get_ancestors(self):
-        """获取所有上级部门"""
-        ancestors = []
-        current = self.parent
-        while current:
-            ancestors.append(current)
-            current = current.parent
-        return ancestors
+        """获取所有上级部门（由近到远），按存储的路径一次查询"""
+        ancestor_ids = self.get_ancestor_ids()
+        if not ancestor_ids:
+            return []
+        
+        ancestors = Department.objects.in_bulk(ancestor_ids)
+        return [ancestors[dept_id] for dept_id in reversed(ancestor_ids) if dept_id in ancestors]
+    
+    def get_descendant_ids(self):
+        """获取所有启用状态的下级部门ID（不含本部门），一次递归查询"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{self._descendants_sql()} SELECT id FROM dept_tree WHERE depth > 0',
+                [self.id, self.DepartmentStatus.ACTIVE]
+            )
+            return [row[0] for row in cursor.fetchall()]
     
     def get_descendants(self):
-        """获取所有下级部门"""
-        descendants = []
-        
-        def collect_children(dept):
-            for child in dept.children.filter(status=self.DepartmentStatus.ACTIVE):
-                descendants.append(child)
-                collect_children(child)
-        
-        collect_children(self)
-        return descendants
+        """获取所有启用状态的下级部门（按层级排序），一次递归查询"""
+        return list(Department.objects.raw(
+            f'{self._descendants_sql()} SELECT d.* FROM {self._meta.db_table} d'
+            f' INNER JOIN dept_tree t ON d.id = t.id WHERE t.depth > 0'
+            f' ORDER BY t.depth, d.sort_order, d.name',
+            [self.id, self.DepartmentStatus.ACTIVE]
+        ))
     
     def get_all_users(self):
-        """获取部门及其下级部门的所有用户"""
+        """获取部门及其下级部门的所有用户，下级部门以递归子查询展开"""
         from apps.users.models import User
-        department_ids = [self.id] + [dept.id for dept in self.get_descendants()]
+        department_ids = RawSQL(
+            f'{self._descendants_sql()} SELECT id FROM dept_tree',
+            [self.id, self.DepartmentStatus.ACTIVE]
+        )
         return User.objects.filter(department_id__in=department_ids, status=User.UserStatus.ACTIVE)
 
 
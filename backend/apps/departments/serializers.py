@@ -22,11 +22,15 @@ class DepartmentSerializer(serializers.ModelSerializer):
         read_only_fields = ['level', 'full_name', 'created_at', 'updated_at']
     
     def get_children_count(self, obj):
-        """获取子部门数量"""
+        """获取子部门数量（优先使用查询集附带的统计值）"""
+        if hasattr(obj, 'active_children_count'):
+            return obj.active_children_count
         return obj.children.filter(status=Department.DepartmentStatus.ACTIVE).count()
     
     def get_users_count(self, obj):
-        """获取部门用户数量"""
+        """获取部门用户数量（优先使用查询集附带的统计值）"""
+        if hasattr(obj, 'active_users_count'):
+            return obj.active_users_count
         return obj.users.filter(status='active').count()
     
     def validate(self, attrs):
@@ -35,35 +39,14 @@ class DepartmentSerializer(serializers.ModelSerializer):
         
         # 检查父部门循环引用
         if parent and self.instance:
-            current = parent
-            while current:
-                if current == self.instance:
-                    raise serializers.ValidationError('不能将自己设置为父部门')
-                current = current.parent
+            if parent.pk == self.instance.pk:
+                raise serializers.ValidationError('不能将自己设置为父部门')
+            if self.instance.pk in parent.get_ancestor_ids():
+                raise serializers.ValidationError('不能将下级部门设置为父部门')
         
         return attrs
 
 
-class DepartmentTreeSerializer(serializers.ModelSerializer):
-    """部门树形序列化器"""
-    children = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Department
-        fields = [
-            'id', 'name', 'code', 'type', 'status',
-            'sort_order', 'children'
-        ]
-    
-    def get_children(self, obj):
-        """获取子部门"""
-        children = obj.children.filter(
-            status=Department.DepartmentStatus.ACTIVE
-        ).order_by('sort_order', 'name')
-        
-        return DepartmentTreeSerializer(children, many=True).data
-
-
 class DepartmentSimpleSerializer(serializers.ModelSerializer):
     """部门简单序列化器"""
     
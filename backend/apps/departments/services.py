@@ -0,0 +1,118 @@
+"""
+部门服务
+部门树由一次查询在内存中组装，序列化结果按版本号缓存
+"""
+import logging
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Department
+
+logger = logging.getLogger(__name__)
+
+
+class DepartmentTreeService:
+    """
+    部门树服务
+    组织架构很少变化，部门、专业、用户变更时递增缓存版本号使旧的部门树失效
+    """
+    VERSION_CACHE_KEY = 'departments:tree:version'
+    TREE_CACHE_KEY = 'departments:tree:v{version}'
+    TREE_CACHE_TIMEOUT = 24 * 3600
+
+    @staticmethod
+    def build_tree():
+        """
+        构建启用部门的树形结构
+
+        一次查询取出全部启用部门，一次分组统计各部门启用用户数，在内存中按上级部门组装；
+        上级部门停用时其下级分支不显示
+        """
+        from apps.users.models import User
+
+        departments = Department.objects.filter(
+            status=Department.DepartmentStatus.ACTIVE
+        ).order_by('sort_order', 'name').values(
+            'id', 'name', 'code', 'type', 'status', 'sort_order', 'parent_id'
+        )
+        users_counts = dict(
+            User.objects.filter(
+                status=User.UserStatus.ACTIVE,
+                department__isnull=False
+            ).order_by().values('department_id').annotate(
+                count=Count('id')
+            ).values_list('department_id', 'count')
+        )
+
+        nodes = {}
+        parents = []
+        for dept in departments:
+            nodes[dept['id']] = {
+                'id': dept['id'],
+                'name': dept['name'],
+                'code': dept['code'],
+                'type': dept['type'],
+                'status': dept['status'],
+                'sort_order': dept['sort_order'],
+                'users_count': users_counts.get(dept['id'], 0),
+                'children': [],
+            }
+            parents.append((dept['id'], dept['parent_id']))
+
+        roots = []
+        for dept_id, parent_id in parents:
+            if parent_id is None:
+                roots.append(nodes[dept_id])
+            elif parent_id in nodes:
+                nodes[parent_id]['children'].append(nodes[dept_id])
+
+        for node in nodes.values():
+            node['children_count'] = len(node['children'])
+        return roots
+
+    @staticmethod
+    def get_tree():
+        """获取部门树，优先读取缓存"""
+        try:
+            version = DepartmentTreeService._get_version()
+            key = DepartmentTreeService.TREE_CACHE_KEY.format(version=version)
+            tree = cache.get(key)
+        except Exception as e:
+            logger.warning(f"读取部门树缓存失败: {e}")
+            return DepartmentTreeService.build_tree()
+
+        if tree is None:
+            tree = DepartmentTreeService.build_tree()
+            try:
+                cache.set(key, tree, DepartmentTreeService.TREE_CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"写入部门树缓存失败: {e}")
+        return tree
+
+    @staticmethod
+    def _get_version():
+        """获取当前缓存版本号，不存在时以当前时间初始化，避免与被淘汰前的版本号重复"""
+        version = cache.get(DepartmentTreeService.VERSION_CACHE_KEY)
+        if version is None:
+            cache.add(DepartmentTreeService.VERSION_CACHE_KEY, int(time.time() * 1000), timeout=None)
+            version = cache.get(DepartmentTreeService.VERSION_CACHE_KEY)
+        return version
+
+    @staticmethod
+    def invalidate():
+        """当前事务提交后递增缓存版本号"""
+        transaction.on_commit(DepartmentTreeService._bump_version)
+
+    @staticmethod
+    def _bump_version():
+        """递增缓存版本号"""
+        try:
+            cache.incr(DepartmentTreeService.VERSION_CACHE_KEY)
+        except ValueError:
+            # 版本号已被淘汰，下次读取时重新初始化
+            pass
+        except Exception as e:
+            logger.warning(f"更新部门树缓存版本失败: {e}")
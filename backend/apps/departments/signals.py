@@ -0,0 +1,38 @@
+"""
+部门相关信号处理器
+"""
+import logging
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from apps.users.models import User
+from .models import Department, Profession
+from .services import DepartmentTreeService
+
+logger = logging.getLogger(__name__)
+
+# 影响部门树的用户字段
+USER_TREE_FIELDS = {'department', 'department_id', 'status'}
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Profession)
+@receiver(post_delete, sender=Profession)
+def invalidate_tree_on_change(sender, **kwargs):
+    """
+    部门或专业变更后使部门树缓存失效
+    """
+    DepartmentTreeService.invalidate()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_tree_on_user_change(sender, **kwargs):
+    """
+    用户变更后使部门树缓存失效（只更新登录时间等无关字段时跳过）
+    """
+    update_fields = kwargs.get('update_fields')
+    if update_fields and not USER_TREE_FIELDS.intersection(update_fields):
+        return
+    DepartmentTreeService.invalidate()
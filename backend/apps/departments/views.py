@@ -1,7 +1,8 @@
 """
 部门相关视图
 """
-from django.db.models import Count, Q
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -11,10 +12,11 @@ from rest_framework.filters import SearchFilter, OrderingFilter
 
 from .models import Department, Profession, DepartmentCollaboration
 from .serializers import (
-    DepartmentSerializer, DepartmentTreeSerializer, DepartmentSimpleSerializer,
+    DepartmentSerializer, DepartmentSimpleSerializer,
     ProfessionSerializer, ProfessionSimpleSerializer,
     DepartmentCollaborationSerializer, DepartmentStatsSerializer
 )
+from .services import DepartmentTreeService
 from apps.users.permissions import IsAdminUser, IsDepartmentManager
 
 
@@ -40,31 +42,48 @@ class DepartmentViewSet(ModelViewSet):
     
     def get_serializer_class(self):
         """根据操作类型选择序列化器"""
-        if self.action == 'tree':
-            return DepartmentTreeSerializer
-        elif self.action in ['list'] and hasattr(self.request, 'query_params') and self.request.query_params.get('simple'):
+        if self.action in ['list'] and hasattr(self.request, 'query_params') and self.request.query_params.get('simple'):
             return DepartmentSimpleSerializer
         return DepartmentSerializer
     
+    def get_queryset(self):
+        """列表和详情预加载上级部门并附带子部门数、用户数"""
+        queryset = Department.objects.all()
+        if self.action in ['list', 'retrieve']:
+            queryset = self.annotate_counts(queryset.select_related('parent'))
+        return queryset
+    
+    @staticmethod
+    def annotate_counts(queryset):
+        """以相关子查询附加启用的子部门数和用户数，避免逐条COUNT"""
+        from apps.users.models import User
+        
+        children = Department.objects.filter(
+            parent=OuterRef('pk'),
+            status=Department.DepartmentStatus.ACTIVE
+        ).order_by().values('parent').annotate(c=Count('id')).values('c')
+        users = User.objects.filter(
+            department=OuterRef('pk'),
+            status=User.UserStatus.ACTIVE
+        ).order_by().values('department').annotate(c=Count('id')).values('c')
+        
+        return queryset.annotate(
+            active_children_count=Coalesce(Subquery(children), 0),
+            active_users_count=Coalesce(Subquery(users), 0),
+        )
+    
     @action(detail=False, methods=['get'])
     def tree(self, request):
-        """获取部门树形结构"""
-        # 只获取根部门
-        root_departments = Department.objects.filter(
-            parent=None,
-            status=Department.DepartmentStatus.ACTIVE
-        ).order_by('sort_order', 'name')
-        
-        serializer = self.get_serializer(root_departments, many=True)
-        return Response(serializer.data)
+        """获取部门树形结构（一次查询组装，结果缓存至组织架构变更）"""
+        return Response(DepartmentTreeService.get_tree())
     
     @action(detail=True, methods=['get'])
     def children(self, request, pk=None):
         """获取部门的直接子部门"""
         department = self.get_object()
-        children = department.children.filter(
+        children = self.annotate_counts(department.children.filter(
             status=Department.DepartmentStatus.ACTIVE
-        ).order_by('sort_order', 'name')
+        ).select_related('parent').order_by('sort_order', 'name'))
         
         serializer = DepartmentSerializer(children, many=True)
         return Response(serializer.data)
@@ -88,13 +107,19 @@ class DepartmentViewSet(ModelViewSet):
         total_users = department.users.count()
         active_users = department.users.filter(status='active').count()
         
-        # 统计任务数量
-        from apps.tasks.models import Task
-        tasks = Task.objects.filter(creator_department=department)
-        total_tasks = tasks.count()
-        pending_tasks = tasks.filter(status__in=['pending', 'accepted', 'in_progress']).count()
-        completed_tasks = tasks.filter(status='completed').count()
-        overdue_tasks = tasks.filter(status='overdue').count()
+        # 统计任务数量（读取预汇总的部门计数器）
+        from apps.tasks.models import TaskStatsCounter
+        from apps.tasks.services import TaskStatisticsService
+        status_counts = {}
+        counts = TaskStatisticsService.get_counter_counts(
+            TaskStatsCounter.ScopeType.DEPARTMENT, department.id
+        )
+        for (task_status, priority), count in counts.items():
+            status_counts[task_status] = status_counts.get(task_status, 0) + count
+        total_tasks = sum(status_counts.values())
+        pending_tasks = sum(status_counts.get(s, 0) for s in ['pending', 'accepted', 'in_progress'])
+        completed_tasks = status_counts.get('completed', 0)
+        overdue_tasks = status_counts.get('overdue', 0)
         
         stats_data = {
             'department_id': department.id,
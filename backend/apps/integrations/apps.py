@@ -5,3 +5,6 @@ class IntegrationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.integrations'
     verbose_name = '第三方集成'
+    
+    def ready(self):
+        import apps.integrations.signals
@@ -0,0 +1,135 @@
+"""
+石化通Webhook客户端基准测试
+启动本地桩Webhook服务器，对比旧实现（每条消息requests.post新建连接）与新实现（集成配置的长连接会话）
+的每秒消息数和服务器接受的TCP连接数。请求均经过完整的加密和签名。
+"""
+import base64
+import json
+import os
+import ssl
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from apps.integrations.models import ShihuatongIntegration
+from apps.integrations.services import ShihuatongService
+
+
+class StubWebhookHandler(BaseHTTPRequestHandler):
+    """桩Webhook：读取请求体后返回发送成功，支持HTTP/1.1长连接"""
+    protocol_version = 'HTTP/1.1'
+    # 响应头和响应体分两次写出，长连接上需要关闭Nagle算法，否则与延迟确认叠加产生约40ms等待
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        body = json.dumps({'status': '0'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = '启动本地桩Webhook服务器，对比石化通消息发送新旧HTTP客户端的吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500, help='每种实现发送的消息数量')
+        parser.add_argument('--threads', type=int, default=1, help='并发发送的线程数（模拟Celery并发）')
+        parser.add_argument('--latency', type=float, default=0, help='桩服务器每个请求的处理延迟（毫秒）')
+        parser.add_argument('--certfile', help='桩服务器使用HTTPS时的证书文件')
+        parser.add_argument('--keyfile', help='桩服务器使用HTTPS时的私钥文件')
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubWebhookHandler)
+        server.daemon_threads = True
+        server.lock = threading.Lock()
+        server.connections = 0
+        server.latency = options['latency'] / 1000
+
+        scheme, verify = 'http', True
+        if options['certfile']:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(options['certfile'], options['keyfile'])
+            server.socket = context.wrap_socket(server.socket, server_side=True)
+            scheme, verify = 'https', options['certfile']
+
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        integration = ShihuatongIntegration.objects.create(
+            name=f'基准测试-{uuid.uuid4().hex[:8]}',
+            webhook_url=f'{scheme}://127.0.0.1:{server.server_address[1]}/webhook',
+            app_code='benchmark',
+            app_key='benchmark',
+            app_secret='benchmark',
+            aes_key=base64.b64encode(os.urandom(16)).decode(),
+            aes_iv=base64.b64encode(os.urandom(16)).decode(),
+        )
+
+        try:
+            service = ShihuatongService(integration.id)
+            url = integration.webhook_url
+
+            def legacy_send(i):
+                _, body, headers = service._build_request('benchmark', f'基准测试消息{i}', '内容')
+                return requests.post(url, data=body, headers=headers, timeout=30, verify=verify)
+
+            def pooled_send(i):
+                _, body, headers = service._build_request('benchmark', f'基准测试消息{i}', '内容')
+                return service.session.post(url, data=body, headers=headers, timeout=service.timeout, verify=verify)
+
+            self.stdout.write(
+                f"消息数: {options['messages']}, 线程数: {options['threads']}, "
+                f"桩服务器: {scheme}, 延迟 {options['latency']:.0f} ms"
+            )
+            for name, send in [('旧实现', legacy_send), ('新实现', pooled_send)]:
+                with server.lock:
+                    server.connections = 0
+                stats = self._measure(send, options['messages'], options['threads'])
+                self.stdout.write(
+                    f"{name}: {stats['rate']:.0f} 条/秒, 平均 {stats['avg_ms']:.2f} ms, "
+                    f"失败 {stats['failed']}, TCP连接 {server.connections}"
+                )
+        finally:
+            server.shutdown()
+            integration.delete()
+
+    def _measure(self, send, messages, threads):
+        """发送消息并统计吞吐量"""
+        durations = []
+
+        def timed_send(i):
+            start = time.perf_counter()
+            try:
+                ok = send(i).json().get('status') == '0'
+            except Exception:
+                ok = False
+            durations.append((time.perf_counter() - start) * 1000)
+            return ok
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(timed_send, range(messages)))
+        elapsed = time.perf_counter() - start
+
+        return {
+            'rate': messages / elapsed,
+            'avg_ms': sum(durations) / len(durations),
+            'failed': results.count(False),
+        }
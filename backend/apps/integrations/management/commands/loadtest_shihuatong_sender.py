@@ -0,0 +1,190 @@
+"""
+石化通异步发送器压力测试
+启动本地aiohttp桩Webhook服务器，写入排队消息后分别以阻塞方式（模拟Celery工作槽位，每个槽位一次一个调用）
+和异步发送器发送，统计每秒消息数、桩服务器观察到的最大并发调用数和每个集成配置每秒的最大调用数。
+测试会发送数据库中全部排队消息，只应在测试环境运行。
+"""
+import asyncio
+import base64
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.integrations.models import ShihuatongIntegration, ShihuatongMessage
+from apps.integrations.sender import ShihuatongAsyncSender
+from apps.integrations.services import ShihuatongBatchService, get_shihuatong_service
+
+
+class StubWebhookServer:
+    """本地aiohttp桩Webhook：固定延迟后返回发送成功，按请求路径记录调用时间并统计最大并发数"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.port = None
+        self.loop = None
+        self._started = threading.Event()
+        self.reset()
+
+    def reset(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = defaultdict(list)
+
+    def start(self):
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._started.wait()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def _serve(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_post('/webhook/{integration}', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        self.loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, '127.0.0.1', 0, backlog=1024)
+        self.loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._started.set()
+        self.loop.run_forever()
+
+    async def _handle(self, request):
+        await request.read()
+        self.calls[request.match_info['integration']].append(time.monotonic())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        return web.json_response({'status': '0'})
+
+    def max_rate(self):
+        """每个集成配置在任意1秒内的最大调用数"""
+        rates = {}
+        for integration, times in self.calls.items():
+            times = sorted(times)
+            start, best = 0, 0
+            for end, t in enumerate(times):
+                while t - times[start] >= 1:
+                    start += 1
+                best = max(best, end - start + 1)
+            rates[integration] = best
+        return rates
+
+
+class Command(BaseCommand):
+    help = '启动本地aiohttp桩Webhook服务器，对比阻塞发送与石化通异步发送器的吞吐量'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help='异步发送器发送的消息数量')
+        parser.add_argument('--baseline-messages', type=int, default=200, help='阻塞发送的消息数量，0表示跳过')
+        parser.add_argument('--threads', type=int, default=8, help='阻塞发送的线程数（模拟Celery工作槽位）')
+        parser.add_argument('--integrations', type=int, default=2, help='集成配置数量，消息轮流分配')
+        parser.add_argument('--latency', type=float, default=200, help='桩服务器每个请求的处理延迟（毫秒）')
+        parser.add_argument('--concurrency', type=int, default=200, help='异步发送器的最大在途调用数')
+        parser.add_argument('--rate', type=float, default=0, help='每个集成配置每秒最多的调用数，0表示不限速')
+
+    def handle(self, *args, **options):
+        if ShihuatongMessage.objects.filter(status=ShihuatongMessage.MessageStatus.QUEUED).exists():
+            raise CommandError('数据库中存在排队中的石化通消息，请在测试环境运行')
+
+        server = StubWebhookServer(options['latency'] / 1000)
+        server.start()
+
+        suffix = uuid.uuid4().hex[:8]
+        integrations = [
+            ShihuatongIntegration.objects.create(
+                name=f'压力测试-{suffix}-{i}',
+                webhook_url=f'http://127.0.0.1:{server.port}/webhook/{i}',
+                app_code='loadtest',
+                app_key='loadtest',
+                app_secret='loadtest',
+                aes_key=base64.b64encode(os.urandom(16)).decode(),
+                aes_iv=base64.b64encode(os.urandom(16)).decode(),
+            )
+            for i in range(options['integrations'])
+        ]
+
+        try:
+            self.stdout.write(
+                f"桩服务器延迟 {options['latency']:.0f} ms, 集成配置 {len(integrations)} 个"
+            )
+            if options['baseline_messages']:
+                self._queue_messages(integrations, options['baseline_messages'])
+                server.reset()
+                elapsed, stats = self._run_blocking(options['threads'])
+                self._report(f"阻塞发送（{options['threads']} 线程）", elapsed, stats, server)
+
+            self._queue_messages(integrations, options['messages'])
+            server.reset()
+            sender = ShihuatongAsyncSender(
+                concurrency=options['concurrency'],
+                rate=options['rate'] or None,
+                batch_size=max(options['concurrency'], 200),
+                window=0
+            )
+            start = time.perf_counter()
+            stats = asyncio.run(sender.run(once=True))
+            elapsed = time.perf_counter() - start
+            self._report(
+                f"异步发送器（在途上限 {options['concurrency']}, "
+                f"限速 {options['rate'] or '不限'} 次/秒）", elapsed, stats, server
+            )
+        finally:
+            server.stop()
+            ShihuatongIntegration.objects.filter(id__in=[integration.id for integration in integrations]).delete()
+
+    def _queue_messages(self, integrations, count):
+        """写入排队消息，标题各不相同，每条消息单独调用一次Webhook"""
+        ShihuatongMessage.objects.bulk_create([
+            ShihuatongMessage(
+                integration=integrations[i % len(integrations)],
+                title=f'压力测试消息{i}',
+                content='内容',
+                hook_token='loadtest',
+                recipient_user_ids=[f'user{i}'],
+                status=ShihuatongMessage.MessageStatus.QUEUED
+            )
+            for i in range(count)
+        ], batch_size=500)
+
+    def _run_blocking(self, threads):
+        """每个线程一次发送一个批次，等待响应后再发送下一个"""
+        batches = ShihuatongBatchService.group(ShihuatongBatchService.claim())
+        stats = {'messages': sum(len(batch['messages']) for batch in batches), 'success': 0, 'failed': 0}
+        lock = threading.Lock()
+
+        def send(batch):
+            result = get_shihuatong_service(batch['integration_id'])._deliver(
+                batch['hook_token'], batch['title'], batch['content'], batch['message_type'],
+                batch['mention_all'], batch['recipients'], message_count=len(batch['messages'])
+            )
+            ShihuatongBatchService.complete(batch, result)
+            with lock:
+                key = 'success' if result['status'] == ShihuatongMessage.MessageStatus.SUCCESS else 'failed'
+                stats[key] += len(batch['messages'])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(send, batches))
+        return time.perf_counter() - start, stats
+
+    def _report(self, name, elapsed, stats, server):
+        rates = server.max_rate()
+        self.stdout.write(
+            f"{name}: {stats['messages']} 条, {stats['messages'] / elapsed:.0f} 条/秒, "
+            f"成功 {stats['success']}, 失败 {stats['failed']}, "
+            f"最大并发 {server.max_in_flight}, "
+            f"每个集成配置最大 {max(rates.values(), default=0)} 次/秒"
+        )
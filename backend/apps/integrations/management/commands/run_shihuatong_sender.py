@@ -0,0 +1,48 @@
+"""
+石化通异步发送器
+以asyncio并发发送排队中的石化通消息，收到SIGTERM/SIGINT后发送完已认领的消息再退出。
+使用该命令发送时应设置 SHT_ASYNC_SENDER=True，排队后不再安排Celery发送任务。
+"""
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.integrations.sender import ShihuatongAsyncSender
+
+
+class Command(BaseCommand):
+    help = '以asyncio并发发送排队中的石化通消息'
+
+    def add_arguments(self, parser):
+        config = settings.SHIHUATONG_CONFIG
+        parser.add_argument(
+            '--concurrency', type=int, default=config.get('SENDER_CONCURRENCY', 50),
+            help='最大在途Webhook调用数'
+        )
+        parser.add_argument(
+            '--rate', type=float, default=config.get('SENDER_RATE_LIMIT', 20),
+            help='每个集成配置每秒最多的Webhook调用数，0表示不限速'
+        )
+        parser.add_argument('--batch-size', type=int, default=200, help='每次认领的最大消息数')
+        parser.add_argument('--poll-interval', type=float, default=1, help='没有排队消息时的轮询间隔（秒）')
+        parser.add_argument('--window', type=float, help='只发送排队超过该秒数的消息，默认取合并窗口')
+        parser.add_argument('--once', action='store_true', help='排队消息全部发送完后退出')
+
+    def handle(self, *args, **options):
+        sender = ShihuatongAsyncSender(
+            concurrency=options['concurrency'],
+            rate=options['rate'] or None,
+            batch_size=options['batch_size'],
+            poll_interval=options['poll_interval'],
+            window=options['window']
+        )
+        self.stdout.write(
+            f"石化通异步发送器启动: 在途上限 {options['concurrency']}, "
+            f"每个集成配置 {options['rate'] or '不限'} 次/秒"
+        )
+        stats = asyncio.run(sender.run(once=options['once']))
+        self.stdout.write(
+            f"已发送消息 {stats['messages']} 条，Webhook调用 {stats['webhook_calls']} 次，"
+            f"成功 {stats['success']} 条，失败 {stats['failed']} 条"
+        )
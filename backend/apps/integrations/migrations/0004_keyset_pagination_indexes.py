@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='integrationlog',
+            index=models.Index(fields=['created_at'], name='integration_created_b8d84c_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shihuatongmessage',
+            name='batch_id',
+            field=models.UUIDField(blank=True, db_index=True, null=True, verbose_name='发送批次'),
+        ),
+        migrations.AlterField(
+            model_name='shihuatongmessage',
+            name='status',
+            field=models.CharField(choices=[('pending', '待发送'), ('queued', '排队中'), ('sending', '发送中'), ('success', '发送成功'), ('failed', '发送失败'), ('retry', '重试中')], default='pending', max_length=20, verbose_name='发送状态'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0005_shihuatong_message_batch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shihuatongmessage',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='认领时间'),
+        ),
+    ]
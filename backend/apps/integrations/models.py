@@ -2,6 +2,8 @@
 第三方集成模型
 主要用于石化通系统集成
 """
+from functools import cached_property
+
 from django.db import models
 import uuid
 
@@ -50,15 +52,34 @@ class ShihuatongIntegration(models.Model):
         verbose_name = '石化通集成'
         verbose_name_plural = '石化通集成'
     
+    # 发送统计字段，由计数器以F表达式单独更新
+    STATS_FIELDS = ('total_messages_sent', 'success_messages_sent', 'failed_messages_sent', 'last_used_at')
+    
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        """编辑配置时不写回发送统计字段，避免覆盖并发写入的计数"""
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.STATS_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
+    @cached_property
+    def message_stats(self):
+        """发送统计：数据库累计值合并计数器中尚未写回的增量"""
+        from .services import IntegrationStatsCounter
+        return IntegrationStatsCounter.get_stats(self)
+    
     @property
     def success_rate(self):
         """成功率"""
-        if self.total_messages_sent == 0:
+        stats = self.message_stats
+        if stats['total_messages_sent'] == 0:
             return 0
-        return round((self.success_messages_sent / self.total_messages_sent) * 100, 2)
+        return round((stats['success_messages_sent'] / stats['total_messages_sent']) * 100, 2)
 
 
 class ShihuatongMessage(models.Model):
@@ -72,6 +93,7 @@ class ShihuatongMessage(models.Model):
     
     class MessageStatus(models.TextChoices):
         PENDING = 'pending', '待发送'
+        QUEUED = 'queued', '排队中'
         SENDING = 'sending', '发送中'
         SUCCESS = 'success', '发送成功'
         FAILED = 'failed', '发送失败'
@@ -143,6 +165,12 @@ class ShihuatongMessage(models.Model):
     retry_count = models.PositiveIntegerField(default=0, verbose_name='重试次数')
     max_retries = models.PositiveIntegerField(default=3, verbose_name='最大重试次数')
     
+    # 合并发送批次，同一批次的消息由一次Webhook调用送达
+    batch_id = models.UUIDField(null=True, blank=True, db_index=True, verbose_name='发送批次')
+    
+    # 合并发送认领时间，认领后长时间未完成的消息由定时任务重新排队
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name='认领时间')
+    
     # 时间戳
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     sent_at = models.DateTimeField(null=True, blank=True, verbose_name='发送时间')
@@ -286,6 +314,7 @@ class IntegrationLog(models.Model):
         verbose_name_plural = '集成日志'
         ordering = ['-created_at']
         indexes = [
+            models.Index(fields=['created_at']),
             models.Index(fields=['level', 'created_at']),
             models.Index(fields=['operation_type', 'created_at']),
         ]
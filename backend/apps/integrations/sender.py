@@ -0,0 +1,232 @@
+"""
+石化通异步发送器
+以asyncio并发发送排队中的石化通消息，一个进程即可保持大量在途的Webhook调用，
+不再由每个Celery工作槽位阻塞等待一次调用。
+消息认领、分组和结果回写复用ShihuatongBatchService，加密和签名在事件循环内直接完成，
+数据库操作在单独的线程中执行。以管理命令运行：
+    python manage.py run_shihuatong_sender --concurrency 100 --rate 20
+"""
+import asyncio
+import datetime
+import logging
+import signal
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import ShihuatongMessage
+from .services import ShihuatongBatchService, ShihuatongService, get_shihuatong_service
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """
+    限速器
+    限制一个集成配置每秒的Webhook调用数，调用按1/rate秒的间隔均匀放行，不允许突发
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = 1
+        self.updated = None
+
+    async def acquire(self):
+        """等待获取一个令牌"""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self.updated is not None:
+                self.tokens = min(1, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ShihuatongAsyncSender:
+    """
+    石化通异步发送器
+    认领排队消息后按批次并发发送：在途调用数不超过concurrency，每个集成配置每秒的调用数不超过rate
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 50,
+        rate: Optional[float] = 20,
+        batch_size: int = 200,
+        poll_interval: float = 1,
+        window: Optional[float] = None
+    ):
+        """
+        Args:
+            concurrency: 最大在途Webhook调用数
+            rate: 每个集成配置每秒最多的Webhook调用数，为空时不限速
+            batch_size: 每次认领的最大消息数
+            poll_interval: 没有排队消息时的轮询间隔（秒）
+            window: 只认领排队超过该秒数的消息，留出合并窗口；默认取BATCH_WINDOW
+        """
+        config = settings.SHIHUATONG_CONFIG
+        self.concurrency = concurrency
+        self.rate = rate
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.window = config.get('BATCH_WINDOW', 2) if window is None else window
+        self.timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=config.get('CONNECT_TIMEOUT', 5),
+            sock_read=config.get('READ_TIMEOUT', 15)
+        )
+        self.stats = {'messages': 0, 'webhook_calls': 0, 'success': 0, 'failed': 0}
+        self._limiters = {}
+        self._tasks = set()
+        self._stopping = None
+
+    def stop(self):
+        """停止认领新消息，已认领的消息发送完后退出"""
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run(self, once: bool = False) -> Dict[str, int]:
+        """
+        发送排队消息直到收到停止信号
+
+        Args:
+            once: 排队消息全部发送完后退出
+
+        Returns:
+            发送统计：消息数、Webhook调用数、成功消息数、失败消息数
+        """
+        self._stopping = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._install_signal_handlers()
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(connector=connector, timeout=self.timeout) as session:
+            self._session = session
+            while not self._stopping.is_set():
+                # 在途批次达到上限时暂停认领，避免已认领的消息长时间停留在发送中
+                if len(self._tasks) >= self.concurrency:
+                    await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                    continue
+
+                batches = await self._run_sync(self._claim)
+                for batch, service in batches:
+                    task = asyncio.ensure_future(self._send(batch, service))
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+
+                if not batches:
+                    if once:
+                        if not self._tasks:
+                            break
+                        await asyncio.wait(self._tasks)
+                        continue
+                    try:
+                        await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+
+            if self._tasks:
+                await asyncio.gather(*self._tasks)
+
+        return self.stats
+
+    def _install_signal_handlers(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+
+    @staticmethod
+    async def _run_sync(func, *args):
+        """在数据库线程中执行同步操作"""
+        return await sync_to_async(func, thread_sensitive=True)(*args)
+
+    def _claim(self) -> List[Tuple[Dict[str, Any], ShihuatongService]]:
+        """认领排队消息并分组，返回(批次, 服务)列表"""
+        close_old_connections()
+
+        queued_before = timezone.now() - datetime.timedelta(seconds=self.window) if self.window else None
+        messages = ShihuatongBatchService.claim(self.batch_size, queued_before)
+        self.stats['messages'] += len(messages)
+
+        batches = []
+        for batch in ShihuatongBatchService.group(messages):
+            try:
+                service = get_shihuatong_service(batch['integration_id'])
+            except Exception as e:
+                logger.error(f"石化通异步发送获取集成配置失败: {e}")
+                self._complete(batch, partial(self._failed_result, e))
+                continue
+            batches.append((batch, service))
+        return batches
+
+    def _get_limiter(self, integration_id: int) -> Optional[RateLimiter]:
+        if not self.rate:
+            return None
+        limiter = self._limiters.get(integration_id)
+        if limiter is None:
+            limiter = self._limiters[integration_id] = RateLimiter(self.rate)
+        return limiter
+
+    async def _send(self, batch: Dict[str, Any], service: ShihuatongService):
+        """发送一个批次并回写结果"""
+        message_count = len(batch['messages'])
+
+        # 先限速再占用在途名额，被限速的集成配置不占用其他集成配置的名额
+        limiter = self._get_limiter(batch['integration_id'])
+        if limiter is not None:
+            await limiter.acquire()
+
+        async with self._semaphore:
+            try:
+                request_data, body, headers = service._build_request(
+                    batch['hook_token'], batch['title'], batch['content'],
+                    batch['message_type'], batch['mention_all'], batch['recipients']
+                )
+                async with self._session.post(
+                    service.integration.webhook_url, data=body.encode('utf-8'), headers=headers
+                ) as response:
+                    content = await response.read()
+                self.stats['webhook_calls'] += 1
+                handle = partial(
+                    service._handle_response, response.status, content,
+                    request_data, batch['title'], message_count
+                )
+            except Exception as e:
+                handle = partial(service._handle_error, e, message_count)
+
+        try:
+            await self._run_sync(self._complete, batch, handle)
+        except Exception as e:
+            logger.error(f"石化通异步发送回写结果失败: {e}", exc_info=True)
+
+    def _complete(self, batch: Dict[str, Any], handle):
+        """处理发送结果（统计、日志）并写入批次内的消息记录，处理结果出错时按发送失败写入"""
+        try:
+            result = handle()
+        except Exception as e:
+            logger.error(f"石化通异步发送处理结果失败: {e}", exc_info=True)
+            result = self._failed_result(e)
+        ShihuatongBatchService.complete(batch, result)
+
+        if result['status'] == ShihuatongMessage.MessageStatus.SUCCESS:
+            self.stats['success'] += len(batch['messages'])
+        else:
+            self.stats['failed'] += len(batch['messages'])
+
+    @staticmethod
+    def _failed_result(e: Exception) -> Dict[str, Any]:
+        return {
+            'status': ShihuatongMessage.MessageStatus.FAILED,
+            'error_message': str(e),
+        }
@@ -10,6 +10,10 @@ from apps.users.serializers import UserSimpleSerializer
 
 class ShihuatongIntegrationSerializer(serializers.ModelSerializer):
     """石化通集成序列化器"""
+    total_messages_sent = serializers.IntegerField(source='message_stats.total_messages_sent', read_only=True)
+    success_messages_sent = serializers.IntegerField(source='message_stats.success_messages_sent', read_only=True)
+    failed_messages_sent = serializers.IntegerField(source='message_stats.failed_messages_sent', read_only=True)
+    last_used_at = serializers.DateTimeField(source='message_stats.last_used_at', read_only=True)
     success_rate = serializers.FloatField(read_only=True)
     
     class Meta:
@@ -33,6 +37,7 @@ class ShihuatongIntegrationSerializer(serializers.ModelSerializer):
 
 class ShihuatongIntegrationSimpleSerializer(serializers.ModelSerializer):
     """石化通集成简单序列化器"""
+    last_used_at = serializers.DateTimeField(source='message_stats.last_used_at', read_only=True)
     success_rate = serializers.FloatField(read_only=True)
     
     class Meta:
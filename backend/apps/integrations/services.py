@@ -2,50 +2,307 @@
 石化通集成服务
 基于提供的示例代码实现石化通消息推送功能
 """
+import redis
 import requests
 import json
 import datetime
 import hmac
 import hashlib
 import base64
+import os
+import threading
+import time
 import uuid
 import urllib.parse
 import logging
-from typing import Dict, List, Optional, Any
+from collections import defaultdict
+from functools import cached_property
+from typing import Dict, Iterable, List, Optional, Any, Tuple
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ProtocolError
+from urllib3.util.retry import Retry
 
 from .models import ShihuatongIntegration, ShihuatongMessage, IntegrationLog
 
 logger = logging.getLogger(__name__)
 
 
-class ShihuatongService:
+class ConnectionResetRetry(Retry):
     """
-    石化通消息推送服务
+    只重试未送达服务端的请求：建立连接失败，或复用的空闲连接已被服务端关闭（连接被重置）；
+    读取超时不重试，服务端可能已处理该消息，重试会重复推送
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if error is not None and not self._is_connection_error(error) and not isinstance(error, ProtocolError):
+            raise error.with_traceback(_stacktrace)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+_http_sessions = {}
+_http_sessions_lock = threading.Lock()
+
+
+def get_http_session(integration_id) -> requests.Session:
+    """
+    获取集成配置的HTTP会话
+    每个进程内每个集成配置复用一个会话，保持与Webhook服务器的长连接，避免每条消息重新握手
     """
+    with _http_sessions_lock:
+        session = _http_sessions.get(integration_id)
+        if session is None:
+            config = settings.SHIHUATONG_CONFIG
+            retries = ConnectionResetRetry(
+                total=config.get('MAX_RETRIES', 2),
+                connect=config.get('MAX_RETRIES', 2),
+                read=config.get('MAX_RETRIES', 2),
+                status=0,
+                allowed_methods=None,
+                backoff_factor=0.2,
+                raise_on_status=False
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=config.get('POOL_MAXSIZE', 10),
+                max_retries=retries
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _http_sessions[integration_id] = session
+        return session
+
+
+def _reset_http_sessions():
+    """子进程不复用父进程的连接（Celery prefork等场景）"""
+    global _http_sessions_lock
+    _http_sessions.clear()
+    _http_sessions_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_http_sessions)
+
+
+_redis_client = None
+
+
+def _get_redis_client():
+    """发送统计计数用的Redis客户端（进程内共享连接池）"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(
+            settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2
+        )
+    return _redis_client
+
+
+class IntegrationStatsCounter:
+    """
+    集成发送统计计数器
+    发送结果先在Redis哈希中累加，由定时任务以F表达式批量写回集成配置行，发送进程不再争用同一行；
+    读取统计时合并数据库中的累计值和尚未写回的增量。Redis不可用时直接更新数据库
+    """
+    STATS_KEY = 'integrations:shihuatong:stats:{integration_id}'
     
-    def __init__(self, integration_id: Optional[int] = None):
+    # 有未写回增量的集成配置ID集合
+    PENDING_KEY = 'integrations:shihuatong:stats:pending'
+    
+    FIELDS = ('total_messages_sent', 'success_messages_sent', 'failed_messages_sent')
+    
+    @staticmethod
+    def record(integration_id: int, success: bool, count: int = 1):
         """
-        初始化服务
+        累加发送结果
+        
+        Args:
+            integration_id: 集成配置ID
+            success: 是否发送成功
+            count: 消息记录数
+        """
+        result_field = 'success_messages_sent' if success else 'failed_messages_sent'
+        try:
+            key = IntegrationStatsCounter.STATS_KEY.format(integration_id=integration_id)
+            # 与写回时的读取清零互斥，增量和待写回标记要么都在写回之前，要么都在之后
+            pipeline = _get_redis_client().pipeline(transaction=True)
+            pipeline.hincrby(key, 'total_messages_sent', count)
+            pipeline.hincrby(key, result_field, count)
+            if success:
+                pipeline.hset(key, 'last_used_at', time.time())
+            pipeline.sadd(IntegrationStatsCounter.PENDING_KEY, integration_id)
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"累加石化通发送统计失败，直接更新数据库: {e}")
+            deltas = {'total_messages_sent': count, result_field: count}
+            IntegrationStatsCounter._apply(integration_id, deltas, time.time() if success else None)
+    
+    @staticmethod
+    def flush() -> int:
+        """
+        将累加的增量写回数据库
+        
+        Returns:
+            写回的集成配置数量
+        """
+        client = _get_redis_client()
+        flushed = 0
+        for member in client.smembers(IntegrationStatsCounter.PENDING_KEY):
+            integration_id = int(member)
+            key = IntegrationStatsCounter.STATS_KEY.format(integration_id=integration_id)
+            
+            # 原子地读取并清零
+            pipeline = client.pipeline(transaction=True)
+            pipeline.hgetall(key)
+            pipeline.delete(key)
+            pipeline.srem(IntegrationStatsCounter.PENDING_KEY, integration_id)
+            values = pipeline.execute()[0]
+            
+            deltas, last_used_at = IntegrationStatsCounter._parse(values)
+            if not deltas and last_used_at is None:
+                continue
+            
+            try:
+                IntegrationStatsCounter._apply(integration_id, deltas, last_used_at)
+                flushed += 1
+            except Exception as e:
+                # 写回失败时把增量放回计数器，下次重试
+                logger.error(f"写回石化通发送统计失败: {e}", exc_info=True)
+                pipeline = client.pipeline(transaction=True)
+                for field, value in deltas.items():
+                    pipeline.hincrby(key, field, value)
+                if last_used_at is not None:
+                    pipeline.hset(key, 'last_used_at', last_used_at)
+                pipeline.sadd(IntegrationStatsCounter.PENDING_KEY, integration_id)
+                pipeline.execute()
+        
+        return flushed
+    
+    @staticmethod
+    def get_stats(integration: ShihuatongIntegration) -> Dict[str, Any]:
+        """
+        获取发送统计：数据库累计值合并尚未写回的增量
+        
+        Returns:
+            total_messages_sent、success_messages_sent、failed_messages_sent、last_used_at
+        """
+        stats = {field: getattr(integration, field) for field in IntegrationStatsCounter.FIELDS}
+        stats['last_used_at'] = integration.last_used_at
+        if integration.pk is None:
+            return stats
+        
+        try:
+            values = _get_redis_client().hgetall(
+                IntegrationStatsCounter.STATS_KEY.format(integration_id=integration.pk)
+            )
+        except Exception as e:
+            logger.warning(f"读取石化通发送统计增量失败: {e}")
+            return stats
+        
+        deltas, last_used_at = IntegrationStatsCounter._parse(values)
+        for field, value in deltas.items():
+            stats[field] += value
+        if last_used_at is not None:
+            stats['last_used_at'] = datetime.datetime.fromtimestamp(last_used_at, tz=datetime.timezone.utc)
+        return stats
+    
+    @staticmethod
+    def _parse(values: Dict[bytes, bytes]) -> Tuple[Dict[str, int], Optional[float]]:
+        """解析计数器哈希，返回(计数增量, 最后使用时间戳)"""
+        deltas = {}
+        for field in IntegrationStatsCounter.FIELDS:
+            value = int(values.get(field.encode(), 0))
+            if value:
+                deltas[field] = value
+        last_used_at = values.get(b'last_used_at')
+        return deltas, float(last_used_at) if last_used_at is not None else None
+    
+    @staticmethod
+    def _apply(integration_id: int, deltas: Dict[str, int], last_used_at: Optional[float]):
+        """以F表达式把增量加到集成配置行"""
+        updates = {field: F(field) + value for field, value in deltas.items()}
+        if last_used_at is not None:
+            updates['last_used_at'] = datetime.datetime.fromtimestamp(last_used_at, tz=datetime.timezone.utc)
+        if updates:
+            ShihuatongIntegration.objects.filter(pk=integration_id).update(**updates)
+
+
+class IntegrationConfig:
+    """
+    集成配置快照及其派生的加密、签名材料
+    进程内共享且只读，配置变更后整体替换
+    """
+    
+    def __init__(self, integration: ShihuatongIntegration):
+        self.integration = integration
+    
+    @cached_property
+    def aes_key(self) -> bytes:
+        """AES密钥原始字节"""
+        return base64.b64decode(self.integration.aes_key)
+    
+    @cached_property
+    def aes_iv(self) -> bytes:
+        """AES初始向量原始字节"""
+        return base64.b64decode(self.integration.aes_iv)
+    
+    @cached_property
+    def hmac_sha256(self):
+        """以app_secret为密钥初始化的HMAC对象，签名时复制后使用"""
+        return hmac.new(self.integration.app_secret.encode('utf-8'), digestmod=hashlib.sha256)
+
+
+class IntegrationConfigCache:
+    """
+    集成配置缓存
+    每个进程按集成配置ID缓存配置快照，集成配置保存或删除时递增共享缓存中的版本号，
+    各进程下次读取时发现版本变化后重新加载
+    """
+    VERSION_CACHE_KEY = 'integrations:shihuatong:config-version'
+    
+    # 默认集成配置的缓存键
+    DEFAULT = 'default'
+    
+    # {集成配置ID: (版本号, 配置快照)}
+    _configs = {}
+    
+    @staticmethod
+    def get(integration_id: Optional[int] = None) -> IntegrationConfig:
+        """
+        获取集成配置快照
         
         Args:
             integration_id: 集成配置ID，如果不提供则使用默认配置
         """
+        version = IntegrationConfigCache._get_version()
+        key = integration_id or IntegrationConfigCache.DEFAULT
+        entry = IntegrationConfigCache._configs.get(key)
+        if entry is not None and version is not None and entry[0] == version:
+            return entry[1]
+        
         if integration_id:
             try:
-                self.integration = ShihuatongIntegration.objects.get(
+                integration = ShihuatongIntegration.objects.get(
                     id=integration_id,
                     status=ShihuatongIntegration.IntegrationStatus.ACTIVE
                 )
             except ShihuatongIntegration.DoesNotExist:
                 raise ValueError(f"集成配置 {integration_id} 不存在或未启用")
         else:
-            # 使用默认配置或从settings获取
-            self.integration = self._get_default_integration()
+            integration = IntegrationConfigCache._get_default_integration()
+        
+        config = IntegrationConfig(integration)
+        IntegrationConfigCache._configs[key] = (version, config)
+        return config
     
-    def _get_default_integration(self) -> ShihuatongIntegration:
+    @staticmethod
+    def _get_default_integration() -> ShihuatongIntegration:
         """获取默认集成配置"""
         # 首先尝试从数据库获取默认配置
         integration = ShihuatongIntegration.objects.filter(
@@ -53,20 +310,77 @@ class ShihuatongService:
         ).first()
         
         if not integration:
-            # 如果数据库中没有配置，从settings创建默认配置
+            # 如果数据库中没有配置，从settings创建一次默认配置；默认配置被停用后不再重新创建
             config = settings.SHIHUATONG_CONFIG
-            integration = ShihuatongIntegration.objects.create(
+            integration, _ = ShihuatongIntegration.objects.get_or_create(
                 name='默认石化通集成',
-                webhook_url=config.get('WEBHOOK_URL', ''),
-                app_code=config.get('APP_CODE', ''),
-                app_key=config.get('APP_KEY', ''),
-                app_secret=config.get('APP_SECRET', ''),
-                aes_key=config.get('AES_KEY', ''),
-                aes_iv=config.get('AES_IV', ''),
+                defaults={
+                    'webhook_url': config.get('WEBHOOK_URL', ''),
+                    'app_code': config.get('APP_CODE', ''),
+                    'app_key': config.get('APP_KEY', ''),
+                    'app_secret': config.get('APP_SECRET', ''),
+                    'aes_key': config.get('AES_KEY', ''),
+                    'aes_iv': config.get('AES_IV', ''),
+                }
             )
+            if integration.status != ShihuatongIntegration.IntegrationStatus.ACTIVE:
+                raise ValueError("没有启用的石化通集成配置")
         
         return integration
     
+    @staticmethod
+    def _get_version():
+        """获取当前缓存版本号，缓存不可用时返回None（每次都从数据库加载）"""
+        try:
+            version = cache.get(IntegrationConfigCache.VERSION_CACHE_KEY)
+            if version is None:
+                cache.add(IntegrationConfigCache.VERSION_CACHE_KEY, int(time.time() * 1000), timeout=None)
+                version = cache.get(IntegrationConfigCache.VERSION_CACHE_KEY)
+            return version
+        except Exception as e:
+            logger.warning(f"读取石化通集成配置缓存版本失败: {e}")
+            return None
+    
+    @staticmethod
+    def invalidate():
+        """当前事务提交后递增缓存版本号"""
+        transaction.on_commit(IntegrationConfigCache._bump_version)
+    
+    @staticmethod
+    def _bump_version():
+        """递增缓存版本号"""
+        try:
+            cache.incr(IntegrationConfigCache.VERSION_CACHE_KEY)
+        except ValueError:
+            # 版本号已被淘汰，下次读取时重新初始化
+            pass
+        except Exception as e:
+            logger.warning(f"更新石化通集成配置缓存版本失败: {e}")
+
+
+class ShihuatongService:
+    """
+    石化通消息推送服务
+    """
+    
+    def __init__(self, integration_id: Optional[int] = None):
+        """
+        初始化服务
+        
+        Args:
+            integration_id: 集成配置ID，如果不提供则使用默认配置
+        """
+        self.config = IntegrationConfigCache.get(integration_id)
+        self.integration = self.config.integration
+        self.session = get_http_session(self.integration.id)
+        self.timeout = self._get_timeout()
+    
+    @staticmethod
+    def _get_timeout() -> Tuple[float, float]:
+        """Webhook请求的(连接超时, 读取超时)"""
+        config = settings.SHIHUATONG_CONFIG
+        return (config.get('CONNECT_TIMEOUT', 5), config.get('READ_TIMEOUT', 15))
+    
     def _encrypt_aes(self, data: str) -> str:
         """
         AES CBC加密
@@ -78,15 +392,11 @@ class ShihuatongService:
             加密后的base64字符串
         """
         try:
-            # 从base64编码的密钥和IV中解码出原始字节
-            key = base64.b64decode(self.integration.aes_key)
-            iv = base64.b64decode(self.integration.aes_iv)
-
             # 填充数据
             padded_data = pad(data.encode('utf-8'), AES.block_size)
 
             # 创建加密器
-            cipher = AES.new(key=key, mode=AES.MODE_CBC, iv=iv)
+            cipher = AES.new(key=self.config.aes_key, mode=AES.MODE_CBC, iv=self.config.aes_iv)
 
             # 加密并转换为base64
             encrypted = cipher.encrypt(padded_data)
@@ -112,10 +422,8 @@ class ShihuatongService:
             签名字符串
         """
         try:
-            key = self.integration.app_secret.encode('utf-8')
-            data_bytes = data.encode('utf-8')
-            
-            hmac_sha256 = hmac.new(key, data_bytes, digestmod=hashlib.sha256)
+            hmac_sha256 = self.config.hmac_sha256.copy()
+            hmac_sha256.update(data.encode('utf-8'))
             hash_bytes = hmac_sha256.digest()
             
             return base64.b64encode(hash_bytes).decode('utf-8')
@@ -214,6 +522,66 @@ class ShihuatongService:
         
         return message_data, msg_id
     
+    def _build_request(
+        self,
+        hook_token: str,
+        title: str,
+        content: str,
+        message_type: str = 'text',
+        mention_all: bool = False,
+        user_ids: Optional[List[str]] = None
+    ) -> Tuple[Dict[str, Any], str, Dict[str, str]]:
+        """
+        构建加密并签名的Webhook请求
+        
+        Returns:
+            (请求数据, 请求体, 请求头)
+        """
+        # 构建消息数据
+        message_data, msg_id = self._build_message_data(
+            hook_token, title, content, message_type, mention_all, user_ids
+        )
+        
+        # 加密消息内容
+        encrypted_content = self._encrypt_aes(json.dumps(message_data, ensure_ascii=False))
+        
+        # 构建请求数据
+        request_data = {
+            "content": encrypted_content,
+            "appCode": self.integration.app_code
+        }
+        body = json.dumps(request_data, ensure_ascii=False)
+        
+        # 计算请求内容哈希
+        content_sha256 = self._get_content_sha256(body)
+        
+        # 获取GMT时间
+        gmt_time = self._get_gmt_time()
+        
+        # 构建签名字符串
+        signature_str = f'x-date: {gmt_time}\ncontent-sha256: {content_sha256}'
+        
+        # 生成HMAC签名
+        signature = self._get_hmac_signature(signature_str)
+        
+        # 构建Authorization头
+        auth_header = (
+            f'hmac accesskey="{self.integration.app_key}", '
+            f'algorithm="hmac-sha256", '
+            f'headers="x-date content-sha256", '
+            f'signature="{signature}"'
+        )
+        
+        # 构建请求头
+        headers = {
+            "Authorization": auth_header,
+            "X-Date": gmt_time,
+            "Content-sha256": content_sha256,
+            "Content-Type": "application/json"
+        }
+        
+        return request_data, body, headers
+    
     def send_message(
         self,
         hook_token: str,
@@ -252,153 +620,175 @@ class ShihuatongService:
             mention_all=mention_all,
             related_task_id=related_task_id,
             related_notification_id=related_notification_id,
-            status=ShihuatongMessage.MessageStatus.PENDING
+            status=ShihuatongMessage.MessageStatus.SENDING
         )
         
+        result = self._deliver(hook_token, title, content, message_type, mention_all, user_ids)
+        for field, value in result.items():
+            setattr(message, field, value)
+        message.save()
+        
+        return message
+    
+    def _deliver(
+        self,
+        hook_token: str,
+        title: str,
+        content: str,
+        message_type: str = 'text',
+        mention_all: bool = False,
+        user_ids: Optional[List[str]] = None,
+        message_count: int = 1
+    ) -> Dict[str, Any]:
+        """
+        调用Webhook发送一条消息，更新集成统计并记录日志
+        
+        Args:
+            message_count: 本次调用送达的消息记录数，合并发送时为批次内的接收者记录数
+            
+        Returns:
+            需要写入消息记录的字段：status、response_data、error_message、sent_at
+        """
         try:
-            # 构建消息数据
-            message_data, msg_id = self._build_message_data(
+            request_data, body, headers = self._build_request(
                 hook_token, title, content, message_type, mention_all, user_ids
             )
             
-            # 加密消息内容
-            encrypted_content = self._encrypt_aes(json.dumps(message_data, ensure_ascii=False))
-            
-            # 构建请求数据
-            request_data = {
-                "content": encrypted_content,
-                "appCode": self.integration.app_code
-            }
-            
-            # 计算请求内容哈希
-            content_sha256 = self._get_content_sha256(json.dumps(request_data, ensure_ascii=False))
-            
-            # 获取GMT时间
-            gmt_time = self._get_gmt_time()
-            
-            # 构建签名字符串
-            signature_str = f'x-date: {gmt_time}\ncontent-sha256: {content_sha256}'
-            
-            # 生成HMAC签名
-            signature = self._get_hmac_signature(signature_str)
-            
-            # 构建Authorization头
-            auth_header = (
-                f'hmac accesskey="{self.integration.app_key}", '
-                f'algorithm="hmac-sha256", '
-                f'headers="x-date content-sha256", '
-                f'signature="{signature}"'
-            )
-            
-            # 构建请求头
-            headers = {
-                "Authorization": auth_header,
-                "X-Date": gmt_time,
-                "Content-sha256": content_sha256,
-                "Content-Type": "application/json"
-            }
-            
-            # 更新消息状态为发送中
-            message.status = ShihuatongMessage.MessageStatus.SENDING
-            message.save(update_fields=['status'])
-            
-            # 发送HTTP请求
-            response = requests.post(
+            # 发送HTTP请求（复用长连接）
+            response = self.session.post(
                 url=self.integration.webhook_url,
-                data=json.dumps(request_data, ensure_ascii=False),
+                data=body,
                 headers=headers,
-                timeout=30
+                timeout=self.timeout
             )
             
-            # 处理响应
-            response_data = response.json() if response.content else {}
-            
-            if response.status_code == 200:
-                result = response_data
-                if result.get("status") == "0":
-                    # 发送成功
-                    message.status = ShihuatongMessage.MessageStatus.SUCCESS
-                    message.response_data = response_data
-                    message.sent_at = datetime.datetime.now()
-                    
-                    # 更新集成统计
-                    self.integration.total_messages_sent += 1
-                    self.integration.success_messages_sent += 1
-                    self.integration.last_used_at = datetime.datetime.now()
-                    self.integration.save()
-                    
-                    # 记录成功日志
-                    self._log_operation(
-                        level=IntegrationLog.LogLevel.INFO,
-                        operation_type=IntegrationLog.OperationType.SEND_MESSAGE,
-                        message=f"消息发送成功: {title}",
-                        request_data=request_data,
-                        response_data=response_data
-                    )
-                else:
-                    # 发送失败
-                    message.status = ShihuatongMessage.MessageStatus.FAILED
-                    message.error_message = result.get("failureMsg", "未知错误")
-                    message.response_data = response_data
-                    
-                    # 更新集成统计
-                    self.integration.total_messages_sent += 1
-                    self.integration.failed_messages_sent += 1
-                    self.integration.save()
-                    
-                    # 记录错误日志
-                    self._log_operation(
-                        level=IntegrationLog.LogLevel.ERROR,
-                        operation_type=IntegrationLog.OperationType.SEND_MESSAGE,
-                        message=f"消息发送失败: {message.error_message}",
-                        request_data=request_data,
-                        response_data=response_data
-                    )
+            return self._handle_response(
+                response.status_code, response.content, request_data, title, message_count
+            )
+        except Exception as e:
+            return self._handle_error(e, message_count)
+    
+    def _handle_response(
+        self,
+        status_code: int,
+        content: bytes,
+        request_data: Dict[str, Any],
+        title: str,
+        message_count: int = 1
+    ) -> Dict[str, Any]:
+        """
+        处理Webhook响应，更新集成统计并记录日志
+        
+        Returns:
+            需要写入消息记录的字段
+        """
+        # 处理响应，只有HTTP 200才按JSON解析，网关错误页等非JSON响应按发送失败处理
+        response_data = None
+        if status_code == 200:
+            try:
+                response_data = json.loads(content) if content else {}
+            except ValueError:
+                pass
+            if not isinstance(response_data, dict):
+                response_data = None
+        
+        if response_data is not None:
+            result = response_data
+            if result.get("status") == "0":
+                # 发送成功
+                outcome = {
+                    'status': ShihuatongMessage.MessageStatus.SUCCESS,
+                    'response_data': response_data,
+                    'sent_at': datetime.datetime.now(),
+                }
+                
+                # 更新集成统计
+                self._record_result(success=True, count=message_count)
+                
+                # 记录成功日志
+                self._log_operation(
+                    level=IntegrationLog.LogLevel.INFO,
+                    operation_type=IntegrationLog.OperationType.SEND_MESSAGE,
+                    message=f"消息发送成功: {title}",
+                    request_data=request_data,
+                    response_data=response_data
+                )
             else:
-                # HTTP请求失败
-                message.status = ShihuatongMessage.MessageStatus.FAILED
-                message.error_message = f"HTTP {response.status_code}: {response.text}"
-                message.response_data = {"status_code": response.status_code, "text": response.text}
+                # 发送失败
+                outcome = {
+                    'status': ShihuatongMessage.MessageStatus.FAILED,
+                    'error_message': result.get("failureMsg", "未知错误"),
+                    'response_data': response_data,
+                }
                 
                 # 更新集成统计
-                self.integration.total_messages_sent += 1
-                self.integration.failed_messages_sent += 1
-                self.integration.save()
+                self._record_result(success=False, count=message_count)
                 
                 # 记录错误日志
                 self._log_operation(
                     level=IntegrationLog.LogLevel.ERROR,
                     operation_type=IntegrationLog.OperationType.SEND_MESSAGE,
-                    message=f"HTTP请求失败: {response.status_code}",
+                    message=f"消息发送失败: {outcome['error_message']}",
                     request_data=request_data,
-                    response_data=message.response_data
+                    response_data=response_data
                 )
-            
-            message.save()
-            
-        except Exception as e:
-            # 异常处理
-            message.status = ShihuatongMessage.MessageStatus.FAILED
-            message.error_message = str(e)
-            message.save()
+        else:
+            # HTTP请求失败或响应不是有效的JSON
+            text = content.decode('utf-8', errors='replace')
+            outcome = {
+                'status': ShihuatongMessage.MessageStatus.FAILED,
+                'error_message': (
+                    f"HTTP {status_code}: {text}" if status_code != 200 else f"响应不是有效的JSON: {text}"
+                ),
+                'response_data': {"status_code": status_code, "text": text},
+            }
             
             # 更新集成统计
-            self.integration.total_messages_sent += 1
-            self.integration.failed_messages_sent += 1
-            self.integration.save()
+            self._record_result(success=False, count=message_count)
             
             # 记录错误日志
             self._log_operation(
                 level=IntegrationLog.LogLevel.ERROR,
                 operation_type=IntegrationLog.OperationType.SEND_MESSAGE,
-                message=f"发送异常: {str(e)}",
-                request_data={},
-                response_data={}
+                message=f"HTTP请求失败: {status_code}" if status_code != 200 else "响应不是有效的JSON",
+                request_data=request_data,
+                response_data=outcome['response_data']
             )
-            
-            logger.error(f"石化通消息发送异常: {e}", exc_info=True)
         
-        return message
+        return outcome
+    
+    def _handle_error(self, e: Exception, message_count: int = 1) -> Dict[str, Any]:
+        """
+        处理发送异常，更新集成统计并记录日志
+        
+        Returns:
+            需要写入消息记录的字段
+        """
+        # 异常处理
+        outcome = {
+            'status': ShihuatongMessage.MessageStatus.FAILED,
+            'error_message': str(e),
+        }
+        
+        # 更新集成统计
+        self._record_result(success=False, count=message_count)
+        
+        # 记录错误日志
+        self._log_operation(
+            level=IntegrationLog.LogLevel.ERROR,
+            operation_type=IntegrationLog.OperationType.SEND_MESSAGE,
+            message=f"发送异常: {str(e)}",
+            request_data={},
+            response_data={}
+        )
+        
+        logger.error(f"石化通消息发送异常: {e}", exc_info=e)
+        
+        return outcome
+
+    def _record_result(self, success: bool, count: int = 1):
+        """累加集成发送统计"""
+        IntegrationStatsCounter.record(self.integration.pk, success, count)
     
     def _log_operation(
         self,
@@ -477,12 +867,15 @@ class ShihuatongService:
             
             status = "healthy" if test_message.status == ShihuatongMessage.MessageStatus.SUCCESS else "unhealthy"
             
+            # 配置快照中的统计不是最新的，重新读取（成功率合并计数器中尚未写回的增量）
+            integration = ShihuatongIntegration.objects.get(pk=self.integration.pk)
+            
             return {
                 "status": status,
-                "integration_id": self.integration.id,
-                "integration_name": self.integration.name,
-                "success_rate": self.integration.success_rate,
-                "last_used_at": self.integration.last_used_at,
+                "integration_id": integration.id,
+                "integration_name": integration.name,
+                "success_rate": integration.success_rate,
+                "last_used_at": integration.message_stats['last_used_at'],
                 "test_message_id": str(test_message.id)
             }
             
@@ -492,3 +885,261 @@ class ShihuatongService:
                 "status": "error",
                 "error": str(e)
             }
+
+
+_services = {}
+
+
+def get_shihuatong_service(integration_id: Optional[int] = None) -> ShihuatongService:
+    """
+    获取长期复用的石化通服务
+    每个进程内每个集成配置复用一个服务实例，集成配置变更后重新创建
+    """
+    config = IntegrationConfigCache.get(integration_id)
+    key = integration_id or IntegrationConfigCache.DEFAULT
+    service = _services.get(key)
+    if service is None or service.config is not config:
+        service = ShihuatongService(integration_id)
+        _services[key] = service
+    return service
+
+
+class ShihuatongBatchService:
+    """
+    石化通消息合并发送服务
+    消息先按接收者写入排队记录，在合并窗口结束后按(集成配置, Hook Token, 消息类型, 标题, 内容)分组，
+    每组只调用一次Webhook，reminder.userIds列出组内全部接收者，发送结果回写到每条接收者记录
+    """
+    
+    # 已安排合并发送任务的标记，合并窗口内只安排一次
+    FLUSH_SCHEDULED_KEY = 'integrations:shihuatong:flush-scheduled'
+    
+    @staticmethod
+    def _get_batch_window() -> float:
+        """合并窗口（秒）"""
+        return settings.SHIHUATONG_CONFIG.get('BATCH_WINDOW', 2)
+    
+    @staticmethod
+    def _get_batch_max_recipients() -> int:
+        """一次Webhook调用最多提醒的接收者数量"""
+        return settings.SHIHUATONG_CONFIG.get('BATCH_MAX_RECIPIENTS', 100)
+    
+    @staticmethod
+    def _get_claim_timeout() -> float:
+        """认领超时（秒），超过该时间仍在发送中的消息视为工作进程已退出"""
+        return settings.SHIHUATONG_CONFIG.get('CLAIM_TIMEOUT', 300)
+    
+    @staticmethod
+    def enqueue(items: Iterable[Dict[str, Any]]) -> List[ShihuatongMessage]:
+        """
+        写入排队消息，当前事务提交后安排合并发送
+        
+        Args:
+            items: 消息字段字典列表，包含hook_token、title、content、recipient_user_ids，
+                可选message_type、mention_all、related_task_id、related_notification_id
+            
+        Returns:
+            创建的消息记录
+        """
+        items = list(items)
+        if not items:
+            return []
+        
+        integration = IntegrationConfigCache.get().integration
+        messages = ShihuatongMessage.objects.bulk_create([
+            ShihuatongMessage(
+                integration=integration,
+                status=ShihuatongMessage.MessageStatus.QUEUED,
+                **item
+            )
+            for item in items
+        ], batch_size=500)
+        
+        transaction.on_commit(ShihuatongBatchService.schedule_flush)
+        return messages
+    
+    @staticmethod
+    def schedule_flush():
+        """安排合并窗口结束后的发送任务，消息队列不可用时由定时任务兜底"""
+        from .tasks import flush_shihuatong_queue
+        
+        # 由异步发送器轮询发送
+        if settings.SHIHUATONG_CONFIG.get('ASYNC_SENDER'):
+            return
+        
+        window = ShihuatongBatchService._get_batch_window()
+        try:
+            # 标记比窗口多保留一段时间，发送任务开始时清除
+            if not cache.add(ShihuatongBatchService.FLUSH_SCHEDULED_KEY, 1, timeout=window + 60):
+                return
+        except Exception as e:
+            # 在事务提交回调中执行，缓存不可用时不影响已提交的请求，由定时任务兜底发送
+            logger.error(f"安排石化通合并发送失败: {e}")
+            return
+        
+        try:
+            flush_shihuatong_queue.apply_async(countdown=window)
+        except Exception as e:
+            ShihuatongBatchService._clear_flush_scheduled()
+            logger.error(f"安排石化通合并发送失败: {e}")
+    
+    @staticmethod
+    def _clear_flush_scheduled():
+        """清除已安排发送任务的标记，缓存不可用时只记录日志"""
+        try:
+            cache.delete(ShihuatongBatchService.FLUSH_SCHEDULED_KEY)
+        except Exception as e:
+            logger.error(f"清除石化通合并发送标记失败: {e}")
+    
+    @staticmethod
+    def flush(limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        合并发送排队中的消息
+        
+        Args:
+            limit: 本次最多处理的消息数量
+            
+        Returns:
+            发送统计：消息数、Webhook调用数、成功消息数、失败消息数
+        """
+        # 先清除安排标记，此后写入的消息会安排新的发送任务
+        ShihuatongBatchService._clear_flush_scheduled()
+        
+        messages = ShihuatongBatchService.claim(limit)
+        stats = {'messages': len(messages), 'webhook_calls': 0, 'success': 0, 'failed': 0}
+        
+        for batch in ShihuatongBatchService.group(messages):
+            try:
+                result = get_shihuatong_service(batch['integration_id'])._deliver(
+                    batch['hook_token'], batch['title'], batch['content'], batch['message_type'],
+                    batch['mention_all'], batch['recipients'], message_count=len(batch['messages'])
+                )
+                stats['webhook_calls'] += 1
+            except Exception as e:
+                logger.error(f"石化通合并发送异常: {e}", exc_info=True)
+                result = {
+                    'status': ShihuatongMessage.MessageStatus.FAILED,
+                    'error_message': str(e),
+                }
+            
+            ShihuatongBatchService.complete(batch, result)
+            if result['status'] == ShihuatongMessage.MessageStatus.SUCCESS:
+                stats['success'] += len(batch['messages'])
+            else:
+                stats['failed'] += len(batch['messages'])
+        
+        return stats
+    
+    @staticmethod
+    def claim(limit: Optional[int] = None, queued_before=None) -> List[ShihuatongMessage]:
+        """
+        认领排队消息并标记为发送中，多个工作进程同时执行时互不重复
+        
+        Args:
+            limit: 最多认领的消息数量
+            queued_before: 只认领在此时间之前排队的消息
+            
+        Returns:
+            认领的消息记录
+        """
+        with transaction.atomic():
+            queryset = ShihuatongMessage.objects.select_for_update(skip_locked=True).filter(
+                status=ShihuatongMessage.MessageStatus.QUEUED
+            ).order_by('created_at')
+            if queued_before is not None:
+                queryset = queryset.filter(created_at__lte=queued_before)
+            ids = list(queryset.values_list('id', flat=True)[:limit])
+            ShihuatongMessage.objects.filter(id__in=ids).update(
+                status=ShihuatongMessage.MessageStatus.SENDING,
+                claimed_at=timezone.now()
+            )
+        
+        if not ids:
+            return []
+        return list(ShihuatongMessage.objects.filter(id__in=ids).order_by('created_at').only(
+            'id', 'integration_id', 'hook_token', 'message_type', 'mention_all',
+            'title', 'content', 'recipient_user_ids'
+        ))
+    
+    @staticmethod
+    def requeue_stale(timeout: Optional[float] = None) -> Dict[str, int]:
+        """
+        回收认领超时的消息：工作进程在认领后、写回结果前退出时，消息会一直停留在发送中
+        未超过最大重试次数的消息重新排队，否则标记为发送失败
+        
+        Args:
+            timeout: 认领超时（秒），默认取CLAIM_TIMEOUT
+            
+        Returns:
+            重新排队和标记失败的消息数量
+        """
+        if timeout is None:
+            timeout = ShihuatongBatchService._get_claim_timeout()
+        
+        stale = ShihuatongMessage.objects.filter(
+            status=ShihuatongMessage.MessageStatus.SENDING,
+            claimed_at__lt=timezone.now() - datetime.timedelta(seconds=timeout)
+        )
+        requeued = stale.filter(retry_count__lt=F('max_retries')).update(
+            status=ShihuatongMessage.MessageStatus.QUEUED,
+            retry_count=F('retry_count') + 1,
+            claimed_at=None
+        )
+        failed = stale.update(
+            status=ShihuatongMessage.MessageStatus.FAILED,
+            error_message='发送超时未完成',
+            claimed_at=None
+        )
+        
+        if requeued or failed:
+            logger.warning(f"回收认领超时的石化通消息: 重新排队 {requeued} 条，标记失败 {failed} 条")
+        return {'requeued': requeued, 'failed': failed}
+    
+    @staticmethod
+    def group(messages: List[ShihuatongMessage]) -> List[Dict[str, Any]]:
+        """
+        按(集成配置, Hook Token, 消息类型, 是否@所有人, 标题, 内容)分组，并按接收者数量拆分批次
+        
+        Returns:
+            批次列表，每个批次由一次Webhook调用发送，recipients为去重后的接收者
+        """
+        groups = defaultdict(list)
+        for message in messages:
+            key = (
+                message.integration_id, message.hook_token, message.message_type,
+                message.mention_all, message.title, message.content
+            )
+            groups[key].append(message)
+        
+        batches = []
+        max_recipients = ShihuatongBatchService._get_batch_max_recipients()
+        for (integration_id, hook_token, message_type, mention_all, title, content), messages in groups.items():
+            batch = None
+            for message in messages:
+                new_recipients = [] if batch is None else [
+                    user_id for user_id in message.recipient_user_ids if user_id not in batch['recipients']
+                ]
+                if batch is None or len(batch['recipients']) + len(new_recipients) > max_recipients:
+                    batch = {
+                        'integration_id': integration_id,
+                        'hook_token': hook_token,
+                        'message_type': message_type,
+                        'mention_all': mention_all,
+                        'title': title,
+                        'content': content,
+                        'messages': [],
+                        'recipients': [],
+                    }
+                    batches.append(batch)
+                    new_recipients = list(dict.fromkeys(message.recipient_user_ids))
+                batch['messages'].append(message)
+                batch['recipients'].extend(new_recipients)
+        
+        return batches
+    
+    @staticmethod
+    def complete(batch: Dict[str, Any], result: Dict[str, Any]):
+        """将发送结果和批次ID写入批次内每条消息记录"""
+        ShihuatongMessage.objects.filter(id__in=[message.id for message in batch['messages']]).update(
+            batch_id=uuid.uuid4(), claimed_at=None, **result
+        )
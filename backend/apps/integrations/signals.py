@@ -0,0 +1,20 @@
+"""
+集成相关信号处理器
+"""
+import logging
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import ShihuatongIntegration
+from .services import IntegrationConfigCache
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=ShihuatongIntegration)
+@receiver(post_delete, sender=ShihuatongIntegration)
+def invalidate_config_on_change(sender, **kwargs):
+    """
+    集成配置变更后使各进程缓存的配置失效
+    """
+    IntegrationConfigCache.invalidate()
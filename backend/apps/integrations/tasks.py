@@ -4,9 +4,11 @@
 import logging
 from typing import Dict, List, Optional
 from celery import shared_task
+from django.conf import settings
+from django.db.models import F
 from django.utils import timezone
 
-from .services import ShihuatongService
+from .services import IntegrationStatsCounter, ShihuatongBatchService, get_shihuatong_service
 from .models import ShihuatongMessage, ShihuatongUserMapping
 from apps.notifications.models import Notification
 
@@ -41,7 +43,7 @@ def send_shihuatong_message_task(
         integration_id: 集成配置ID
     """
     try:
-        service = ShihuatongService(integration_id)
+        service = get_shihuatong_service(integration_id)
         
         message = service.send_message(
             hook_token=hook_token,
@@ -104,38 +106,82 @@ def send_task_notification_to_shihuatong(
         # 构建消息内容
         title, content = _build_task_notification_content(task, notification_type)
         
-        # 为每个用户发送消息
+        # 批量获取用户的石化通映射
+        mappings = {
+            mapping.user_id: mapping
+            for mapping in ShihuatongUserMapping.objects.filter(
+                user__in=recipients,
+                status=ShihuatongUserMapping.MappingStatus.ACTIVE
+            )
+        }
+        
+        # 每个用户一条排队消息，同一Hook Token的消息合并为一次Webhook调用发送
+        items = []
         for user in recipients:
-            try:
-                # 获取用户的石化通映射
-                mapping = ShihuatongUserMapping.objects.get(
-                    user=user,
-                    status=ShihuatongUserMapping.MappingStatus.ACTIVE
-                )
-                
-                if mapping.default_hook_token:
-                    # 发送消息
-                    send_shihuatong_message_task.delay(
-                        hook_token=mapping.default_hook_token,
-                        title=title,
-                        content=content,
-                        message_type='text',
-                        mention_all=False,
-                        user_ids=[mapping.shihuatong_user_id],
-                        related_task_id=task_id
-                    )
-                    
-            except ShihuatongUserMapping.DoesNotExist:
+            mapping = mappings.get(user.id)
+            if mapping is None:
                 logger.warning(f"用户 {user.real_name} 没有石化通映射配置")
                 continue
-            except Exception as e:
-                logger.error(f"为用户 {user.real_name} 发送石化通通知失败: {e}")
-                continue
+            
+            if mapping.default_hook_token:
+                items.append({
+                    'hook_token': mapping.default_hook_token,
+                    'title': title,
+                    'content': content,
+                    'message_type': 'text',
+                    'mention_all': False,
+                    'recipient_user_ids': [mapping.shihuatong_user_id],
+                    'related_task_id': task_id,
+                })
+        
+        ShihuatongBatchService.enqueue(items)
                 
     except Exception as e:
         logger.error(f"发送任务通知到石化通失败: {e}", exc_info=True)
 
 
+@shared_task
+def flush_shihuatong_queue():
+    """
+    合并发送排队中的石化通消息
+    由异步发送器发送时只回收认领超时的消息，排队消息留给异步发送器按限速和合并窗口发送
+    """
+    try:
+        # 先回收工作进程退出后遗留在发送中的消息，与本次排队消息一起发送
+        requeued = ShihuatongBatchService.requeue_stale()
+        if settings.SHIHUATONG_CONFIG.get('ASYNC_SENDER'):
+            return requeued
+        
+        stats = ShihuatongBatchService.flush()
+        
+        if stats['messages']:
+            logger.info(
+                f"合并发送石化通消息 {stats['messages']} 条，Webhook调用 {stats['webhook_calls']} 次，"
+                f"成功 {stats['success']} 条，失败 {stats['failed']} 条"
+            )
+        
+        return stats
+        
+    except Exception as e:
+        logger.error(f"合并发送石化通消息任务异常: {e}", exc_info=True)
+        raise e
+
+
+@shared_task
+def flush_integration_stats():
+    """
+    将累加的石化通发送统计写回数据库
+    """
+    try:
+        flushed = IntegrationStatsCounter.flush()
+        
+        return {"flushed": flushed}
+        
+    except Exception as e:
+        logger.error(f"写回石化通发送统计任务异常: {e}", exc_info=True)
+        raise e
+
+
 @shared_task
 def retry_failed_messages():
     """
@@ -149,17 +195,25 @@ def retry_failed_messages():
             created_at__gte=timezone.now() - timezone.timedelta(hours=24)
         )
         
-        service = ShihuatongService()
-        retry_count = 0
+        # 合并发送的消息重新排队，与其他排队消息再次合并发送
+        requeued_count = failed_messages.filter(batch_id__isnull=False).update(
+            status=ShihuatongMessage.MessageStatus.QUEUED,
+            retry_count=F('retry_count') + 1
+        )
+        if requeued_count:
+            ShihuatongBatchService.schedule_flush()
+        
+        service = get_shihuatong_service()
+        retry_count = requeued_count
         
-        for message in failed_messages:
+        for message in failed_messages.filter(batch_id__isnull=True):
             if service.retry_failed_message(str(message.id)):
                 retry_count += 1
         
         logger.info(f"重试了 {retry_count} 条失败消息")
         
         return {
-            "total_failed": failed_messages.count(),
+            "total_failed": failed_messages.count() + requeued_count,
             "retry_count": retry_count
         }
         
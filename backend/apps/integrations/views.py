@@ -21,6 +21,7 @@ from .serializers import (
 )
 from .services import ShihuatongService
 from .tasks import send_shihuatong_message_task
+from todo_system.pagination import OptionalKeysetPagination
 from apps.users.permissions import IsAdminUser
 
 logger = logging.getLogger(__name__)
@@ -93,20 +94,22 @@ class ShihuatongIntegrationViewSet(ModelViewSet):
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """获取石化通统计信息"""
+        integrations = list(ShihuatongIntegration.objects.all())
+        
         # 总集成数
-        total_integrations = ShihuatongIntegration.objects.count()
-        active_integrations = ShihuatongIntegration.objects.filter(
-            status=ShihuatongIntegration.IntegrationStatus.ACTIVE
-        ).count()
+        total_integrations = len(integrations)
+        active_integrations = sum(
+            1 for integration in integrations
+            if integration.status == ShihuatongIntegration.IntegrationStatus.ACTIVE
+        )
         
-        # 消息统计
-        total_messages = ShihuatongMessage.objects.count()
-        success_messages = ShihuatongMessage.objects.filter(
-            status=ShihuatongMessage.MessageStatus.SUCCESS
-        ).count()
-        failed_messages = ShihuatongMessage.objects.filter(
-            status=ShihuatongMessage.MessageStatus.FAILED
-        ).count()
+        # 消息统计，读取各集成的发送计数（含尚未写回的增量），不扫描消息表
+        total_messages = success_messages = failed_messages = 0
+        for integration in integrations:
+            stats = integration.message_stats
+            total_messages += stats['total_messages_sent']
+            success_messages += stats['success_messages_sent']
+            failed_messages += stats['failed_messages_sent']
         
         success_rate = (success_messages / total_messages * 100) if total_messages > 0 else 0
         
@@ -311,4 +314,5 @@ class IntegrationLogViewSet(ModelViewSet):
     filterset_fields = ['integration', 'level', 'operation_type']
     ordering_fields = ['created_at']
     ordering = ['-created_at']
+    pagination_class = OptionalKeysetPagination
     http_method_names = ['get']  # 只允许查看
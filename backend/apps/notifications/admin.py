@@ -5,7 +5,8 @@ from django.contrib import admin
 from django.utils.html import format_html
 
 from .models import (
-    Notification, NotificationTemplate, NotificationLog, UserNotificationSettings
+    Notification, NotificationTemplate, NotificationLog, NotificationOutbox,
+    UserNotificationSettings
 )
 
 
@@ -92,3 +93,18 @@ class UserNotificationSettingsAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user')
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    """通知发件箱管理"""
+    list_display = ['id', 'event_type', 'status', 'attempts', 'created_at', 'processed_at']
+    list_filter = ['event_type', 'status', 'created_at']
+    ordering = ['-id']
+    readonly_fields = [
+        'event_type', 'payload', 'status', 'attempts', 'last_error',
+        'created_at', 'processed_at'
+    ]
+    
+    def has_add_permission(self, request):
+        return False
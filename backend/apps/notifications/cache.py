@@ -0,0 +1,311 @@
+"""
+通知缓存
+- 模板进程内缓存：缓存已编译的模板和按名称查找的启用模板，批量发送通知时不再重复解析模板和查询模板表
+- 未读数计数器：每个用户的未读通知数存放在Redis中，轮询未读数时不再查询通知表
+- 通知统计缓存：每个用户按类型的通知数和最近通知存放在Redis中，轮询统计时不再查询通知表
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    线程安全的进程内LRU缓存
+    超出容量时淘汰最久未使用的条目，可选过期时间
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_set(self, key, factory):
+        """获取缓存值，不存在或已过期时调用factory生成并缓存"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and (item[1] is None or item[1] > now):
+                self._items.move_to_end(key)
+                return item[0]
+
+        # 在锁外生成，避免慢查询阻塞其他线程
+        value = factory()
+        expires_at = now + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return value
+
+    def delete_where(self, predicate):
+        """删除键满足条件的条目"""
+        with self._lock:
+            for key in [key for key in self._items if predicate(key)]:
+                del self._items[key]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+# 已编译模板，键为(模板ID, 更新时间)，模板修改后键自然失效
+compiled_template_cache = LRUCache(maxsize=256)
+
+# 启用模板查找结果，键为(模板名称, 通知类型)；其他进程修改模板时依赖过期时间刷新
+active_template_cache = LRUCache(maxsize=256, ttl=60)
+
+
+def invalidate_template_cache(template_id):
+    """模板保存或删除后清除相关缓存"""
+    compiled_template_cache.delete_where(lambda key: key[0] == template_id)
+    # 模板名称、类型、状态都可能变化，查找缓存整体清空
+    active_template_cache.clear()
+
+
+class UnreadCountCache:
+    """
+    用户未读通知数计数器
+    通知创建、标记已读、删除时在事务提交后增减计数，缓存缺失时从数据库统计，
+    并由定时任务从数据库校准，纠正并发或异常导致的偏差
+    """
+    CACHE_KEY = 'notifications:unread:{user_id}'
+    CACHE_TIMEOUT = 24 * 3600
+
+    @staticmethod
+    def _key(user_id):
+        return UnreadCountCache.CACHE_KEY.format(user_id=user_id)
+
+    @staticmethod
+    def _count_from_db(user_id):
+        """从数据库统计用户未读通知数"""
+        from .models import Notification
+        return Notification.objects.filter(
+            recipient_id=user_id,
+            status=Notification.NotificationStatus.UNREAD
+        ).count()
+
+    @staticmethod
+    def get(user_id):
+        """获取用户未读通知数，优先读取缓存"""
+        key = UnreadCountCache._key(user_id)
+        try:
+            count = cache.get(key)
+        except Exception as e:
+            logger.warning(f"读取未读通知数缓存失败: {e}")
+            return UnreadCountCache._count_from_db(user_id)
+
+        if count is None:
+            count = UnreadCountCache._count_from_db(user_id)
+            try:
+                # 使用add，不覆盖期间其他请求写入的计数
+                cache.add(key, count, UnreadCountCache.CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"写入未读通知数缓存失败: {e}")
+        return count
+
+    @staticmethod
+    def adjust(deltas):
+        """
+        当前事务提交后增减用户未读通知数
+
+        Args:
+            deltas: {用户ID: 增减数量}
+        """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if deltas:
+            transaction.on_commit(lambda: UnreadCountCache._apply(deltas))
+
+    @staticmethod
+    def _apply(deltas):
+        """增减计数并推送给在线客户端；缓存不存在时跳过，下次读取时从数据库统计"""
+        from .push import NotificationPushService
+
+        changes = {}
+        for user_id, delta in deltas.items():
+            key = UnreadCountCache._key(user_id)
+            count = None
+            try:
+                count = cache.incr(key, delta)
+                if count < 0:
+                    cache.delete(key)
+                    count = None
+            except ValueError:
+                pass
+            except Exception as e:
+                logger.warning(f"更新未读通知数缓存失败: {e}")
+            changes[user_id] = (delta, count)
+
+        NotificationPushService.notify_unread_counts(changes)
+
+    @staticmethod
+    def reconcile():
+        """从数据库重新统计全部用户的未读通知数并写入缓存，返回写入的用户数"""
+        from apps.users.models import User
+        from .models import Notification
+
+        counts = dict(
+            Notification.objects.filter(
+                status=Notification.NotificationStatus.UNREAD
+            ).order_by().values('recipient_id').annotate(
+                count=Count('id')
+            ).values_list('recipient_id', 'count')
+        )
+        values = {
+            UnreadCountCache._key(user_id): counts.get(user_id, 0)
+            for user_id in User.objects.filter(
+                status=User.UserStatus.ACTIVE
+            ).values_list('id', flat=True)
+        }
+        values.update({UnreadCountCache._key(user_id): count for user_id, count in counts.items()})
+        cache.set_many(values, UnreadCountCache.CACHE_TIMEOUT)
+        return len(values)
+
+
+class NotificationStatsCache:
+    """
+    用户通知统计缓存
+    按类型的通知数与未读数一样在通知创建、删除时于事务提交后增减，缓存缺失时从数据库统计，由定时任务校准；
+    最近通知列表在通知创建、状态变化、删除后清除，下次读取时重新查询
+    """
+    TYPE_COUNT_KEY = 'notifications:type-count:{user_id}:{notification_type}'
+    RECENT_KEY = 'notifications:recent:{user_id}'
+    CACHE_TIMEOUT = 24 * 3600
+
+    @staticmethod
+    def _type_key(user_id, notification_type):
+        return NotificationStatsCache.TYPE_COUNT_KEY.format(
+            user_id=user_id, notification_type=notification_type
+        )
+
+    @staticmethod
+    def _recent_key(user_id):
+        return NotificationStatsCache.RECENT_KEY.format(user_id=user_id)
+
+    @staticmethod
+    def _types():
+        from .models import Notification
+        return Notification.NotificationType.values
+
+    @staticmethod
+    def _counts_from_db(user_id):
+        """从数据库统计用户各类型的通知数"""
+        from .models import Notification
+        counts = dict(
+            Notification.objects.filter(recipient_id=user_id).order_by().values(
+                'notification_type'
+            ).annotate(count=Count('id')).values_list('notification_type', 'count')
+        )
+        return {
+            notification_type: counts.get(notification_type, 0)
+            for notification_type in NotificationStatsCache._types()
+        }
+
+    @staticmethod
+    def get(user_id, recent_factory):
+        """
+        获取用户的通知统计，优先读取缓存
+
+        Args:
+            user_id: 用户ID
+            recent_factory: 缓存缺失时生成最近通知列表（可缓存的数据）的函数
+
+        Returns:
+            ({通知类型: 数量}, 最近通知列表)
+        """
+        type_keys = {
+            NotificationStatsCache._type_key(user_id, notification_type): notification_type
+            for notification_type in NotificationStatsCache._types()
+        }
+        recent_key = NotificationStatsCache._recent_key(user_id)
+        try:
+            cached = cache.get_many([*type_keys, recent_key])
+        except Exception as e:
+            logger.warning(f"读取通知统计缓存失败: {e}")
+            return NotificationStatsCache._counts_from_db(user_id), recent_factory()
+
+        if all(key in cached for key in type_keys):
+            counts = {notification_type: cached[key] for key, notification_type in type_keys.items()}
+        else:
+            counts = NotificationStatsCache._counts_from_db(user_id)
+            try:
+                # 使用add，不覆盖期间其他请求写入的计数
+                for key, notification_type in type_keys.items():
+                    cache.add(key, counts[notification_type], NotificationStatsCache.CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"写入通知统计缓存失败: {e}")
+
+        recent = cached.get(recent_key)
+        if recent is None:
+            recent = recent_factory()
+            try:
+                cache.add(recent_key, recent, NotificationStatsCache.CACHE_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"写入最近通知缓存失败: {e}")
+        return counts, recent
+
+    @staticmethod
+    def adjust(deltas, changed_user_ids=()):
+        """
+        当前事务提交后增减用户各类型的通知数，并清除相关用户的最近通知缓存
+
+        Args:
+            deltas: {(用户ID, 通知类型): 增减数量}
+            changed_user_ids: 只有通知状态变化、需要清除最近通知缓存的用户ID
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        user_ids = {user_id for user_id, _ in deltas} | set(changed_user_ids)
+        if user_ids:
+            transaction.on_commit(lambda: NotificationStatsCache._apply(deltas, user_ids))
+
+    @staticmethod
+    def _apply(deltas, user_ids):
+        """增减计数并清除最近通知缓存；计数缓存不存在时跳过，下次读取时从数据库统计"""
+        for (user_id, notification_type), delta in deltas.items():
+            key = NotificationStatsCache._type_key(user_id, notification_type)
+            try:
+                if cache.incr(key, delta) < 0:
+                    cache.delete(key)
+            except ValueError:
+                pass
+            except Exception as e:
+                logger.warning(f"更新通知统计缓存失败: {e}")
+
+        try:
+            cache.delete_many([NotificationStatsCache._recent_key(user_id) for user_id in user_ids])
+        except Exception as e:
+            logger.warning(f"清除最近通知缓存失败: {e}")
+
+    @staticmethod
+    def reconcile():
+        """从数据库重新统计有通知的用户各类型的通知数并写入缓存，返回写入的用户数"""
+        from .models import Notification
+
+        counts = {}
+        rows = Notification.objects.order_by().values('recipient_id', 'notification_type').annotate(
+            count=Count('id')
+        ).values_list('recipient_id', 'notification_type', 'count')
+        for user_id, notification_type, count in rows:
+            counts.setdefault(user_id, {})[notification_type] = count
+
+        values = {
+            NotificationStatsCache._type_key(user_id, notification_type): user_counts.get(notification_type, 0)
+            for user_id, user_counts in counts.items()
+            for notification_type in NotificationStatsCache._types()
+        }
+        cache.set_many(values, NotificationStatsCache.CACHE_TIMEOUT)
+        return len(counts)
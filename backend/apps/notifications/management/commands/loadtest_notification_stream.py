@@ -0,0 +1,241 @@
+"""
+通知推送流压力测试
+对运行中的ASGI推送服务建立大量空闲的SSE连接，保持指定时间后经Redis发布测试消息，
+统计连接建立耗时、空闲后仍保持的连接数以及推送送达率和延迟。
+测量单个工作进程的承载能力时，推送服务应以单进程启动，例如：
+    uvicorn todo_system.asgi:application --port 8001 --workers 1
+"""
+import asyncio
+import codecs
+import json
+import ssl
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.notifications.push import NotificationPushService
+from apps.notifications.stream import STREAM_PATH
+from apps.users.models import User
+
+
+def percentile(values, percent):
+    """计算百分位数"""
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class StreamClient:
+    """一个SSE连接：发送请求、解析响应头和事件帧"""
+
+    def __init__(self, user_id, token):
+        self.user_id = user_id
+        self.token = token
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.heartbeats = 0
+        self.latencies = []
+        self.writer = None
+
+    async def connect(self, host, port, ssl_context, host_header):
+        """建立连接并等待服务端发送初始未读数"""
+        reader, self.writer = await asyncio.open_connection(host, port, ssl=ssl_context)
+        self.writer.write((
+            f'GET {STREAM_PATH} HTTP/1.1\r\n'
+            f'Host: {host_header}\r\n'
+            f'Authorization: Bearer {self.token}\r\n'
+            f'Accept: text/event-stream\r\n'
+            f'\r\n'
+        ).encode())
+        await self.writer.drain()
+
+        status_line = await reader.readline()
+        if b' 200 ' not in status_line:
+            raise ConnectionError(status_line.decode(errors='replace').strip() or '连接被关闭')
+
+        chunked = False
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            if line.lower().startswith(b'transfer-encoding:') and b'chunked' in line.lower():
+                chunked = True
+
+        return asyncio.ensure_future(self._read(reader, chunked))
+
+    async def _read(self, reader, chunked):
+        """读取响应体并按空行拆分事件帧"""
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        buffer = ''
+        try:
+            while True:
+                if chunked:
+                    size_line = await reader.readline()
+                    if not size_line:
+                        break
+                    size = int(size_line.split(b';')[0], 16)
+                    if size == 0:
+                        break
+                    data = (await reader.readexactly(size + 2))[:-2]
+                else:
+                    data = await reader.read(65536)
+                    if not data:
+                        break
+
+                buffer += decoder.decode(data)
+                while '\n\n' in buffer:
+                    frame, buffer = buffer.split('\n\n', 1)
+                    self._handle_frame(frame)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.closed = True
+
+    def _handle_frame(self, frame):
+        event, data = None, None
+        for line in frame.split('\n'):
+            if line.startswith(':'):
+                self.heartbeats += 1
+            elif line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                data = line[len('data: '):]
+
+        if event == 'unread_count':
+            self.ready.set()
+        elif event == 'loadtest':
+            self.latencies.append(time.time() - json.loads(data)['sent_at'])
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class Command(BaseCommand):
+    help = '对通知推送服务建立大量空闲连接，统计连接保持情况和推送延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8001', help='推送服务地址')
+        parser.add_argument('--connections', type=int, default=2000, help='建立的连接数')
+        parser.add_argument('--users', type=int, default=100, help='连接使用的用户数（取前N个启用用户）')
+        parser.add_argument('--concurrency', type=int, default=200, help='同时建立连接的数量')
+        parser.add_argument('--idle', type=float, default=60, help='发布消息前保持空闲的秒数')
+        parser.add_argument('--messages', type=int, default=200, help='发布的测试消息数量')
+        parser.add_argument('--timeout', type=float, default=10, help='等待连接建立和消息送达的超时秒数')
+        parser.add_argument('--insecure', action='store_true', help='HTTPS时不校验服务端证书')
+
+    def handle(self, *args, **options):
+        users = list(User.objects.filter(
+            is_active=True, status=User.UserStatus.ACTIVE
+        ).order_by('id')[:options['users']])
+        if not users:
+            raise CommandError('没有可用于压力测试的启用用户')
+
+        tokens = [(user.id, str(AccessToken.for_user(user))) for user in users]
+        self._raise_open_files_limit(options['connections'])
+        asyncio.run(self._run(options, tokens))
+
+    def _raise_open_files_limit(self, connections):
+        """尽量提高本进程的文件描述符上限"""
+        try:
+            import resource
+        except ImportError:
+            return
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        wanted = connections + 100
+        if soft < wanted:
+            limit = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (limit, hard))
+            if limit < wanted:
+                self.stderr.write(f'文件描述符上限为 {limit}，部分连接可能建立失败')
+
+    async def _run(self, options, tokens):
+        url = urlsplit(options['url'])
+        ssl_context = None
+        if url.scheme == 'https':
+            ssl_context = ssl.create_default_context()
+            if options['insecure']:
+                ssl_context.check_hostname = False
+                ssl_context.verify_mode = ssl.CERT_NONE
+        port = url.port or (443 if url.scheme == 'https' else 80)
+
+        clients = [
+            StreamClient(*tokens[i % len(tokens)])
+            for i in range(options['connections'])
+        ]
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        connect_times, errors, readers = [], defaultdict(int), []
+
+        async def open_client(client):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    readers.append(await asyncio.wait_for(
+                        client.connect(url.hostname, port, ssl_context, url.netloc), options['timeout']
+                    ))
+                    await asyncio.wait_for(client.ready.wait(), options['timeout'])
+                    connect_times.append((time.perf_counter() - start) * 1000)
+                except Exception as e:
+                    client.closed = True
+                    errors[type(e).__name__ if not str(e) else str(e)[:80]] += 1
+
+        try:
+            # 1. 建立连接
+            start = time.perf_counter()
+            await asyncio.gather(*[open_client(client) for client in clients])
+            elapsed = time.perf_counter() - start
+            connected = [client for client in clients if client.ready.is_set()]
+            self.stdout.write(
+                f'建立连接: 成功 {len(connected)}/{len(clients)}，总耗时 {elapsed:.1f} s，'
+                f'单连接 p50 {percentile(connect_times, 50):.0f} ms / '
+                f'p99 {percentile(connect_times, 99):.0f} ms'
+            )
+            for error, count in errors.items():
+                self.stdout.write(f'  失败 {count}: {error}')
+            if not connected:
+                raise CommandError('没有建立成功的连接')
+
+            # 2. 保持空闲
+            await asyncio.sleep(options['idle'])
+            alive = [client for client in connected if not client.closed]
+            self.stdout.write(
+                f"空闲 {options['idle']:.0f} s 后仍保持: {len(alive)}/{len(connected)}，"
+                f'收到心跳 {sum(client.heartbeats for client in alive)}'
+            )
+
+            # 3. 发布测试消息，逐条轮流发给各用户
+            listeners = defaultdict(int)
+            for client in alive:
+                listeners[client.user_id] += 1
+            user_ids = list(listeners)
+            expected = 0
+            for seq in range(options['messages']):
+                user_id = user_ids[seq % len(user_ids)]
+                await asyncio.to_thread(
+                    NotificationPushService.send,
+                    [(user_id, 'loadtest', {'seq': seq, 'sent_at': time.time()})]
+                )
+                expected += listeners[user_id]
+
+            deadline = time.monotonic() + options['timeout']
+            while time.monotonic() < deadline:
+                if sum(len(client.latencies) for client in alive) >= expected:
+                    break
+                await asyncio.sleep(0.1)
+
+            latencies = [latency * 1000 for client in alive for latency in client.latencies]
+            self.stdout.write(
+                f"推送送达: {len(latencies)}/{expected}（{options['messages']} 条消息），"
+                f'延迟 p50 {percentile(latencies, 50):.1f} ms / p95 {percentile(latencies, 95):.1f} ms / '
+                f'p99 {percentile(latencies, 99):.1f} ms / 最大 {max(latencies, default=0):.1f} ms'
+            )
+        finally:
+            for client in clients:
+                client.close()
+            for reader in readers:
+                reader.cancel()
+            await asyncio.gather(*readers, return_exceptions=True)
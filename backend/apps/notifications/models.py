@@ -2,6 +2,7 @@
 通知模型
 支持多种通知方式：系统内通知、邮件、短信、石化通推送
 """
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 import uuid
 
@@ -100,12 +101,20 @@ class Notification(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['recipient', 'status']),
+            models.Index(fields=['recipient', 'created_at']),
             models.Index(fields=['notification_type', 'created_at']),
         ]
     
     def __str__(self):
         return f"{self.title} -> {self.recipient.real_name}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """从数据库加载时记录原始状态，用于保存后维护未读数"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     def mark_as_read(self):
         """标记为已读"""
         from django.utils import timezone
@@ -163,12 +172,23 @@ class NotificationTemplate(models.Model):
     def __str__(self):
         return f"{self.get_notification_type_display()} - {self.name}"
     
+    def get_compiled_templates(self):
+        """获取编译后的标题和内容模板，已保存的模板按(ID, 更新时间)缓存"""
+        from django.template import Template
+        from .cache import compiled_template_cache
+        
+        def compile_templates():
+            return Template(self.title_template), Template(self.content_template)
+        
+        if self.pk is None:
+            return compile_templates()
+        return compiled_template_cache.get_or_set((self.pk, self.updated_at), compile_templates)
+    
     def render(self, context):
         """渲染模板"""
-        from django.template import Template, Context
+        from django.template import Context
         
-        title_template = Template(self.title_template)
-        content_template = Template(self.content_template)
+        title_template, content_template = self.get_compiled_templates()
         
         django_context = Context(context)
         
@@ -309,3 +329,53 @@ class UserNotificationSettings(models.Model):
             'task_commented': self.task_commented_notifications,
         }
         return type_mapping.get(notification_type, True)
+
+
+class NotificationOutbox(models.Model):
+    """
+    通知发件箱
+    与业务数据在同一事务中写入，事务提交后由Celery任务批量取出发送
+    """
+    class EventType(models.TextChoices):
+        TASK_NOTIFICATION = 'task_notification', '任务模板通知'
+        NOTIFICATION = 'notification', '自定义通知'
+    
+    class OutboxStatus(models.TextChoices):
+        PENDING = 'pending', '待发送'
+        DONE = 'done', '已发送'
+        FAILED = 'failed', '发送失败'
+    
+    event_type = models.CharField(
+        max_length=30,
+        choices=EventType.choices,
+        verbose_name='事件类型'
+    )
+    payload = models.JSONField(
+        default=dict,
+        encoder=DjangoJSONEncoder,
+        verbose_name='事件数据',
+        help_text='NotificationService对应方法的参数'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=OutboxStatus.choices,
+        default=OutboxStatus.PENDING,
+        verbose_name='状态'
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name='尝试次数')
+    last_error = models.TextField(blank=True, verbose_name='最近错误')
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name='处理时间')
+    
+    class Meta:
+        db_table = 'notification_outbox'
+        verbose_name = '通知发件箱'
+        verbose_name_plural = '通知发件箱'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_event_type_display()} - {self.get_status_display()}"
@@ -0,0 +1,109 @@
+"""
+通知实时推送（发布端）
+通知创建和未读数变化时，将Server-Sent Events帧发布到接收者的Redis频道，
+由ASGI推送服务（apps.notifications.stream）转发给在线客户端
+"""
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Tuple
+
+import redis
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# 用户推送频道，推送服务以模式订阅接收全部用户频道
+CHANNEL_PREFIX = 'notifications:push:'
+
+_client = None
+
+
+def get_channel(user_id) -> str:
+    """用户推送频道名称"""
+    return f'{CHANNEL_PREFIX}{user_id}'
+
+
+def format_event(event: str, data: Dict[str, Any]) -> str:
+    """格式化为Server-Sent Events帧"""
+    return f'event: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)}\n\n'
+
+
+def _get_client():
+    """发布用的Redis客户端（进程内共享连接池）"""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2
+        )
+    return _client
+
+
+class NotificationPushService:
+    """
+    通知推送服务
+    推送失败只记录日志，不影响通知写入；客户端断线重连后会重新获取未读数
+    """
+
+    @staticmethod
+    def send(messages: Iterable[Tuple[int, str, Dict[str, Any]]]) -> int:
+        """
+        立即发布推送消息
+
+        Args:
+            messages: [(用户ID, 事件名称, 事件数据)]
+
+        Returns:
+            发布的消息数量
+        """
+        messages = list(messages)
+        if not messages:
+            return 0
+
+        try:
+            pipeline = _get_client().pipeline(transaction=False)
+            for user_id, event, data in messages:
+                pipeline.publish(get_channel(user_id), format_event(event, data))
+            pipeline.execute()
+        except Exception as e:
+            logger.warning(f"发布通知推送失败: {e}")
+            return 0
+        return len(messages)
+
+    @staticmethod
+    def notify_created(notifications: List) -> None:
+        """当前事务提交后推送新通知"""
+        messages = [
+            (notification.recipient_id, 'notification', NotificationPushService.serialize(notification))
+            for notification in notifications
+        ]
+        if messages:
+            transaction.on_commit(lambda: NotificationPushService.send(messages))
+
+    @staticmethod
+    def notify_unread_counts(changes: Dict[int, Tuple[int, Any]]) -> None:
+        """
+        推送未读数变化
+
+        Args:
+            changes: {用户ID: (增减数量, 变化后的未读数)}，未读数未知时为None
+        """
+        NotificationPushService.send(
+            (user_id, 'unread_count', {'delta': delta, 'unread_count': count})
+            for user_id, (delta, count) in changes.items()
+        )
+
+    @staticmethod
+    def serialize(notification) -> Dict[str, Any]:
+        """推送用的通知数据，只包含通知自身字段，不查询关联对象"""
+        return {
+            'id': str(notification.id),
+            'title': notification.title,
+            'content': notification.content,
+            'notification_type': notification.notification_type,
+            'status': notification.status,
+            'sender': notification.sender_id,
+            'related_task': str(notification.related_task_id) if notification.related_task_id else None,
+            'created_at': notification.created_at,
+        }
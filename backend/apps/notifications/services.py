@@ -3,25 +3,54 @@
 统一管理各种通知渠道的发送
 """
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Iterable, Optional
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from .models import (
     Notification, 
     NotificationTemplate, 
     NotificationLog, 
+    NotificationOutbox,
     UserNotificationSettings
 )
-from apps.integrations.tasks import send_shihuatong_message_task
+from .cache import NotificationStatsCache, UnreadCountCache, active_template_cache
+from .push import NotificationPushService
 
 logger = logging.getLogger(__name__)
 
 
+# 当前线程是否有尚未触发的发件箱分发（同一事务提交后的多个回调只触发一次分发任务）
+_outbox_dispatch = threading.local()
+
+
+def _dispatch_outbox_on_commit():
+    """事务提交后触发发件箱分发任务，消息队列不可用时由定时任务兜底"""
+    from .tasks import dispatch_notification_outbox
+    
+    if not getattr(_outbox_dispatch, 'pending', False):
+        return
+    _outbox_dispatch.pending = False
+    
+    try:
+        dispatch_notification_outbox.delay()
+    except Exception as e:
+        logger.error(f"触发通知发件箱分发失败: {e}")
+
+
 class NotificationService:
     """
     通知服务类
     """
     
+    # 发件箱每批处理的事件数量
+    OUTBOX_BATCH_SIZE = 200
+    
+    # 发件箱事件最大尝试次数
+    OUTBOX_MAX_ATTEMPTS = 5
+    
     @staticmethod
     def create_notification(
         recipient_id: int,
@@ -87,6 +116,94 @@ class NotificationService:
             logger.error(f"创建通知失败: {e}", exc_info=True)
             raise e
     
+    @staticmethod
+    def create_notifications_bulk(
+        recipient_ids: Iterable[int],
+        notification_type: str,
+        title: str,
+        content: str,
+        sender_id: Optional[int] = None,
+        related_task_id: Optional[str] = None,
+        channels: Optional[List[str]] = None,
+        extra_data: Optional[Dict] = None
+    ) -> List[Notification]:
+        """
+        批量创建同一内容的通知
+        接收者和通知设置批量加载，通知和发送日志批量写入，查询次数与接收者数量无关
+        
+        Args:
+            recipient_ids: 接收者ID列表
+            notification_type: 通知类型
+            title: 通知标题
+            content: 通知内容
+            sender_id: 发送者ID
+            related_task_id: 关联任务ID
+            channels: 发送渠道列表
+            extra_data: 额外数据
+            
+        Returns:
+            Notification实例列表
+        """
+        from apps.users.models import User
+        
+        recipient_ids = list(dict.fromkeys(recipient_ids))
+        recipients = User.objects.in_bulk(recipient_ids)
+        
+        missing_ids = [recipient_id for recipient_id in recipient_ids if recipient_id not in recipients]
+        if missing_ids:
+            logger.warning(f"通知接收者不存在，已跳过: {missing_ids}")
+        
+        if channels is None:
+            channels = ['system']  # 默认系统内通知
+        
+        settings_map = NotificationService._get_users_notification_settings(recipients.values())
+        
+        notifications = [
+            Notification(
+                title=title,
+                content=content,
+                notification_type=notification_type,
+                sender_id=sender_id,
+                recipient=recipients[recipient_id],
+                related_task_id=related_task_id,
+                channels=NotificationService._filter_channels_by_user_settings(
+                    channels, notification_type, settings_map[recipient_id]
+                ),
+                extra_data=extra_data or {}
+            )
+            for recipient_id in recipient_ids if recipient_id in recipients
+        ]
+        
+        with transaction.atomic():
+            Notification.objects.bulk_create(notifications, batch_size=500)
+            # bulk_create不触发post_save信号，直接更新未读数并推送
+            UnreadCountCache.adjust({notification.recipient_id: 1 for notification in notifications})
+            NotificationStatsCache.adjust({
+                (notification.recipient_id, notification_type): 1 for notification in notifications
+            })
+            NotificationPushService.notify_created(notifications)
+            NotificationService._send_notifications_async(notifications)
+        
+        logger.info(f"批量创建通知: {notification_type} x {len(notifications)}")
+        return notifications
+    
+    @staticmethod
+    def get_active_template(template_name: str, notification_type: str) -> NotificationTemplate:
+        """获取启用的通知模板（进程内缓存，模板不存在也会缓存），不存在时抛出ValueError"""
+        template = active_template_cache.get_or_set(
+            (template_name, notification_type),
+            lambda: NotificationTemplate.objects.filter(
+                name=template_name,
+                notification_type=notification_type,
+                status=NotificationTemplate.TemplateStatus.ACTIVE
+            ).first()
+        )
+        
+        if template is None:
+            logger.error(f"通知模板不存在: {template_name} - {notification_type}")
+            raise ValueError(f"通知模板不存在: {template_name}")
+        return template
+    
     @staticmethod
     def create_notification_from_template(
         template_name: str,
@@ -111,11 +228,7 @@ class NotificationService:
             Notification实例
         """
         try:
-            template = NotificationTemplate.objects.get(
-                name=template_name,
-                notification_type=notification_type,
-                status=NotificationTemplate.TemplateStatus.ACTIVE
-            )
+            template = NotificationService.get_active_template(template_name, notification_type)
             
             # 渲染模板
             rendered = template.render(context)
@@ -130,9 +243,8 @@ class NotificationService:
                 channels=rendered['channels']
             )
             
-        except NotificationTemplate.DoesNotExist:
-            logger.error(f"通知模板不存在: {template_name} - {notification_type}")
-            raise ValueError(f"通知模板不存在: {template_name}")
+        except ValueError:
+            raise
         except Exception as e:
             logger.error(f"从模板创建通知失败: {e}", exc_info=True)
             raise e
@@ -156,39 +268,52 @@ class NotificationService:
             extra_context: 额外上下文
         """
         try:
-            from apps.tasks.models import Task
-            
-            task = Task.objects.get(id=task_id)
-            
-            # 构建上下文
-            context = {
-                'task': task,
-                'task_title': task.title,
-                'task_description': task.description,
-                'creator_name': task.creator.real_name,
-                'due_date': task.due_date,
-                'start_date': task.start_date,
-                **(extra_context or {})
-            }
-            
-            # 为每个接收者创建通知
-            for recipient_id in recipient_ids:
-                try:
-                    NotificationService.create_notification_from_template(
-                        template_name='default',
-                        notification_type=notification_type,
-                        recipient_id=recipient_id,
-                        context=context,
-                        sender_id=sender_id,
-                        related_task_id=task_id
-                    )
-                except Exception as e:
-                    logger.error(f"为用户 {recipient_id} 创建任务通知失败: {e}")
-                    continue
-                    
+            NotificationService._send_task_notification(
+                task_id, notification_type, recipient_ids, sender_id, extra_context
+            )
+        except ValueError as e:
+            logger.error(f"发送任务通知失败: {e}")
         except Exception as e:
             logger.error(f"发送任务通知失败: {e}", exc_info=True)
     
+    @staticmethod
+    def _send_task_notification(
+        task_id: str,
+        notification_type: str,
+        recipient_ids: List[int],
+        sender_id: Optional[int] = None,
+        extra_context: Optional[Dict] = None
+    ):
+        """发送任务相关通知，失败时抛出异常，由发件箱记录错误并重试"""
+        from apps.tasks.models import Task
+        
+        task = Task.objects.select_related('creator').get(id=task_id)
+        
+        # 构建上下文
+        context = {
+            'task': task,
+            'task_title': task.title,
+            'task_description': task.description,
+            'creator_name': task.creator.real_name,
+            'due_date': task.due_date,
+            'start_date': task.start_date,
+            **(extra_context or {})
+        }
+        
+        # 所有接收者上下文相同，模板只渲染一次
+        template = NotificationService.get_active_template('default', notification_type)
+        rendered = template.render(context)
+        
+        NotificationService.create_notifications_bulk(
+            recipient_ids=recipient_ids,
+            notification_type=notification_type,
+            title=rendered['title'],
+            content=rendered['content'],
+            sender_id=sender_id,
+            related_task_id=task_id,
+            channels=rendered['channels']
+        )
+    
     @staticmethod
     def _get_user_notification_settings(user) -> UserNotificationSettings:
         """获取用户通知设置"""
@@ -203,6 +328,216 @@ class NotificationService:
         )
         return settings
     
+    @staticmethod
+    def enqueue_task_notification(
+        task_id: str,
+        notification_type: str,
+        recipient_ids: List[int],
+        sender_id: Optional[int] = None,
+        extra_context: Optional[Dict] = None
+    ) -> NotificationOutbox:
+        """
+        将任务通知写入发件箱，当前事务提交后异步发送
+        参数同send_task_notification
+        """
+        return NotificationService._enqueue(
+            NotificationOutbox.EventType.TASK_NOTIFICATION,
+            {
+                'task_id': str(task_id),
+                'notification_type': notification_type,
+                'recipient_ids': list(recipient_ids),
+                'sender_id': sender_id,
+                'extra_context': extra_context or {},
+            }
+        )
+    
+    @staticmethod
+    def enqueue_task_notifications(events: List[Dict[str, Any]]) -> List[NotificationOutbox]:
+        """
+        批量将任务通知写入发件箱，当前事务提交后异步发送
+        
+        Args:
+            events: 每项为enqueue_task_notification的参数字典
+        """
+        outbox_events = NotificationOutbox.objects.bulk_create([
+            NotificationOutbox(
+                event_type=NotificationOutbox.EventType.TASK_NOTIFICATION,
+                payload={
+                    'task_id': str(event['task_id']),
+                    'notification_type': event['notification_type'],
+                    'recipient_ids': list(event['recipient_ids']),
+                    'sender_id': event.get('sender_id'),
+                    'extra_context': event.get('extra_context') or {},
+                }
+            )
+            for event in events
+        ])
+        if outbox_events:
+            NotificationService._schedule_outbox_dispatch()
+        return outbox_events
+    
+    @staticmethod
+    def enqueue_notification(
+        recipient_id: int,
+        notification_type: str,
+        title: str,
+        content: str,
+        sender_id: Optional[int] = None,
+        related_task_id: Optional[str] = None,
+        channels: Optional[List[str]] = None,
+        extra_data: Optional[Dict] = None
+    ) -> NotificationOutbox:
+        """
+        将自定义通知写入发件箱，当前事务提交后异步发送
+        参数同create_notification
+        """
+        return NotificationService._enqueue(
+            NotificationOutbox.EventType.NOTIFICATION,
+            {
+                'recipient_id': recipient_id,
+                'notification_type': notification_type,
+                'title': title,
+                'content': content,
+                'sender_id': sender_id,
+                'related_task_id': str(related_task_id) if related_task_id else None,
+                'channels': channels,
+                'extra_data': extra_data,
+            }
+        )
+    
+    @staticmethod
+    def _enqueue(event_type: str, payload: Dict[str, Any]) -> NotificationOutbox:
+        """写入发件箱事件并在事务提交后触发分发（同一事务只触发一次）"""
+        event = NotificationOutbox.objects.create(event_type=event_type, payload=payload)
+        NotificationService._schedule_outbox_dispatch()
+        return event
+    
+    @staticmethod
+    def _schedule_outbox_dispatch():
+        """
+        事务提交后触发发件箱分发
+        每次写入都注册提交回调，保证回滚部分保存点后仍有回调；
+        同一次提交的回调中只有第一个触发分发任务，分发本身可重复执行
+        """
+        _outbox_dispatch.pending = True
+        transaction.on_commit(_dispatch_outbox_on_commit)
+    
+    @staticmethod
+    def dispatch_outbox(batch_size: Optional[int] = None) -> int:
+        """
+        批量处理发件箱中待发送的事件
+        
+        每批在一个事务中锁定事件（跳过其他进程已锁定的行），逐个发送后批量更新状态；
+        发送失败的事件保留为待发送，超过最大尝试次数后标记为失败
+        
+        Args:
+            batch_size: 每批处理数量
+            
+        Returns:
+            处理的事件数量
+        """
+        batch_size = batch_size or NotificationService.OUTBOX_BATCH_SIZE
+        processed = 0
+        
+        while True:
+            with transaction.atomic():
+                events = list(
+                    NotificationOutbox.objects.select_for_update(skip_locked=True).filter(
+                        status=NotificationOutbox.OutboxStatus.PENDING
+                    ).order_by('id')[:batch_size]
+                )
+                if not events:
+                    break
+                
+                for event in events:
+                    event.attempts += 1
+                    try:
+                        with transaction.atomic():
+                            NotificationService._process_outbox_event(event)
+                        event.status = NotificationOutbox.OutboxStatus.DONE
+                        event.processed_at = timezone.now()
+                        event.last_error = ''
+                    except Exception as e:
+                        logger.error(f"处理通知发件箱事件失败: {event.id}, 错误: {e}", exc_info=True)
+                        event.last_error = str(e)
+                        if event.attempts >= NotificationService.OUTBOX_MAX_ATTEMPTS:
+                            event.status = NotificationOutbox.OutboxStatus.FAILED
+                            event.processed_at = timezone.now()
+                
+                NotificationOutbox.objects.bulk_update(
+                    events, ['status', 'attempts', 'last_error', 'processed_at']
+                )
+            
+            processed += len(events)
+            if len(events) < batch_size:
+                break
+        
+        if processed:
+            logger.info(f"通知发件箱已处理: {processed} 条")
+        return processed
+    
+    @staticmethod
+    def _process_outbox_event(event: NotificationOutbox):
+        """按事件类型调用对应的发送方法"""
+        payload = dict(event.payload)
+        
+        if event.event_type == NotificationOutbox.EventType.TASK_NOTIFICATION:
+            # JSON中的时间还原为datetime，模板按原格式渲染
+            payload['extra_context'] = {
+                key: NotificationService._restore_datetime(value)
+                for key, value in (payload.get('extra_context') or {}).items()
+            }
+            NotificationService._send_task_notification(**payload)
+        elif event.event_type == NotificationOutbox.EventType.NOTIFICATION:
+            NotificationService.create_notification(**payload)
+        else:
+            raise ValueError(f"未知的发件箱事件类型: {event.event_type}")
+    
+    @staticmethod
+    def _restore_datetime(value):
+        """将ISO格式的时间字符串还原为datetime，其他值原样返回"""
+        if not isinstance(value, str):
+            return value
+        try:
+            return parse_datetime(value) or value
+        except ValueError:
+            return value
+    
+    @staticmethod
+    def _get_users_notification_settings(users) -> Dict[int, UserNotificationSettings]:
+        """批量获取用户通知设置，缺失的按默认值批量创建"""
+        users = list(users)
+        user_ids = [user.id for user in users]
+        settings_map = {
+            settings.user_id: settings
+            for settings in UserNotificationSettings.objects.filter(user_id__in=user_ids)
+        }
+        
+        missing_users = [user for user in users if user.id not in settings_map]
+        if missing_users:
+            UserNotificationSettings.objects.bulk_create(
+                [
+                    UserNotificationSettings(
+                        user=user,
+                        system_notifications=True,
+                        email_notifications=True,
+                        sms_notifications=False,
+                        shihuatong_notifications=True,
+                    )
+                    for user in missing_users
+                ],
+                ignore_conflicts=True
+            )
+            # 重新读取，兼容并发创建的设置
+            settings_map.update({
+                settings.user_id: settings
+                for settings in UserNotificationSettings.objects.filter(
+                    user_id__in=[user.id for user in missing_users]
+                )
+            })
+        
+        return settings_map
+    
     @staticmethod
     def _filter_channels_by_user_settings(
         channels: List[str], 
@@ -252,97 +587,143 @@ class NotificationService:
     @staticmethod
     def _send_notification_async(notification: Notification):
         """异步发送通知"""
-        for channel in notification.channels:
-            try:
-                if channel == 'system':
-                    # 系统内通知已经创建，无需额外处理
-                    NotificationService._log_notification_send(
-                        notification, channel, 'success'
-                    )
-                    
-                elif channel == 'email':
-                    # 发送邮件通知
-                    NotificationService._send_email_notification(notification)
-                    
-                elif channel == 'sms':
-                    # 发送短信通知
-                    NotificationService._send_sms_notification(notification)
-                    
-                elif channel == 'shihuatong':
-                    # 发送石化通通知
-                    NotificationService._send_shihuatong_notification(notification)
-                    
-            except Exception as e:
-                logger.error(f"发送通知失败 - 渠道: {channel}, 错误: {e}")
-                NotificationService._log_notification_send(
-                    notification, channel, 'failed', str(e)
-                )
+        NotificationService._send_notifications_async([notification])
+    
+    @staticmethod
+    def _send_notifications_async(notifications: List[Notification]):
+        """批量发送通知，发送日志统一批量写入"""
+        shihuatong_mappings = NotificationService._get_shihuatong_mappings(notifications)
+        shihuatong_items = []
+        logs = []
+        
+        for notification in notifications:
+            for channel in notification.channels:
+                try:
+                    if channel == 'system':
+                        # 系统内通知已经创建，无需额外处理
+                        logs.append(NotificationService._build_notification_log(
+                            notification, channel, 'success'
+                        ))
+                        
+                    elif channel == 'email':
+                        # 发送邮件通知
+                        logs.append(NotificationService._send_email_notification(notification))
+                        
+                    elif channel == 'sms':
+                        # 发送短信通知
+                        logs.append(NotificationService._send_sms_notification(notification))
+                        
+                    elif channel == 'shihuatong':
+                        # 发送石化通通知
+                        logs.append(NotificationService._send_shihuatong_notification(
+                            notification, shihuatong_mappings.get(notification.recipient_id), shihuatong_items
+                        ))
+                        
+                except Exception as e:
+                    logger.error(f"发送通知失败 - 渠道: {channel}, 错误: {e}")
+                    logs.append(NotificationService._build_notification_log(
+                        notification, channel, 'failed', str(e)
+                    ))
+        
+        if shihuatong_items:
+            NotificationService._enqueue_shihuatong_messages(shihuatong_items, logs)
+        
+        NotificationLog.objects.bulk_create(logs, batch_size=500)
+    
+    @staticmethod
+    def _get_shihuatong_mappings(notifications: List[Notification]) -> Dict[int, Any]:
+        """批量获取需要石化通渠道的接收者映射"""
+        from apps.integrations.models import ShihuatongUserMapping
+        
+        user_ids = {
+            notification.recipient_id
+            for notification in notifications
+            if 'shihuatong' in notification.channels
+        }
+        if not user_ids:
+            return {}
+        
+        return {
+            mapping.user_id: mapping
+            for mapping in ShihuatongUserMapping.objects.filter(
+                user_id__in=user_ids,
+                status=ShihuatongUserMapping.MappingStatus.ACTIVE
+            )
+        }
     
     @staticmethod
-    def _send_email_notification(notification: Notification):
+    def _send_email_notification(notification: Notification) -> NotificationLog:
         """发送邮件通知"""
         # TODO: 实现邮件发送逻辑
         logger.info(f"发送邮件通知: {notification.title} -> {notification.recipient.email}")
-        NotificationService._log_notification_send(notification, 'email', 'success')
+        return NotificationService._build_notification_log(notification, 'email', 'success')
     
     @staticmethod
-    def _send_sms_notification(notification: Notification):
+    def _send_sms_notification(notification: Notification) -> NotificationLog:
         """发送短信通知"""
         # TODO: 实现短信发送逻辑
         logger.info(f"发送短信通知: {notification.title} -> {notification.recipient.phone}")
-        NotificationService._log_notification_send(notification, 'sms', 'success')
+        return NotificationService._build_notification_log(notification, 'sms', 'success')
     
     @staticmethod
-    def _send_shihuatong_notification(notification: Notification):
-        """发送石化通通知"""
-        try:
-            from apps.integrations.models import ShihuatongUserMapping
-            
-            # 获取用户的石化通映射
-            mapping = ShihuatongUserMapping.objects.get(
-                user=notification.recipient,
-                status=ShihuatongUserMapping.MappingStatus.ACTIVE
+    def _send_shihuatong_notification(
+        notification: Notification, mapping, items: List[Dict[str, Any]]
+    ) -> NotificationLog:
+        """发送石化通通知，消息加入items后统一排队合并发送"""
+        if mapping is None:
+            logger.warning(f"用户 {notification.recipient.real_name} 没有石化通映射配置")
+            return NotificationService._build_notification_log(
+                notification, 'shihuatong', 'failed', '用户没有石化通映射配置'
             )
-            
+        
+        try:
             if mapping.default_hook_token:
-                # 异步发送石化通消息
-                send_shihuatong_message_task.delay(
-                    hook_token=mapping.default_hook_token,
-                    title=notification.title,
-                    content=notification.content,
-                    message_type='text',
-                    mention_all=False,
-                    user_ids=[mapping.shihuatong_user_id],
-                    related_task_id=notification.related_task_id,
-                    related_notification_id=str(notification.id)
-                )
+                items.append({
+                    'hook_token': mapping.default_hook_token,
+                    'title': notification.title,
+                    'content': notification.content,
+                    'message_type': 'text',
+                    'mention_all': False,
+                    'recipient_user_ids': [mapping.shihuatong_user_id],
+                    'related_task_id': notification.related_task_id,
+                    'related_notification_id': notification.id,
+                })
                 
-                NotificationService._log_notification_send(
+                return NotificationService._build_notification_log(
                     notification, 'shihuatong', 'pending'
                 )
             else:
                 raise ValueError("用户没有配置默认Hook Token")
                 
-        except ShihuatongUserMapping.DoesNotExist:
-            logger.warning(f"用户 {notification.recipient.real_name} 没有石化通映射配置")
-            NotificationService._log_notification_send(
-                notification, 'shihuatong', 'failed', '用户没有石化通映射配置'
-            )
         except Exception as e:
             logger.error(f"发送石化通通知失败: {e}")
-            NotificationService._log_notification_send(
+            return NotificationService._build_notification_log(
                 notification, 'shihuatong', 'failed', str(e)
             )
     
     @staticmethod
-    def _log_notification_send(
+    def _enqueue_shihuatong_messages(items: List[Dict[str, Any]], logs: List[NotificationLog]):
+        """石化通消息排队，同一Hook Token的消息合并为一次Webhook调用发送"""
+        from apps.integrations.services import ShihuatongBatchService
+        
+        try:
+            ShihuatongBatchService.enqueue(items)
+        except Exception as e:
+            logger.error(f"石化通消息排队失败: {e}", exc_info=True)
+            for log in logs:
+                if log.channel == 'shihuatong' and log.status == 'pending':
+                    log.status = 'failed'
+                    log.error_message = str(e)
+    
+    @staticmethod
+    def _build_notification_log(
         notification: Notification, 
         channel: str, 
         status: str, 
         error_message: str = ''
-    ):
-        """记录通知发送日志"""
-        NotificationLog.objects.create(
+    ) -> NotificationLog:
+        """构建通知发送日志（由调用方批量写入）"""
+        return NotificationLog(
             notification=notification,
             channel=channel,
             status=status,
@@ -363,13 +744,23 @@ class NotificationService:
         except Notification.DoesNotExist:
             return False
     
+    @staticmethod
+    def mark_all_as_read(user_id: int) -> int:
+        """标记用户所有未读通知为已读，返回标记数量"""
+        with transaction.atomic():
+            updated_count = Notification.objects.filter(
+                recipient_id=user_id,
+                status=Notification.NotificationStatus.UNREAD
+            ).update(status=Notification.NotificationStatus.READ, read_at=timezone.now())
+            UnreadCountCache.adjust({user_id: -updated_count})
+            if updated_count:
+                NotificationStatsCache.adjust({}, [user_id])
+        return updated_count
+    
     @staticmethod
     def get_user_unread_count(user_id: int) -> int:
-        """获取用户未读通知数量"""
-        return Notification.objects.filter(
-            recipient_id=user_id,
-            status=Notification.NotificationStatus.UNREAD
-        ).count()
+        """获取用户未读通知数量（Redis计数器，缓存缺失时从数据库统计）"""
+        return UnreadCountCache.get(user_id)
     
     @staticmethod
     def get_user_notifications(
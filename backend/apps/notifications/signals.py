@@ -2,10 +2,12 @@
 通知相关信号处理器
 """
 import logging
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
-from .models import Notification
+from .cache import NotificationStatsCache, UnreadCountCache, invalidate_template_cache
+from .models import Notification, NotificationTemplate
+from .push import NotificationPushService
 
 logger = logging.getLogger(__name__)
 
@@ -21,3 +23,65 @@ def handle_notification_created(sender, instance, created, **kwargs):
             
         except Exception as e:
             logger.error(f"处理通知创建事件失败: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=Notification)
+def update_unread_count_on_save(sender, instance, created, **kwargs):
+    """
+    通知创建或状态变化后更新接收者的未读数和通知统计
+    """
+    try:
+        unread = Notification.NotificationStatus.UNREAD
+        if created:
+            was_unread = False
+            NotificationStatsCache.adjust({(instance.recipient_id, instance.notification_type): 1})
+        else:
+            loaded_status = getattr(instance, '_loaded_status', None)
+            if loaded_status is None:
+                return
+            was_unread = loaded_status == unread
+            if loaded_status != instance.status:
+                NotificationStatsCache.adjust({}, [instance.recipient_id])
+        
+        is_unread = instance.status == unread
+        instance._loaded_status = instance.status
+        if was_unread != is_unread:
+            UnreadCountCache.adjust({instance.recipient_id: 1 if is_unread else -1})
+    except Exception as e:
+        logger.error(f"更新未读通知数失败: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=Notification)
+def push_created_notification(sender, instance, created, **kwargs):
+    """
+    推送新通知给在线的接收者
+    """
+    if created:
+        try:
+            NotificationPushService.notify_created([instance])
+        except Exception as e:
+            logger.error(f"推送新通知失败: {e}", exc_info=True)
+
+
+@receiver(post_delete, sender=Notification)
+def update_unread_count_on_delete(sender, instance, **kwargs):
+    """
+    删除通知后减少接收者的通知统计，删除未读通知时减少未读数
+    """
+    try:
+        NotificationStatsCache.adjust({(instance.recipient_id, instance.notification_type): -1})
+        if instance.status == Notification.NotificationStatus.UNREAD:
+            UnreadCountCache.adjust({instance.recipient_id: -1})
+    except Exception as e:
+        logger.error(f"更新未读通知数失败: {e}", exc_info=True)
+
+
+@receiver([post_save, post_delete], sender=NotificationTemplate)
+def handle_notification_template_changed(sender, instance, **kwargs):
+    """
+    模板保存或删除后清除模板缓存
+    """
+    try:
+        invalidate_template_cache(instance.pk)
+    except Exception as e:
+        logger.error(f"清除通知模板缓存失败: {e}", exc_info=True)
@@ -0,0 +1,244 @@
+"""
+通知实时推送（ASGI服务端）
+以Server-Sent Events向客户端推送新通知和未读数变化，替代未读数轮询。
+
+每个工作进程只建立一个Redis模式订阅，按用户分发到本进程内各连接的队列，
+空闲连接只占用一个协程和一个队列，单进程可保持数千个连接。
+需要以ASGI方式运行，例如：
+    gunicorn todo_system.asgi:application -k uvicorn.workers.UvicornWorker
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http.request import split_domain_port, validate_host
+
+from .push import CHANNEL_PREFIX, format_event
+
+logger = logging.getLogger(__name__)
+
+# 推送流地址
+STREAM_PATH = '/api/v1/notifications/stream/'
+
+
+class NotificationStreamBroker:
+    """
+    进程内推送分发器
+    一个Redis连接模式订阅全部用户频道，收到的消息按用户放入本进程各连接的队列
+    """
+    # 每个连接最多缓存的未发送消息数，超出时丢弃最早的消息
+    QUEUE_SIZE = 100
+
+    # Redis连接断开后的重连间隔（秒）
+    RECONNECT_DELAY = 3
+
+    def __init__(self):
+        self._queues = defaultdict(set)
+        self._task = None
+        self._loop = None
+
+    @property
+    def connection_count(self):
+        """本进程当前的连接数"""
+        return sum(len(queues) for queues in self._queues.values())
+
+    def connect(self, user_id):
+        """注册连接，返回接收推送帧的队列"""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._task = loop.create_task(self._listen())
+
+        queue = asyncio.Queue(self.QUEUE_SIZE)
+        self._queues[user_id].add(queue)
+        return queue
+
+    def disconnect(self, user_id, queue):
+        """注销连接"""
+        queues = self._queues.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._queues[user_id]
+
+    def _dispatch(self, user_id, frame):
+        """将推送帧放入用户的全部连接队列"""
+        for queue in self._queues.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(frame)
+
+    def _broadcast(self, frame):
+        """将推送帧放入全部连接队列"""
+        for user_id in list(self._queues):
+            self._dispatch(user_id, frame)
+
+    async def _listen(self):
+        """订阅全部用户频道并分发消息，连接断开后自动重连"""
+        reconnecting = False
+        while True:
+            client = aioredis.Redis.from_url(settings.REDIS_URL)
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(f'{CHANNEL_PREFIX}*')
+                if reconnecting:
+                    # 断线期间的消息已丢失，通知客户端重新获取未读数
+                    self._broadcast(format_event('resync', {}))
+                reconnecting = True
+
+                async for message in pubsub.listen():
+                    if message['type'] != 'pmessage':
+                        continue
+                    channel = message['channel'].decode()
+                    try:
+                        user_id = int(channel[len(CHANNEL_PREFIX):])
+                    except ValueError:
+                        continue
+                    self._dispatch(user_id, message['data'].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"通知推送订阅中断，{self.RECONNECT_DELAY}秒后重连: {e}")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+            finally:
+                try:
+                    await pubsub.aclose()
+                    await client.aclose()
+                except Exception:
+                    pass
+
+
+broker = NotificationStreamBroker()
+
+
+def _authenticate(headers, query_string):
+    """
+    校验JWT访问令牌，返回启用状态的用户
+    令牌从Authorization头读取；浏览器EventSource无法设置请求头，也可通过token查询参数传递。
+    在线程池中执行，服务重启后大量客户端同时重连时不会排队等待同一个线程
+    """
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+    authentication = JWTAuthentication()
+    raw_token = None
+    header = headers.get(b'authorization')
+    if header:
+        raw_token = authentication.get_raw_token(header)
+    if raw_token is None:
+        raw_token = parse_qs(query_string.decode()).get('token', [None])[0]
+    if not raw_token:
+        return None
+
+    close_old_connections()
+    try:
+        user = authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    finally:
+        close_old_connections()
+    return user if user.is_active else None
+
+
+def _get_unread_count(user_id):
+    """读取用户当前未读数"""
+    from .cache import UnreadCountCache
+
+    close_old_connections()
+    try:
+        return UnreadCountCache.get(user_id)
+    finally:
+        close_old_connections()
+
+
+class NotificationStreamApp:
+    """
+    通知推送流ASGI应用
+    连接建立后先发送当前未读数，之后转发推送帧，空闲时定时发送心跳
+    """
+    # 心跳间隔（秒），避免代理服务器关闭空闲连接
+    HEARTBEAT_INTERVAL = 25
+
+    # 客户端断线后的重连等待时间（毫秒）
+    RETRY_MS = 5000
+
+    async def __call__(self, scope, receive, send):
+        headers = dict(scope['headers'])
+
+        domain, _ = split_domain_port(headers.get(b'host', b'').decode())
+        if not domain or not validate_host(domain, settings.ALLOWED_HOSTS):
+            return await self._send_error(send, 400, '无效的主机头')
+
+        if scope['method'] != 'GET':
+            return await self._send_error(send, 405, '只支持GET请求')
+
+        user = await sync_to_async(_authenticate, thread_sensitive=False)(headers, scope.get('query_string', b''))
+        if user is None:
+            return await self._send_error(send, 401, '身份认证信息无效')
+
+        queue = broker.connect(user.id)
+        try:
+            unread_count = await sync_to_async(_get_unread_count, thread_sensitive=False)(user.id)
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream; charset=utf-8'),
+                    (b'cache-control', b'no-cache'),
+                    (b'x-accel-buffering', b'no'),
+                ],
+            })
+            await self._send_frame(
+                send,
+                f'retry: {self.RETRY_MS}\n'
+                + format_event('unread_count', {'delta': 0, 'unread_count': unread_count})
+            )
+
+            sender = asyncio.ensure_future(self._send_events(queue, send))
+            receiver = asyncio.ensure_future(self._wait_disconnect(receive))
+            try:
+                await asyncio.wait([sender, receiver], return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                sender.cancel()
+                receiver.cancel()
+        finally:
+            broker.disconnect(user.id, queue)
+
+    async def _send_events(self, queue, send):
+        """转发推送帧，空闲时发送心跳"""
+        while True:
+            try:
+                frame = await asyncio.wait_for(queue.get(), self.HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                frame = ': ping\n\n'
+            await self._send_frame(send, frame)
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        """等待客户端断开连接"""
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    @staticmethod
+    async def _send_frame(send, frame):
+        await send({'type': 'http.response.body', 'body': frame.encode(), 'more_body': True})
+
+    @staticmethod
+    async def _send_error(send, status, message):
+        """返回JSON错误响应"""
+        body = json.dumps({'error': message}, ensure_ascii=False).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json')],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+notification_stream = NotificationStreamApp()
@@ -0,0 +1,37 @@
+"""
+通知异步任务
+"""
+import logging
+from celery import shared_task
+
+from .cache import NotificationStatsCache, UnreadCountCache
+from .services import NotificationService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def dispatch_notification_outbox():
+    """
+    批量发送通知发件箱中的待发送事件
+    由事务提交后触发，Celery Beat定时兜底
+    """
+    try:
+        return NotificationService.dispatch_outbox()
+    except Exception as e:
+        logger.error(f"通知发件箱分发失败: {e}", exc_info=True)
+        raise
+
+
+@shared_task
+def reconcile_unread_counts():
+    """
+    从数据库校准用户未读通知数和通知统计缓存
+    由Celery Beat定时执行
+    """
+    try:
+        NotificationStatsCache.reconcile()
+        return UnreadCountCache.reconcile()
+    except Exception as e:
+        logger.error(f"校准未读通知数失败: {e}", exc_info=True)
+        raise
@@ -2,7 +2,7 @@
 通知相关视图
 """
 import logging
-from django.db.models import Q, Count
+from django.db.models import Q
 from rest_framework import status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -18,7 +18,9 @@ from .serializers import (
     NotificationLogSerializer, UserNotificationSettingsSerializer,
     NotificationCreateSerializer, NotificationStatsSerializer
 )
+from .cache import NotificationStatsCache
 from .services import NotificationService
+from todo_system.pagination import OptionalKeysetPagination
 from apps.users.permissions import IsAdminUser
 
 logger = logging.getLogger(__name__)
@@ -34,6 +36,7 @@ class NotificationViewSet(ModelViewSet):
     search_fields = ['title', 'content']
     ordering_fields = ['created_at']
     ordering = ['-created_at']
+    pagination_class = OptionalKeysetPagination
     
     def get_serializer_class(self):
         """根据操作类型选择序列化器"""
@@ -139,12 +142,7 @@ class NotificationViewSet(ModelViewSet):
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
         """标记所有通知为已读"""
-        user = request.user
-        
-        updated_count = Notification.objects.filter(
-            recipient=user,
-            status=Notification.NotificationStatus.UNREAD
-        ).update(status=Notification.NotificationStatus.READ)
+        updated_count = NotificationService.mark_all_as_read(request.user.id)
         
         return Response({
             'message': f'已标记 {updated_count} 条通知为已读'
@@ -155,29 +153,23 @@ class NotificationViewSet(ModelViewSet):
         """获取通知统计信息"""
         user = request.user
         
-        # 总通知数
-        total_notifications = Notification.objects.filter(recipient=user).count()
-        
         # 未读通知数
-        unread_notifications = Notification.objects.filter(
-            recipient=user,
-            status=Notification.NotificationStatus.UNREAD
-        ).count()
+        unread_notifications = NotificationService.get_user_unread_count(user.id)
         
-        # 按类型统计
-        notifications_by_type = {}
-        type_stats = Notification.objects.filter(recipient=user).values(
-            'notification_type'
-        ).annotate(count=Count('id'))
+        # 按类型统计和最近通知读取Redis缓存，总通知数由各类型数量相加
+        type_counts, recent_notifications = NotificationStatsCache.get(
+            user.id,
+            lambda: list(NotificationSimpleSerializer(
+                Notification.objects.filter(recipient=user).order_by('-created_at')[:10], many=True
+            ).data)
+        )
         
-        for stat in type_stats:
-            type_name = dict(Notification.NotificationType.choices).get(
-                stat['notification_type'], stat['notification_type']
-            )
-            notifications_by_type[stat['notification_type']] = {
-                'name': type_name,
-                'count': stat['count']
-            }
+        type_names = dict(Notification.NotificationType.choices)
+        notifications_by_type = {
+            notification_type: {'name': type_names.get(notification_type, notification_type), 'count': count}
+            for notification_type, count in type_counts.items() if count
+        }
+        total_notifications = sum(type_counts.values())
         
         # 按渠道统计（这里简化处理）
         notifications_by_channel = {
@@ -187,21 +179,18 @@ class NotificationViewSet(ModelViewSet):
             'shihuatong': 0
         }
         
-        # 最近通知
-        recent_notifications = Notification.objects.filter(
-            recipient=user
-        ).order_by('-created_at')[:10]
-        
         stats_data = {
             'total_notifications': total_notifications,
             'unread_notifications': unread_notifications,
             'notifications_by_type': notifications_by_type,
             'notifications_by_channel': notifications_by_channel,
-            'recent_notifications': recent_notifications
+            'recent_notifications': []
         }
         
-        serializer = NotificationStatsSerializer(stats_data)
-        return Response(serializer.data)
+        data = NotificationStatsSerializer(stats_data).data
+        # 最近通知缓存的是序列化后的数据
+        data['recent_notifications'] = recent_notifications
+        return Response(data)
 
 
 class NotificationTemplateViewSet(ModelViewSet):
@@ -0,0 +1,29 @@
+"""
+统计报表管理后台配置
+"""
+from django.contrib import admin
+
+from .models import TaskDailyRollup, ReportRollupState
+
+
+@admin.register(TaskDailyRollup)
+class TaskDailyRollupAdmin(admin.ModelAdmin):
+    """任务日汇总"""
+    list_display = [
+        'date', 'dimension', 'dimension_id', 'status', 'priority',
+        'created_count', 'completed_count', 'completion_seconds'
+    ]
+    list_filter = ['dimension', 'status', 'priority', 'date']
+    search_fields = ['dimension_id']
+    date_hierarchy = 'date'
+    readonly_fields = [
+        'date', 'dimension', 'dimension_id', 'status', 'priority',
+        'created_count', 'completed_count', 'completion_seconds'
+    ]
+
+
+@admin.register(ReportRollupState)
+class ReportRollupStateAdmin(admin.ModelAdmin):
+    """汇总状态"""
+    list_display = ['name', 'last_run_at', 'updated_at']
+    readonly_fields = ['updated_at']
@@ -0,0 +1,45 @@
+"""
+重建任务日汇总表
+按日期区间全量重算，用于初始化、修正历史数据或处理删除等增量刷新无法追踪的变更
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.reports.models import ReportRollupState
+from apps.reports.services import ReportRollupService
+
+
+class Command(BaseCommand):
+    help = '按日期区间重建任务日汇总表'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start-date', help='开始日期 YYYY-MM-DD，默认为最早任务的创建日期')
+        parser.add_argument('--end-date', help='结束日期 YYYY-MM-DD，默认为今天')
+
+    def handle(self, *args, **options):
+        started_at = timezone.now()
+        date_range = ReportRollupService.get_data_date_range()
+        if date_range is None:
+            self.stdout.write('没有任务数据，无需重建')
+            return
+
+        try:
+            start_date = date.fromisoformat(options['start_date']) if options['start_date'] else date_range[0]
+            end_date = date.fromisoformat(options['end_date']) if options['end_date'] else date_range[1]
+        except ValueError:
+            raise CommandError('日期格式错误，应为YYYY-MM-DD')
+
+        rows = ReportRollupService.rebuild_range(start_date, end_date)
+
+        # 全量重建后从本次开始时间继续增量刷新
+        if not options['start_date'] and not options['end_date']:
+            ReportRollupState.objects.update_or_create(
+                name=ReportRollupService.ROLLUP_NAME,
+                defaults={'last_run_at': started_at}
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'任务日汇总重建完成: {start_date} 至 {end_date}，共 {rows} 行'
+        ))
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportRollupState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True, verbose_name='汇总名称')),
+                ('last_run_at', models.DateTimeField(blank=True, null=True, verbose_name='上次汇总时间')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+            ],
+            options={
+                'verbose_name': '汇总状态',
+                'verbose_name_plural': '汇总状态',
+                'db_table': 'report_rollup_states',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('dimension', models.CharField(choices=[('all', '全部'), ('department', '部门'), ('profession', '专业'), ('user', '执行人')], max_length=20, verbose_name='统计维度')),
+                ('dimension_id', models.PositiveBigIntegerField(default=0, help_text='部门ID、专业ID或用户ID，全部维度为0', verbose_name='维度ID')),
+                ('status', models.CharField(choices=[('draft', '草稿'), ('pending', '待接收'), ('accepted', '已接收'), ('in_progress', '进行中'), ('completed', '已完成'), ('reviewed', '已评价'), ('cancelled', '已取消'), ('overdue', '已逾期')], max_length=20, verbose_name='任务状态')),
+                ('priority', models.CharField(choices=[('low', '低'), ('medium', '中'), ('high', '高'), ('critical', '紧急')], max_length=20, verbose_name='优先级')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='新建数量')),
+                ('completed_count', models.PositiveIntegerField(default=0, verbose_name='完成数量')),
+                ('completion_seconds', models.PositiveBigIntegerField(default=0, verbose_name='完成耗时合计(秒)')),
+            ],
+            options={
+                'verbose_name': '任务日汇总',
+                'verbose_name_plural': '任务日汇总',
+                'db_table': 'report_task_daily_rollups',
+                'indexes': [models.Index(fields=['dimension', 'dimension_id', 'date'], name='report_task_dimensi_90f0ee_idx')],
+                'unique_together': {('date', 'dimension', 'dimension_id', 'status', 'priority')},
+            },
+        ),
+    ]
@@ -0,0 +1,94 @@
+"""
+统计报表模型
+按天预汇总任务数据，报表查询只读取汇总表
+"""
+from django.db import models
+
+from apps.tasks.models import Task
+
+
+class TaskDailyRollup(models.Model):
+    """
+    任务日汇总表
+    按日期、统计维度、任务状态和优先级汇总新建、完成数量及完成耗时
+    """
+    class Dimension(models.TextChoices):
+        ALL = 'all', '全部'
+        DEPARTMENT = 'department', '部门'
+        PROFESSION = 'profession', '专业'
+        USER = 'user', '执行人'
+    
+    # 汇总维度
+    date = models.DateField(verbose_name='日期')
+    dimension = models.CharField(
+        max_length=20,
+        choices=Dimension.choices,
+        verbose_name='统计维度'
+    )
+    dimension_id = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='维度ID',
+        help_text='部门ID、专业ID或用户ID，全部维度为0'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=Task.TaskStatus.choices,
+        verbose_name='任务状态'
+    )
+    priority = models.CharField(
+        max_length=20,
+        choices=Task.Priority.choices,
+        verbose_name='优先级'
+    )
+    
+    # 汇总指标（执行人维度按任务分配统计）
+    created_count = models.PositiveIntegerField(default=0, verbose_name='新建数量')
+    completed_count = models.PositiveIntegerField(default=0, verbose_name='完成数量')
+    completion_seconds = models.PositiveBigIntegerField(default=0, verbose_name='完成耗时合计(秒)')
+    
+    class Meta:
+        db_table = 'report_task_daily_rollups'
+        verbose_name = '任务日汇总'
+        verbose_name_plural = '任务日汇总'
+        unique_together = [['date', 'dimension', 'dimension_id', 'status', 'priority']]
+        indexes = [
+            models.Index(fields=['dimension', 'dimension_id', 'date']),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.get_dimension_display()}({self.dimension_id}) {self.status}/{self.priority}"
+
+
+class ReportRollupState(models.Model):
+    """
+    汇总任务执行状态
+    记录增量汇总的水位线
+    """
+    name = models.CharField(max_length=50, unique=True, verbose_name='汇总名称')
+    last_run_at = models.DateTimeField(null=True, blank=True, verbose_name='上次汇总时间')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
+    
+    class Meta:
+        db_table = 'report_rollup_states'
+        verbose_name = '汇总状态'
+        verbose_name_plural = '汇总状态'
+    
+    def __str__(self):
+        return f"{self.name} - {self.last_run_at}"
+
+
+class ReportDirtyDate(models.Model):
+    """
+    待重算的汇总日期
+    删除任务或任务分配后无法再从现有数据找出受影响的日期，由删除信号写入，增量刷新时取出重算
+    """
+    date = models.DateField(verbose_name='日期')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    
+    class Meta:
+        db_table = 'report_dirty_dates'
+        verbose_name = '待重算汇总日期'
+        verbose_name_plural = '待重算汇总日期'
+    
+    def __str__(self):
+        return f"{self.date}"
@@ -0,0 +1,365 @@
+"""
+统计报表服务
+负责任务日汇总表的构建与增量刷新，以及基于汇总表的报表查询
+"""
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Max, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from apps.tasks.models import Task, TaskAssignment
+from .models import TaskDailyRollup, ReportDirtyDate, ReportRollupState
+
+logger = logging.getLogger(__name__)
+
+
+class ReportRollupService:
+    """
+    任务日汇总服务类
+    """
+
+    # 增量汇总状态名称
+    ROLLUP_NAME = 'task_daily'
+
+    # 每次增量刷新额外重算的近期天数，用于修正无法追踪的变更
+    TRAILING_DAYS = 2
+
+    @staticmethod
+    def get_day_bounds(day: date):
+        """获取指定日期在当前时区下的起止时间"""
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(day, time.min), tz)
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min), tz)
+        return start, end
+
+    @staticmethod
+    def build_day_rows(day: date) -> List[TaskDailyRollup]:
+        """
+        从任务表和任务分配表计算指定日期的汇总行
+
+        任务维度（全部/部门/专业）按任务的创建时间和完成时间归集，
+        执行人维度按任务分配的分配时间和完成时间归集，状态和优先级均取任务当前值
+
+        Args:
+            day: 汇总日期
+
+        Returns:
+            未保存的汇总行列表
+        """
+        start, end = ReportRollupService.get_day_bounds(day)
+        totals = {}
+
+        def add(dimension, dimension_id, status, priority, created=0, completed=0, duration=None):
+            key = (dimension, dimension_id, status, priority)
+            row = totals.setdefault(key, [0, 0, 0])
+            row[0] += created
+            row[1] += completed
+            row[2] += int(duration.total_seconds()) if duration else 0
+
+        def add_task_row(row, **measures):
+            add(TaskDailyRollup.Dimension.ALL, 0, row['status'], row['priority'], **measures)
+            if row['creator_department_id']:
+                add(
+                    TaskDailyRollup.Dimension.DEPARTMENT, row['creator_department_id'],
+                    row['status'], row['priority'], **measures
+                )
+            if row['profession_id']:
+                add(
+                    TaskDailyRollup.Dimension.PROFESSION, row['profession_id'],
+                    row['status'], row['priority'], **measures
+                )
+
+        task_fields = ['status', 'priority', 'creator_department_id', 'profession_id']
+        tasks = Task.objects.order_by()
+
+        created_tasks = tasks.filter(
+            created_at__gte=start, created_at__lt=end
+        ).values(*task_fields).annotate(count=Count('pk'))
+        for row in created_tasks:
+            add_task_row(row, created=row['count'])
+
+        completed_tasks = tasks.filter(
+            completed_at__gte=start, completed_at__lt=end
+        ).values(*task_fields).annotate(
+            count=Count('pk'),
+            duration=Sum(ExpressionWrapper(
+                F('completed_at') - F('created_at'), output_field=DurationField()
+            ))
+        )
+        for row in completed_tasks:
+            add_task_row(row, completed=row['count'], duration=row['duration'])
+
+        assignment_fields = ['assignee_id', 'task__status', 'task__priority']
+        assignments = TaskAssignment.objects.order_by()
+
+        assigned = assignments.filter(
+            assigned_at__gte=start, assigned_at__lt=end
+        ).values(*assignment_fields).annotate(count=Count('pk'))
+        for row in assigned:
+            add(
+                TaskDailyRollup.Dimension.USER, row['assignee_id'],
+                row['task__status'], row['task__priority'], created=row['count']
+            )
+
+        completed_assignments = assignments.filter(
+            completed_at__gte=start, completed_at__lt=end
+        ).values(*assignment_fields).annotate(
+            count=Count('pk'),
+            duration=Sum(ExpressionWrapper(
+                F('completed_at') - F('assigned_at'), output_field=DurationField()
+            ))
+        )
+        for row in completed_assignments:
+            add(
+                TaskDailyRollup.Dimension.USER, row['assignee_id'],
+                row['task__status'], row['task__priority'],
+                completed=row['count'], duration=row['duration']
+            )
+
+        return [
+            TaskDailyRollup(
+                date=day,
+                dimension=dimension,
+                dimension_id=dimension_id,
+                status=status,
+                priority=priority,
+                created_count=created,
+                completed_count=completed,
+                completion_seconds=max(seconds, 0)
+            )
+            for (dimension, dimension_id, status, priority), (created, completed, seconds) in totals.items()
+        ]
+
+    @staticmethod
+    def rebuild_dates(dates: Iterable[date]) -> int:
+        """
+        重算指定日期的汇总行
+
+        每个日期在单独事务中先删除再写入，重复执行结果一致
+
+        Args:
+            dates: 需要重算的日期
+
+        Returns:
+            写入的汇总行数
+        """
+        written = 0
+        for day in sorted(set(dates)):
+            rows = ReportRollupService.build_day_rows(day)
+            with transaction.atomic():
+                TaskDailyRollup.objects.filter(date=day).delete()
+                TaskDailyRollup.objects.bulk_create(rows, batch_size=1000)
+            written += len(rows)
+        return written
+
+    @staticmethod
+    def rebuild_range(start_date: date, end_date: date) -> int:
+        """重算日期区间（含首尾）内的汇总行"""
+        days = (end_date - start_date).days + 1
+        return ReportRollupService.rebuild_dates(
+            start_date + timedelta(days=offset) for offset in range(max(days, 0))
+        )
+
+    @staticmethod
+    def get_data_date_range():
+        """获取任务数据覆盖的日期区间，无数据时返回None"""
+        first = Task.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        if first is None:
+            return None
+        return timezone.localdate(first), timezone.localdate()
+
+    @staticmethod
+    def get_dirty_dates(since: datetime) -> Set[date]:
+        """
+        获取自指定时间以来有数据变更的汇总日期
+
+        任务变更会影响其创建日期、完成日期以及其下所有分配所在日期的汇总行
+
+        Args:
+            since: 上次汇总时间
+
+        Returns:
+            需要重算的日期集合
+        """
+        dates = set()
+
+        changed_tasks = Task.objects.filter(updated_at__gte=since).order_by()
+        for field in ['created_at', 'completed_at']:
+            dates.update(
+                changed_tasks.exclude(**{f'{field}__isnull': True}).annotate(
+                    day=TruncDate(field)
+                ).values_list('day', flat=True).distinct()
+            )
+
+        changed_assignments = TaskAssignment.objects.filter(
+            Q(task__updated_at__gte=since) |
+            Q(assigned_at__gte=since) |
+            Q(completed_at__gte=since)
+        ).order_by()
+        for field in ['assigned_at', 'completed_at']:
+            dates.update(
+                changed_assignments.exclude(**{f'{field}__isnull': True}).annotate(
+                    day=TruncDate(field)
+                ).values_list('day', flat=True).distinct()
+            )
+
+        return dates
+
+    @staticmethod
+    def mark_dates_dirty(values: Iterable[Optional[datetime]]):
+        """
+        记录下次增量刷新时需要重算的日期
+
+        Args:
+            values: 受影响的时间，空值忽略
+        """
+        dates = {timezone.localdate(value) for value in values if value is not None}
+        if dates:
+            ReportDirtyDate.objects.bulk_create([ReportDirtyDate(date=day) for day in dates])
+
+    @staticmethod
+    def refresh() -> int:
+        """
+        增量刷新汇总表
+
+        首次执行时全量构建；之后只重算水位线以来有变更的日期、删除信号标记的日期和最近几天
+
+        Returns:
+            写入的汇总行数
+        """
+        # 以开始时间作为新水位线，执行期间的变更留给下一次刷新
+        started_at = timezone.now()
+        state, _ = ReportRollupState.objects.get_or_create(name=ReportRollupService.ROLLUP_NAME)
+        # 只处理此刻已标记的日期，执行期间新标记的日期留给下一次刷新
+        marked_max_id = ReportDirtyDate.objects.aggregate(max_id=Max('id'))['max_id']
+        marked = ReportDirtyDate.objects.filter(id__lte=marked_max_id or 0)
+
+        if state.last_run_at is None:
+            date_range = ReportRollupService.get_data_date_range()
+            written = ReportRollupService.rebuild_range(*date_range) if date_range else 0
+        else:
+            today = timezone.localdate(started_at)
+            dates = ReportRollupService.get_dirty_dates(state.last_run_at)
+            dates.update(marked.values_list('date', flat=True).distinct())
+            dates.update(today - timedelta(days=offset) for offset in range(ReportRollupService.TRAILING_DAYS))
+            written = ReportRollupService.rebuild_dates(dates)
+
+        marked.delete()
+        state.last_run_at = started_at
+        state.save(update_fields=['last_run_at', 'updated_at'])
+
+        logger.info(f"任务日汇总刷新完成: {written} 行")
+        return written
+
+
+class ReportService:
+    """
+    报表查询服务类
+    所有查询只读取任务日汇总表
+    """
+
+    # 统计周期对应的日期截断函数
+    PERIOD_FUNCTIONS = {
+        'daily': None,
+        'weekly': TruncWeek,
+        'monthly': TruncMonth,
+    }
+
+    @staticmethod
+    def get_rollups(start_date: date, end_date: date, dimension: str, dimension_id: int = 0):
+        """获取指定维度和日期区间的汇总行"""
+        return TaskDailyRollup.objects.filter(
+            dimension=dimension,
+            dimension_id=dimension_id,
+            date__gte=start_date,
+            date__lte=end_date
+        ).order_by()
+
+    @staticmethod
+    def summarize(created: int, completed: int, seconds: int) -> Dict[str, Any]:
+        """计算完成率和平均完成天数"""
+        return {
+            'created_tasks': created,
+            'completed_tasks': completed,
+            'completion_rate': round(completed / created * 100, 1) if created else 0,
+            'avg_completion_time': round(seconds / completed / 86400, 1) if completed else 0,
+        }
+
+    @staticmethod
+    def get_task_overview(rollups) -> Dict[str, Any]:
+        """任务统计概览"""
+        totals = rollups.aggregate(
+            created=Sum('created_count'),
+            completed=Sum('completed_count'),
+            seconds=Sum('completion_seconds')
+        )
+        overview = ReportService.summarize(
+            totals['created'] or 0, totals['completed'] or 0, totals['seconds'] or 0
+        )
+        overview['overdue_tasks'] = rollups.filter(
+            status=Task.TaskStatus.OVERDUE
+        ).aggregate(count=Sum('created_count'))['count'] or 0
+        return overview
+
+    @staticmethod
+    def get_distribution(rollups, field: str, choices) -> List[Dict[str, Any]]:
+        """按状态或优先级统计新建任务分布"""
+        counts = dict(
+            rollups.values(field).annotate(count=Sum('created_count')).values_list(field, 'count')
+        )
+        return [
+            {'value': code, 'name': name, 'count': counts.get(code) or 0}
+            for code, name in choices
+        ]
+
+    @staticmethod
+    def get_trend(rollups, period: str) -> List[Dict[str, Any]]:
+        """按统计周期汇总新建和完成数量"""
+        trunc = ReportService.PERIOD_FUNCTIONS.get(period)
+        period_expression = trunc('date') if trunc else F('date')
+
+        rows = rollups.annotate(period=period_expression).values('period').annotate(
+            created=Sum('created_count'),
+            completed=Sum('completed_count'),
+            seconds=Sum('completion_seconds')
+        ).order_by('period')
+
+        trend = []
+        for row in rows:
+            period_date = row['period']
+            if isinstance(period_date, datetime):
+                period_date = period_date.date()
+            item = {'period': period_date.isoformat()}
+            item.update(ReportService.summarize(row['created'], row['completed'], row['seconds']))
+            trend.append(item)
+        return trend
+
+    @staticmethod
+    def get_dimension_totals(
+        start_date: date,
+        end_date: date,
+        dimension: str,
+        dimension_ids: Optional[Iterable[int]] = None
+    ) -> Dict[int, Dict[str, Any]]:
+        """按维度ID汇总新建、完成数量和完成耗时"""
+        rollups = TaskDailyRollup.objects.filter(
+            dimension=dimension,
+            date__gte=start_date,
+            date__lte=end_date
+        ).order_by()
+        if dimension_ids is not None:
+            rollups = rollups.filter(dimension_id__in=list(dimension_ids))
+
+        rows = rollups.values('dimension_id').annotate(
+            created=Sum('created_count'),
+            completed=Sum('completed_count'),
+            seconds=Sum('completion_seconds')
+        )
+        return {
+            row['dimension_id']: ReportService.summarize(row['created'], row['completed'], row['seconds'])
+            for row in rows
+        }
@@ -0,0 +1,24 @@
+"""
+统计报表相关信号处理器
+"""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from apps.tasks.models import Task, TaskAssignment
+from .services import ReportRollupService
+
+
+@receiver(post_delete, sender=Task)
+def mark_task_dates_dirty(sender, instance, **kwargs):
+    """
+    删除任务后标记其创建日期和完成日期待重算（任务分配随任务级联删除，由分配的信号处理）
+    """
+    ReportRollupService.mark_dates_dirty([instance.created_at, instance.completed_at])
+
+
+@receiver(post_delete, sender=TaskAssignment)
+def mark_assignment_dates_dirty(sender, instance, **kwargs):
+    """
+    删除任务分配后标记其分配日期和完成日期待重算
+    """
+    ReportRollupService.mark_dates_dirty([instance.assigned_at, instance.completed_at])
@@ -0,0 +1,22 @@
+"""
+统计报表异步任务
+"""
+import logging
+from celery import shared_task
+
+from .services import ReportRollupService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def refresh_task_rollups():
+    """
+    增量刷新任务日汇总表
+    由Celery Beat定时调度
+    """
+    try:
+        return ReportRollupService.refresh()
+    except Exception as e:
+        logger.error(f"任务日汇总刷新失败: {str(e)}", exc_info=True)
+        raise
@@ -0,0 +1,206 @@
+"""
+统计报表视图
+"""
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from apps.departments.models import Department
+from apps.tasks.models import Task
+from .models import TaskDailyRollup
+from .services import ReportService
+
+User = get_user_model()
+
+
+class ReportViewSet(viewsets.ViewSet):
+    """
+    统计报表视图集
+    报表数据读取任务日汇总表，管理员可查看全部或指定部门，其他用户限定为本部门
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    # 默认统计天数
+    DEFAULT_DAYS = 30
+
+    def get_date_range(self):
+        """解析查询参数中的日期区间，默认最近30天"""
+        params = self.request.query_params
+        try:
+            end_date = date.fromisoformat(params['end_date']) if params.get('end_date') else timezone.localdate()
+            start_date = (
+                date.fromisoformat(params['start_date']) if params.get('start_date')
+                else end_date - timedelta(days=self.DEFAULT_DAYS - 1)
+            )
+        except ValueError:
+            raise ValidationError({'error': '日期格式错误，应为YYYY-MM-DD'})
+
+        if start_date > end_date:
+            raise ValidationError({'error': '开始日期不能晚于结束日期'})
+        return start_date, end_date
+
+    def get_int_param(self, name, default=None):
+        """解析整数查询参数"""
+        value = self.request.query_params.get(name)
+        if not value:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({'error': f'参数{name}必须为整数'})
+
+    def get_department_id(self):
+        """获取报表部门范围，非管理员只能查看本部门"""
+        user = self.request.user
+        if user.is_admin:
+            return self.get_int_param('department_id')
+        return user.department_id
+
+    def get_scope(self):
+        """获取汇总维度和维度ID"""
+        user = self.request.user
+        department_id = self.get_department_id()
+        if department_id:
+            return TaskDailyRollup.Dimension.DEPARTMENT, department_id
+        if user.is_admin:
+            return TaskDailyRollup.Dimension.ALL, 0
+        return TaskDailyRollup.Dimension.USER, user.id
+
+    def get_scope_rollups(self):
+        """获取当前范围和日期区间的汇总行"""
+        start_date, end_date = self.get_date_range()
+        return ReportService.get_rollups(start_date, end_date, *self.get_scope())
+
+    def get_period(self):
+        """获取统计周期"""
+        period = self.request.query_params.get('period', 'daily')
+        if period not in ReportService.PERIOD_FUNCTIONS:
+            raise ValidationError({'error': '统计周期必须为daily、weekly或monthly'})
+        return period
+
+    @action(detail=False, methods=['get'])
+    def task_overview(self, request):
+        """任务统计概览"""
+        start_date, end_date = self.get_date_range()
+        overview = ReportService.get_task_overview(self.get_scope_rollups())
+        overview.update({
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+        })
+        return Response(overview)
+
+    @action(detail=False, methods=['get'])
+    def task_completion_rate(self, request):
+        """任务完成率统计：区间总完成率及各统计周期的完成率"""
+        period = self.get_period()
+        trend = ReportService.get_trend(self.get_scope_rollups(), period)
+        summary = ReportService.summarize(
+            sum(item['created_tasks'] for item in trend),
+            sum(item['completed_tasks'] for item in trend),
+            0
+        )
+        return Response({
+            'period': period,
+            'created_tasks': summary['created_tasks'],
+            'completed_tasks': summary['completed_tasks'],
+            'completion_rate': summary['completion_rate'],
+            'results': [
+                {
+                    'period': item['period'],
+                    'created_tasks': item['created_tasks'],
+                    'completed_tasks': item['completed_tasks'],
+                    'completion_rate': item['completion_rate'],
+                }
+                for item in trend
+            ]
+        })
+
+    @action(detail=False, methods=['get'])
+    def task_trend(self, request):
+        """任务趋势分析"""
+        period = self.get_period()
+        return Response({
+            'period': period,
+            'results': ReportService.get_trend(self.get_scope_rollups(), period)
+        })
+
+    @action(detail=False, methods=['get'])
+    def task_status_distribution(self, request):
+        """任务状态分布"""
+        return Response(ReportService.get_distribution(
+            self.get_scope_rollups(), 'status', Task.TaskStatus.choices
+        ))
+
+    @action(detail=False, methods=['get'])
+    def task_priority_distribution(self, request):
+        """任务优先级分布"""
+        return Response(ReportService.get_distribution(
+            self.get_scope_rollups(), 'priority', Task.Priority.choices
+        ))
+
+    @action(detail=False, methods=['get'])
+    def department_workload(self, request):
+        """部门工作量统计"""
+        start_date, end_date = self.get_date_range()
+        department_id = self.get_department_id()
+
+        departments = Department.objects.filter(status=Department.DepartmentStatus.ACTIVE)
+        if department_id:
+            departments = departments.filter(id=department_id)
+        elif not request.user.is_admin:
+            departments = departments.none()
+        names = dict(departments.values_list('id', 'name'))
+
+        totals = ReportService.get_dimension_totals(
+            start_date, end_date, TaskDailyRollup.Dimension.DEPARTMENT, names.keys()
+        )
+
+        results = []
+        for dept_id, name in names.items():
+            item = {'department_id': dept_id, 'department_name': name}
+            item.update(totals.get(dept_id) or ReportService.summarize(0, 0, 0))
+            results.append(item)
+        results.sort(key=lambda item: item['created_tasks'], reverse=True)
+        return Response(results)
+
+    @action(detail=False, methods=['get'])
+    def user_performance(self, request):
+        """用户绩效统计"""
+        start_date, end_date = self.get_date_range()
+        department_id = self.get_department_id()
+        limit = min(max(self.get_int_param('limit', 10), 1), 100)
+
+        user_ids = None
+        if department_id:
+            user_ids = User.objects.filter(department_id=department_id).values_list('id', flat=True)
+        elif not request.user.is_admin:
+            user_ids = [request.user.id]
+
+        totals = ReportService.get_dimension_totals(
+            start_date, end_date, TaskDailyRollup.Dimension.USER, user_ids
+        )
+        top_ids = sorted(
+            totals,
+            key=lambda user_id: (totals[user_id]['completed_tasks'], totals[user_id]['completion_rate']),
+            reverse=True
+        )[:limit]
+
+        users = User.objects.select_related('department').in_bulk(top_ids)
+        results = []
+        for user_id in top_ids:
+            user = users.get(user_id)
+            if user is None:
+                continue
+            item = {
+                'user_id': user.id,
+                'user_name': user.real_name,
+                'department_name': user.department.name if user.department else '',
+            }
+            item.update(totals[user_id])
+            results.append(item)
+        return Response(results)
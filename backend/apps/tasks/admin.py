@@ -6,7 +6,7 @@ from django.utils.html import format_html
 
 from .models import (
     Task, TaskAssignment, TaskExecution, TaskReview, 
-    TaskAttachment, TaskComment, TaskTemplate
+    TaskAttachment, TaskComment, TaskTemplate, TaskStatsCounter, TaskImportJob
 )
 
 
@@ -158,3 +158,27 @@ class TaskTemplateAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related(
             'creator', 'department', 'profession'
         )
+
+
+@admin.register(TaskStatsCounter)
+class TaskStatsCounterAdmin(admin.ModelAdmin):
+    """任务统计计数器"""
+    list_display = ['scope_type', 'scope_id', 'status', 'priority', 'count']
+    list_filter = ['scope_type', 'status', 'priority']
+    search_fields = ['scope_id']
+    readonly_fields = ['scope_type', 'scope_id', 'status', 'priority', 'count']
+
+
+@admin.register(TaskImportJob)
+class TaskImportJobAdmin(admin.ModelAdmin):
+    """任务导入作业"""
+    list_display = [
+        'original_name', 'creator', 'status', 'total_rows', 'processed_rows',
+        'created_count', 'failed_count', 'created_at', 'finished_at'
+    ]
+    list_filter = ['status', 'publish', 'created_at']
+    search_fields = ['original_name', 'creator__real_name']
+    readonly_fields = [
+        'total_rows', 'processed_rows', 'created_count', 'failed_count',
+        'errors', 'error_message', 'created_at', 'started_at', 'finished_at'
+    ]
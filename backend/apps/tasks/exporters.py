@@ -0,0 +1,161 @@
+"""
+任务数据导出
+按键集分块读取values()行并逐行写出，内存占用与导出行数无关
+"""
+import csv
+import tempfile
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Task, TaskAssignment
+
+
+# 支持的导出格式
+EXPORT_FORMATS = ['csv', 'xlsx']
+
+# 每次从数据库读取的行数
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _choice_label(choices):
+    """选项值转换为显示名称"""
+    labels = dict(choices)
+    return lambda value: labels.get(value, value)
+
+
+def _format_datetime(value):
+    """日期时间转换为本地时间字符串"""
+    if not value:
+        return ''
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M')
+
+
+def _format_bool(value):
+    """布尔值转换为是/否"""
+    return '是' if value else '否'
+
+
+# 导出列：(values字段, 表头, 格式化函数)
+TASK_EXPORT_COLUMNS = [
+    ('id', '任务ID', str),
+    ('title', '任务标题', None),
+    ('task_type', '任务类型', _choice_label(Task.TaskType.choices)),
+    ('priority', '优先级', _choice_label(Task.Priority.choices)),
+    ('status', '任务状态', _choice_label(Task.TaskStatus.choices)),
+    ('assignment_mode', '分配模式', _choice_label(Task.AssignmentMode.choices)),
+    ('creator__real_name', '创建者', None),
+    ('creator_department__name', '创建部门', None),
+    ('profession__name', '所属专业', None),
+    ('start_date', '开始时间', _format_datetime),
+    ('due_date', '截止时间', _format_datetime),
+    ('estimated_hours', '预估工时', None),
+    ('created_at', '创建时间', _format_datetime),
+    ('published_at', '发布时间', _format_datetime),
+    ('completed_at', '完成时间', _format_datetime),
+]
+
+ASSIGNMENT_EXPORT_COLUMNS = [
+    ('task_id', '任务ID', str),
+    ('task__title', '任务标题', None),
+    ('task__status', '任务状态', _choice_label(Task.TaskStatus.choices)),
+    ('task__due_date', '截止时间', _format_datetime),
+    ('assignee__employee_id', '执行人工号', None),
+    ('assignee__real_name', '执行人', None),
+    ('assignee_department__name', '执行人部门', None),
+    ('role', '分配角色', _choice_label(TaskAssignment.AssignmentRole.choices)),
+    ('is_primary', '是否牵头人', _format_bool),
+    ('status', '分配状态', _choice_label(TaskAssignment.AssignmentStatus.choices)),
+    ('assigned_at', '分配时间', _format_datetime),
+    ('accepted_at', '接收时间', _format_datetime),
+    ('completed_at', '完成时间', _format_datetime),
+]
+
+
+def iter_task_rows(tasks):
+    """按(created_at, id)倒序分块读取任务，逐行生成导出值"""
+    fields = [field for field, _, _ in TASK_EXPORT_COLUMNS]
+    queryset = tasks.order_by('-created_at', '-pk').values(*fields)
+
+    last = None
+    while True:
+        chunk = queryset
+        if last is not None:
+            chunk = chunk.filter(
+                Q(created_at__lt=last['created_at']) | Q(created_at=last['created_at'], pk__lt=last['id'])
+            )
+        rows = list(chunk[:EXPORT_CHUNK_SIZE])
+        yield from _format_rows(rows, TASK_EXPORT_COLUMNS)
+
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            break
+        last = rows[-1]
+
+
+def iter_assignment_rows(tasks):
+    """按分配ID分块读取指定任务的分配，逐行生成导出值"""
+    fields = [field for field, _, _ in ASSIGNMENT_EXPORT_COLUMNS]
+    queryset = TaskAssignment.objects.filter(
+        task_id__in=tasks.order_by().values('pk')
+    ).order_by('pk').values('id', *fields)
+
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        rows = list(chunk[:EXPORT_CHUNK_SIZE])
+        yield from _format_rows(rows, ASSIGNMENT_EXPORT_COLUMNS)
+
+        if len(rows) < EXPORT_CHUNK_SIZE:
+            break
+        last_pk = rows[-1]['id']
+
+
+def _format_rows(rows, columns):
+    """按导出列格式化values()行"""
+    for row in rows:
+        yield [
+            formatter(row[field]) if formatter and row[field] is not None else row[field]
+            for field, _, formatter in columns
+        ]
+
+
+def get_export_headers(columns):
+    """导出列的表头"""
+    return [header for _, header, _ in columns]
+
+
+class _Echo:
+    """csv.writer的伪缓冲区，write直接返回写入的内容"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    """逐行生成CSV内容（带BOM，Excel可直接打开）"""
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(headers, rows):
+    """
+    以只写模式逐行写入XLSX到临时文件，返回已定位到开头的文件对象
+    XLSX为压缩包格式，需要写完后才能发送
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ValueError('服务器未安装openpyxl，无法导出XLSX文件')
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append(headers)
+    for row in rows:
+        worksheet.append(row)
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return output
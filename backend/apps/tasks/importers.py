@@ -0,0 +1,343 @@
+"""
+任务批量导入
+逐行读取CSV/XLSX文件（不把整个文件载入内存），按块校验并解析为任务数据
+"""
+import csv
+import io
+import os
+import re
+from datetime import date, datetime, time
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from apps.departments.models import Profession
+from apps.users.models import User
+from .models import Task
+
+
+# 支持的文件格式
+SUPPORTED_FORMATS = ['csv', 'xlsx']
+
+# 表头别名：字段名 -> 可用的表头
+HEADER_ALIASES = {
+    'title': ['title', '任务标题', '标题'],
+    'description': ['description', '任务描述', '描述'],
+    'task_type': ['task_type', '任务类型'],
+    'priority': ['priority', '优先级'],
+    'profession': ['profession', '所属专业', '专业'],
+    'assignment_mode': ['assignment_mode', '分配模式'],
+    'start_date': ['start_date', '开始时间'],
+    'due_date': ['due_date', '截止时间'],
+    'estimated_hours': ['estimated_hours', '预估工时', '预估工时(小时)'],
+    'assignees': ['assignees', '执行人', '执行人工号'],
+    'primary_assignee': ['primary_assignee', '牵头人', '牵头人工号'],
+}
+
+REQUIRED_COLUMNS = ['title', 'start_date', 'due_date', 'assignees']
+
+# 执行人列中多个工号的分隔符
+ASSIGNEE_SEPARATOR = re.compile(r'[,;，；、\s]+')
+
+
+class ImportFileError(ValueError):
+    """导入文件无法解析"""
+
+
+def get_file_format(filename):
+    """根据文件扩展名获取导入文件格式"""
+    file_format = os.path.splitext(filename)[1].lower().lstrip('.')
+    if file_format not in SUPPORTED_FORMATS:
+        raise ImportFileError('仅支持CSV或XLSX格式的导入文件')
+    return file_format
+
+
+def iter_import_rows(fileobj, file_format):
+    """
+    逐行读取导入文件
+
+    Yields:
+        (文件中的行号, {字段名: 单元格值})，空行跳过
+    """
+    rows = _iter_xlsx(fileobj) if file_format == 'xlsx' else _iter_csv(fileobj)
+
+    header = next(rows, None)
+    if header is None:
+        raise ImportFileError('导入文件为空')
+
+    columns = _map_header(header)
+    missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        raise ImportFileError(
+            f"导入文件缺少必需列: {', '.join(HEADER_ALIASES[field][1] for field in missing)}"
+        )
+
+    for row_number, values in enumerate(rows, start=2):
+        row = {
+            field: _clean_cell(value)
+            for field, value in zip(columns, values)
+            if field
+        }
+        if any(value not in ('', None) for value in row.values()):
+            yield row_number, row
+
+
+def _iter_csv(fileobj):
+    """逐行读取CSV文件（UTF-8编码，兼容Excel导出的BOM）"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.reader(text)
+    except UnicodeDecodeError:
+        raise ImportFileError('文件编码错误，请将CSV文件保存为UTF-8编码')
+    except csv.Error as e:
+        raise ImportFileError(f'CSV文件无法解析: {e}')
+    finally:
+        # 避免关闭底层文件
+        text.detach()
+
+
+def _iter_xlsx(fileobj):
+    """以只读模式逐行读取XLSX文件的第一个工作表"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError('服务器未安装openpyxl，无法导入XLSX文件')
+
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFileError(f'XLSX文件无法解析: {e}')
+
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _map_header(header):
+    """将表头映射为字段名，无法识别的列为None"""
+    aliases = {
+        alias.lower(): field
+        for field, names in HEADER_ALIASES.items()
+        for alias in names
+    }
+    return [aliases.get(str(name or '').strip().lower()) for name in header]
+
+
+def _clean_cell(value):
+    """规范化单元格值：字符串去除首尾空白，XLSX中的整数值去掉小数部分"""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def count_import_rows(fileobj, file_format):
+    """统计导入文件中的数据行数（不含表头和空行）"""
+    return sum(1 for _ in iter_import_rows(fileobj, file_format))
+
+
+class TaskRowParser:
+    """
+    导入行解析器
+    执行人按块批量查询并缓存，专业一次性载入，校验通过的行转换为任务字段
+    """
+
+    def __init__(self, creator, publish=False):
+        if not creator.department_id:
+            raise ImportFileError('创建者未设置部门，无法导入任务')
+
+        self.creator = creator
+        self.publish = publish
+        self.users = {}
+        self.professions = {}
+        for profession_id, code, name in Profession.objects.values_list('id', 'code', 'name'):
+            self.professions.setdefault(name, profession_id)
+            self.professions[code] = profession_id
+
+        self.task_types = self._choice_map(Task.TaskType.choices)
+        self.priorities = self._choice_map(Task.Priority.choices)
+        self.assignment_modes = self._choice_map(Task.AssignmentMode.choices)
+
+    @staticmethod
+    def _choice_map(choices):
+        """选项值和显示名称都映射到选项值"""
+        mapping = {}
+        for value, label in choices:
+            mapping[value] = value
+            mapping[str(label)] = value
+        return mapping
+
+    def parse_chunk(self, rows):
+        """
+        解析一块导入行
+
+        Args:
+            rows: [(行号, 行数据)]
+
+        Returns:
+            (有效行列表, 错误列表)；有效行为(行号, 任务字段, 执行人列表, 牵头人ID)，
+            执行人列表为[(用户ID, 部门ID)]，错误为{'row': 行号, 'errors': [错误信息]}
+        """
+        self._load_users(rows)
+
+        parsed, errors = [], []
+        for row_number, row in rows:
+            row_errors = []
+            result = self._parse_row(row, row_errors)
+            if row_errors:
+                errors.append({'row': row_number, 'errors': row_errors})
+            else:
+                parsed.append((row_number,) + result)
+        return parsed, errors
+
+    def _load_users(self, rows):
+        """批量查询本块中尚未缓存的执行人（按工号或用户名）"""
+        keys = set()
+        for _, row in rows:
+            keys.update(self._split_assignees(row.get('assignees')))
+            if row.get('primary_assignee') not in ('', None):
+                keys.add(str(row['primary_assignee']))
+        keys -= set(self.users)
+        if not keys:
+            return
+
+        users = list(User.objects.filter(
+            Q(employee_id__in=keys) | Q(username__in=keys)
+        ).values_list('id', 'employee_id', 'username', 'department_id'))
+        for user_id, employee_id, username, department_id in users:
+            self.users[username] = (user_id, department_id)
+        # 工号优先于用户名
+        for user_id, employee_id, username, department_id in users:
+            self.users[employee_id] = (user_id, department_id)
+
+        for key in keys:
+            self.users.setdefault(key, None)
+
+    @staticmethod
+    def _split_assignees(value):
+        """拆分执行人列中的多个工号"""
+        return [key for key in ASSIGNEE_SEPARATOR.split(str(value or '')) if key]
+
+    def _parse_row(self, row, errors):
+        """校验并转换一行数据，错误信息追加到errors"""
+        title = str(row.get('title', ''))
+        if not title:
+            errors.append('任务标题不能为空')
+        elif len(title) > 200:
+            errors.append('任务标题不能超过200个字符')
+
+        task_type = self._parse_choice(row.get('task_type'), self.task_types, Task.TaskType.NORMAL, '任务类型', errors)
+        priority = self._parse_choice(row.get('priority'), self.priorities, Task.Priority.MEDIUM, '优先级', errors)
+
+        profession_id = None
+        if row.get('profession') not in ('', None):
+            profession_id = self.professions.get(str(row['profession']))
+            if profession_id is None:
+                errors.append(f"专业不存在: {row['profession']}")
+
+        start_date = self._parse_datetime(row.get('start_date'), '开始时间', errors)
+        due_date = self._parse_datetime(row.get('due_date'), '截止时间', errors)
+        if start_date and due_date and due_date <= start_date:
+            errors.append('截止时间必须晚于开始时间')
+
+        estimated_hours = None
+        if row.get('estimated_hours') not in ('', None):
+            try:
+                estimated_hours = int(row['estimated_hours'])
+                if estimated_hours < 0:
+                    raise ValueError
+            except (TypeError, ValueError):
+                errors.append('预估工时必须为非负整数')
+
+        assignees = []
+        keys = list(dict.fromkeys(self._split_assignees(row.get('assignees'))))
+        if not keys:
+            errors.append('必须指定至少一个执行人')
+        missing = [key for key in keys if self.users.get(key) is None]
+        if missing:
+            errors.append(f"执行人不存在: {', '.join(missing)}")
+        else:
+            assignees = [self.users[key] for key in keys]
+            no_department = [key for key, (_, department_id) in zip(keys, assignees) if not department_id]
+            if no_department:
+                errors.append(f"执行人未设置部门: {', '.join(no_department)}")
+
+        default_mode = Task.AssignmentMode.ONE_TO_MANY if len(keys) > 1 else Task.AssignmentMode.ONE_TO_ONE
+        assignment_mode = self._parse_choice(
+            row.get('assignment_mode'), self.assignment_modes, default_mode, '分配模式', errors
+        )
+
+        # 牵头人默认为第一个执行人
+        primary_id = assignees[0][0] if assignees else None
+        if row.get('primary_assignee') not in ('', None):
+            primary = self.users.get(str(row['primary_assignee']))
+            if primary is None or primary not in assignees:
+                errors.append('牵头人必须在执行人列表中')
+            else:
+                primary_id = primary[0]
+
+        if errors:
+            return None
+
+        task_fields = {
+            'title': title,
+            'description': str(row.get('description', '')),
+            'task_type': task_type,
+            'priority': priority,
+            'profession_id': profession_id,
+            'assignment_mode': assignment_mode,
+            'start_date': start_date,
+            'due_date': due_date,
+            'estimated_hours': estimated_hours,
+            'creator_id': self.creator.id,
+            'creator_department_id': self.creator.department_id,
+        }
+        if self.publish:
+            task_fields['status'] = Task.TaskStatus.PENDING
+            task_fields['published_at'] = timezone.now()
+
+        return task_fields, assignees, primary_id
+
+    @staticmethod
+    def _parse_choice(value, mapping, default, label, errors):
+        """解析选项值，空值使用默认值"""
+        if value in ('', None):
+            return default
+        choice = mapping.get(str(value))
+        if choice is None:
+            errors.append(f'{label}无效: {value}')
+        return choice
+
+    @staticmethod
+    def _parse_datetime(value, label, errors):
+        """解析日期时间，支持XLSX日期单元格和YYYY-MM-DD[ HH:MM[:SS]]格式"""
+        if value in ('', None):
+            errors.append(f'{label}不能为空')
+            return None
+
+        if isinstance(value, datetime):
+            result = value
+        elif isinstance(value, date):
+            result = datetime.combine(value, time.min)
+        else:
+            text = str(value).replace('/', '-')
+            try:
+                result = parse_datetime(text)
+                if result is None:
+                    day = parse_date(text)
+                    result = datetime.combine(day, time.min) if day else None
+            except ValueError:
+                result = None
+
+        if result is None:
+            errors.append(f'{label}格式错误: {value}')
+            return None
+
+        if timezone.is_naive(result):
+            result = timezone.make_aware(result)
+        return result
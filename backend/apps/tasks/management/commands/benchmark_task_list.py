@@ -0,0 +1,94 @@
+"""
+任务列表可见性查询基准测试
+生成N条测试任务，对比旧实现（OR连接+DISTINCT）与新实现（索引子查询UNION ALL）的执行计划和分页延迟，
+新实现的执行计划出现去重临时表时以非零状态退出，可作为回归检查
+"""
+import time
+import uuid
+
+from django.core.management.base import CommandError
+from django.db.models import Q
+
+from apps.tasks.models import Task
+from .benchmark_task_statistics import Command as StatisticsBenchmarkCommand
+
+
+# 执行计划中表示去重临时表/排序的标记（SQLite、MySQL）
+DISTINCT_PLAN_MARKERS = ['FOR DISTINCT', 'Using temporary']
+
+
+def legacy_visible_tasks(user):
+    """旧版可见性查询：OR条件连接分配表后DISTINCT去重"""
+    q_objects = Q(creator=user) | Q(assignments__assignee=user)
+    if user.is_dept_manager and user.department:
+        q_objects |= Q(creator_department=user.department)
+    return Task.objects.filter(q_objects).distinct()
+
+
+class Command(StatisticsBenchmarkCommand):
+    help = '生成测试任务并对比任务列表可见性查询新旧实现的执行计划和分页延迟'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100000, help='生成的任务数量')
+        parser.add_argument('--assignees', type=int, default=20, help='生成的执行人数量')
+        parser.add_argument('--repeat', type=int, default=50, help='每种实现的重复执行次数')
+        parser.add_argument('--page-size', type=int, default=20, help='每页任务数量')
+        parser.add_argument('--keep', action='store_true', help='保留生成的测试数据')
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8]
+        department, manager, assignees = self._seed(suffix, options['tasks'], options['assignees'])
+
+        try:
+            self.stdout.write(f"任务数: {options['tasks']}, 重复次数: {options['repeat']}")
+            regressions = []
+
+            for user in [manager, assignees[0]]:
+                for name, visible_tasks in [
+                    ('旧实现', legacy_visible_tasks),
+                    ('新实现', Task.objects.visible_to),
+                ]:
+                    queryset = visible_tasks(user).select_related(
+                        'creator', 'creator_department'
+                    ).with_progress().order_by('-created_at')
+
+                    plan = queryset[:options['page_size']].explain()
+                    uses_distinct = 'DISTINCT' in str(queryset.query) or any(
+                        marker in plan for marker in DISTINCT_PLAN_MARKERS
+                    )
+                    stats = self._measure_page(queryset, options['page_size'], options['repeat'])
+
+                    self.stdout.write(
+                        f"{user.get_role_display()} {name}: 总数 {stats['count']}, "
+                        f"p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms, "
+                        f"去重临时表 {'是' if uses_distinct else '否'}"
+                    )
+                    if options['verbosity'] > 1:
+                        self.stdout.write(plan)
+
+                    if name == '新实现' and uses_distinct:
+                        regressions.append(user.get_role_display())
+        finally:
+            if not options['keep']:
+                self._cleanup(department, manager, assignees)
+
+        if regressions:
+            raise CommandError(f"可见性查询执行计划出现去重临时表: {', '.join(regressions)}")
+
+    def _measure_page(self, queryset, page_size, repeat):
+        """模拟列表接口：统计总数并读取第一页，返回延迟分位数"""
+        durations = []
+        count = 0
+
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count = queryset.count()
+            list(queryset[:page_size])
+            durations.append((time.perf_counter() - start) * 1000)
+
+        durations.sort()
+        return {
+            'count': count,
+            'p50_ms': durations[len(durations) // 2],
+            'p95_ms': durations[min(int(len(durations) * 0.95), len(durations) - 1)],
+        }
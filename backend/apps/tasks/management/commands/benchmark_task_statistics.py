@@ -0,0 +1,173 @@
+"""
+任务统计接口基准测试
+生成N条测试任务，对比旧实现（逐项COUNT）与新实现（单次分组聚合）的耗时和查询次数
+"""
+import random
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.departments.models import Department
+from apps.tasks.models import Task, TaskAssignment
+from apps.tasks.services import TaskStatisticsService
+from apps.users.models import User
+
+
+def legacy_statistics(base_queryset, user):
+    """旧版统计实现：每个状态、优先级各执行一次COUNT"""
+    status_stats = {}
+    for status_code, status_name in Task.TaskStatus.choices:
+        status_stats[status_code] = {
+            'name': status_name,
+            'count': base_queryset.filter(status=status_code).count()
+        }
+
+    priority_stats = {}
+    for priority_code, priority_name in Task.Priority.choices:
+        priority_stats[priority_code] = {
+            'name': priority_name,
+            'count': base_queryset.filter(priority=priority_code).count()
+        }
+
+    overdue_count = base_queryset.filter(
+        due_date__lt=timezone.now(),
+        status__in=TaskStatisticsService.OVERDUE_STATUSES
+    ).count()
+
+    my_pending_tasks = base_queryset.filter(assignments__assignee=user).distinct().filter(
+        assignments__assignee=user,
+        assignments__status__in=TaskStatisticsService.PENDING_ASSIGNMENT_STATUSES
+    ).count()
+
+    return {
+        'total_tasks': base_queryset.count(),
+        'status_stats': status_stats,
+        'priority_stats': priority_stats,
+        'overdue_count': overdue_count,
+        'my_pending_tasks': my_pending_tasks
+    }
+
+
+class Command(BaseCommand):
+    help = '生成测试任务并对比任务统计新旧实现的耗时和查询次数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help='生成的任务数量')
+        parser.add_argument('--assignees', type=int, default=20, help='生成的执行人数量')
+        parser.add_argument('--repeat', type=int, default=5, help='每种实现的重复执行次数')
+        parser.add_argument('--keep', action='store_true', help='保留生成的测试数据')
+
+    def handle(self, *args, **options):
+        suffix = uuid.uuid4().hex[:8]
+        department, manager, assignees = self._seed(suffix, options['tasks'], options['assignees'])
+
+        try:
+            base_queryset = Task.objects.filter(
+                Q(creator=manager) |
+                Q(assignments__assignee=manager) |
+                Q(creator_department=department)
+            ).distinct()
+
+            legacy = self._measure(legacy_statistics, base_queryset, manager, options['repeat'])
+            current = self._measure(
+                TaskStatisticsService.get_statistics, base_queryset, manager, options['repeat']
+            )
+
+            if legacy['result'] != current['result']:
+                self.stderr.write(self.style.ERROR('新旧实现统计结果不一致'))
+
+            self.stdout.write(f"任务数: {options['tasks']}, 重复次数: {options['repeat']}")
+            for name, stats in [('旧实现', legacy), ('新实现', current)]:
+                self.stdout.write(
+                    f"{name}: 平均 {stats['avg_ms']:.1f} ms, "
+                    f"最大 {stats['max_ms']:.1f} ms, 查询次数 {stats['queries']}"
+                )
+        finally:
+            if not options['keep']:
+                self._cleanup(department, manager, assignees)
+
+    def _measure(self, func, base_queryset, user, repeat):
+        """执行统计并记录耗时和查询次数"""
+        durations = []
+        queries = 0
+        result = None
+
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                result = func(base_queryset, user)
+                durations.append((time.perf_counter() - start) * 1000)
+            queries = len(ctx.captured_queries)
+
+        return {
+            'avg_ms': sum(durations) / len(durations),
+            'max_ms': max(durations),
+            'queries': queries,
+            'result': result
+        }
+
+    @transaction.atomic
+    def _seed(self, suffix, task_count, assignee_count):
+        """批量生成测试数据（不触发信号）"""
+        department = Department.objects.create(name=f'基准测试-{suffix}', code=f'BENCH-{suffix}')
+        manager = User.objects.create(
+            username=f'bench_mgr_{suffix}',
+            employee_id=f'BM{suffix}',
+            real_name='基准测试负责人',
+            role=User.UserRole.DEPT_MANAGER,
+            department=department
+        )
+        assignees = [
+            User.objects.create(
+                username=f'bench_{suffix}_{i}',
+                employee_id=f'B{suffix}{i}',
+                real_name=f'基准测试执行人{i}',
+                department=department
+            )
+            for i in range(assignee_count)
+        ]
+
+        now = timezone.now()
+        statuses = [choice[0] for choice in Task.TaskStatus.choices]
+        priorities = [choice[0] for choice in Task.Priority.choices]
+        tasks = [
+            Task(
+                title=f'基准测试任务{i}',
+                description='基准测试',
+                creator=manager,
+                creator_department=department,
+                priority=random.choice(priorities),
+                status=random.choice(statuses),
+                start_date=now - timedelta(days=30),
+                due_date=now + timedelta(days=random.randint(-15, 15))
+            )
+            for i in range(task_count)
+        ]
+        Task.objects.bulk_create(tasks, batch_size=1000)
+
+        assignment_statuses = [choice[0] for choice in TaskAssignment.AssignmentStatus.choices]
+        assignments = []
+        for task in tasks:
+            for assignee in random.sample(assignees + [manager], k=min(3, len(assignees) + 1)):
+                assignments.append(TaskAssignment(
+                    task=task,
+                    assignee=assignee,
+                    assignee_department=department,
+                    status=random.choice(assignment_statuses)
+                ))
+        TaskAssignment.objects.bulk_create(assignments, batch_size=1000)
+
+        return department, manager, assignees
+
+    @transaction.atomic
+    def _cleanup(self, department, manager, assignees):
+        """删除生成的测试数据"""
+        Task.objects.filter(creator_department=department).delete()
+        User.objects.filter(id__in=[manager.id] + [user.id for user in assignees]).delete()
+        department.delete()
@@ -0,0 +1,60 @@
+"""
+批量导入任务
+读取CSV/XLSX文件，与导入接口相同按块校验并批量写入，在当前进程中同步执行
+"""
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from apps.tasks.importers import ImportFileError
+from apps.tasks.models import TaskImportJob
+from apps.tasks.services import TaskImportService
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = '从CSV/XLSX文件批量导入任务'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='导入文件路径')
+        parser.add_argument('--creator', required=True, help='任务创建者的工号或用户名')
+        parser.add_argument('--chunk-size', type=int, default=500, help='每批校验和写入的行数')
+        parser.add_argument('--publish', action='store_true', help='导入后直接发布任务')
+
+    def handle(self, *args, **options):
+        creator = User.objects.filter(
+            Q(employee_id=options['creator']) | Q(username=options['creator'])
+        ).first()
+        if creator is None:
+            raise CommandError(f"创建者不存在: {options['creator']}")
+
+        path = options['file']
+        if not os.path.isfile(path):
+            raise CommandError(f'文件不存在: {path}')
+
+        try:
+            with open(path, 'rb') as f:
+                job = TaskImportService.create_job(
+                    creator, File(f, name=os.path.basename(path)),
+                    chunk_size=options['chunk_size'],
+                    publish=options['publish'],
+                    run_async=False
+                )
+        except ImportFileError as e:
+            raise CommandError(str(e))
+
+        job = TaskImportService.run(job.pk)
+
+        for error in job.errors[:20]:
+            self.stdout.write(f"第 {error['row']} 行: {'；'.join(error['errors'])}")
+        if job.failed_count > 20:
+            self.stdout.write(f'……共 {job.failed_count} 行失败，完整错误见导入作业 {job.pk}')
+
+        if job.status == TaskImportJob.JobStatus.FAILED:
+            raise CommandError(f'导入失败: {job.error_message}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成: 共 {job.total_rows} 行，创建 {job.created_count} 个任务，失败 {job.failed_count} 行'
+        ))
@@ -0,0 +1,15 @@
+"""
+重建任务统计计数器
+根据任务表和任务分配表全量重算，用于初始化或校正增量维护产生的偏差
+"""
+from django.core.management.base import BaseCommand
+
+from apps.tasks.services import TaskStatisticsService
+
+
+class Command(BaseCommand):
+    help = '根据任务数据全量重建任务统计计数器'
+
+    def handle(self, *args, **options):
+        rows = TaskStatisticsService.rebuild_counters()
+        self.stdout.write(self.style.SUCCESS(f'任务统计计数器重建完成，共 {rows} 行'))
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:06
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def build_task_stats_counters(apps, schema_editor):
+    """根据现有任务数据初始化统计计数器"""
+    Task = apps.get_model('tasks', 'Task')
+    TaskAssignment = apps.get_model('tasks', 'TaskAssignment')
+    TaskStatsCounter = apps.get_model('tasks', 'TaskStatsCounter')
+
+    totals = {}
+    tasks = Task.objects.order_by()
+    scopes = [('global', None), ('department', 'creator_department_id'), ('user', 'creator_id')]
+    for scope_type, scope_field in scopes:
+        fields = [scope_field] if scope_field else []
+        for row in tasks.values(*fields, 'status', 'priority').annotate(count=Count('pk')):
+            key = (scope_type, row[scope_field] if scope_field else 0, row['status'], row['priority'])
+            totals[key] = totals.get(key, 0) + row['count']
+
+    assignments = TaskAssignment.objects.exclude(
+        assignee_id=F('task__creator_id')
+    ).order_by().values('assignee_id', 'task__status', 'task__priority').annotate(count=Count('pk'))
+    for row in assignments:
+        key = ('user', row['assignee_id'], row['task__status'], row['task__priority'])
+        totals[key] = totals.get(key, 0) + row['count']
+
+    TaskStatsCounter.objects.bulk_create(
+        [
+            TaskStatsCounter(scope_type=key[0], scope_id=key[1], status=key[2], priority=key[3], count=count)
+            for key, count in totals.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatsCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope_type', models.CharField(choices=[('global', '全局'), ('department', '部门'), ('user', '用户')], max_length=20, verbose_name='统计范围')),
+                ('scope_id', models.PositiveBigIntegerField(default=0, help_text='部门ID或用户ID，全局范围为0', verbose_name='范围ID')),
+                ('status', models.CharField(choices=[('draft', '草稿'), ('pending', '待接收'), ('accepted', '已接收'), ('in_progress', '进行中'), ('completed', '已完成'), ('reviewed', '已评价'), ('cancelled', '已取消'), ('overdue', '已逾期')], max_length=20, verbose_name='任务状态')),
+                ('priority', models.CharField(choices=[('low', '低'), ('medium', '中'), ('high', '高'), ('critical', '紧急')], max_length=20, verbose_name='优先级')),
+                ('count', models.IntegerField(default=0, verbose_name='任务数量')),
+            ],
+            options={
+                'verbose_name': '任务统计计数器',
+                'verbose_name_plural': '任务统计计数器',
+                'db_table': 'task_stats_counters',
+                'unique_together': {('scope_type', 'scope_id', 'status', 'priority')},
+            },
+        ),
+        migrations.RunPython(build_task_stats_counters, migrations.RunPython.noop),
+    ]
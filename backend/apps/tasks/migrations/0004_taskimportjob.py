@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 12:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('tasks', '0003_task_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskImportJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('file', models.FileField(upload_to='task_imports/%Y/%m/', verbose_name='导入文件')),
+                ('original_name', models.CharField(max_length=255, verbose_name='原始文件名')),
+                ('chunk_size', models.PositiveIntegerField(default=500, verbose_name='每批行数')),
+                ('publish', models.BooleanField(default=False, verbose_name='导入后直接发布')),
+                ('status', models.CharField(choices=[('pending', '等待处理'), ('processing', '处理中'), ('completed', '已完成'), ('failed', '失败')], default='pending', max_length=20, verbose_name='作业状态')),
+                ('total_rows', models.PositiveIntegerField(default=0, verbose_name='总行数')),
+                ('processed_rows', models.PositiveIntegerField(default=0, verbose_name='已处理行数')),
+                ('created_count', models.PositiveIntegerField(default=0, verbose_name='已创建任务数')),
+                ('failed_count', models.PositiveIntegerField(default=0, verbose_name='失败行数')),
+                ('errors', models.JSONField(blank=True, default=list, help_text='[{row: 行号, errors: [错误信息]}]，最多记录1000行', verbose_name='错误行')),
+                ('error_message', models.TextField(blank=True, verbose_name='作业错误')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='开始时间')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='结束时间')),
+                ('creator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_import_jobs', to=settings.AUTH_USER_MODEL, verbose_name='创建者')),
+            ],
+            options={
+                'verbose_name': '任务导入作业',
+                'verbose_name_plural': '任务导入作业',
+                'db_table': 'task_import_jobs',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -4,9 +4,119 @@
 """
 import uuid
 from django.db import models
+from django.db.models import BooleanField, Case, Count, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator, MaxValueValidator
 
 
+class TaskQuerySet(models.QuerySet):
+    """
+    任务查询集
+    封装可见性过滤以及详情、列表等场景下的关联加载
+    """
+
+    def with_detail_relations(self):
+        """
+        预加载任务详情所需的完整关联图
+        任务 -> 分配(执行人/部门/执行记录)、附件、评论、评价，查询次数与数据量无关
+        """
+        return self.select_related(
+            'creator__department',
+            'creator_department__parent',
+            'profession__department',
+            'review__reviewer__department',
+        ).prefetch_related(
+            models.Prefetch(
+                'assignments',
+                queryset=TaskAssignment.objects.select_related(
+                    'assignee__department',
+                    'assignee_department__parent',
+                    'execution',
+                )
+            ),
+            models.Prefetch(
+                'attachments',
+                queryset=TaskAttachment.objects.select_related('uploader')
+            ),
+            models.Prefetch(
+                'comments',
+                queryset=TaskComment.objects.select_related('author__department')
+            ),
+        )
+
+    def assigned_to(self, user, **assignment_filters):
+        """
+        分配给指定用户的任务
+        按执行人索引取任务ID子查询，代替连接分配表，结果无重复行，不需要DISTINCT
+        """
+        return self.filter(pk__in=TaskAssignment.objects.filter(
+            assignee=user, **assignment_filters
+        ).order_by().values('task_id'))
+
+    def related_to(self, user):
+        """用户创建或被分配的任务"""
+        return self.filter(pk__in=self._union_task_ids([
+            Task.objects.filter(creator=user).order_by().values('pk'),
+            TaskAssignment.objects.filter(assignee=user).order_by().values('task_id'),
+        ]))
+
+    def visible_to(self, user):
+        """
+        用户可见的任务：创建的、被分配的，部门负责人另可见本部门任务
+        各条件分别走索引取任务ID后UNION ALL合并，避免OR连接后DISTINCT导致的全表临时排序
+        """
+        if user.is_admin:
+            return self.all()
+
+        task_ids = [
+            Task.objects.filter(creator=user).order_by().values('pk'),
+            TaskAssignment.objects.filter(assignee=user).order_by().values('task_id'),
+        ]
+        if user.is_dept_manager and user.department_id:
+            task_ids.append(
+                Task.objects.filter(creator_department_id=user.department_id).order_by().values('pk')
+            )
+
+        return self.filter(pk__in=self._union_task_ids(task_ids))
+
+    @staticmethod
+    def _union_task_ids(querysets):
+        """合并多个任务ID子查询，IN子查询本身可容忍重复ID"""
+        return querysets[0].union(*querysets[1:], all=True)
+
+    def with_progress(self):
+        """
+        在SQL中计算分配完成数、分配总数和逾期标记
+        列表序列化时优先读取这些注解值，不再逐条统计
+        """
+        from django.utils import timezone
+
+        assignments = TaskAssignment.objects.filter(
+            task=OuterRef('pk')
+        ).order_by().values('task')
+
+        return self.annotate(
+            total_assignments=Coalesce(
+                Subquery(assignments.annotate(c=Count('id')).values('c')),
+                0
+            ),
+            completed_assignments=Coalesce(
+                Subquery(assignments.annotate(
+                    c=Count('id', filter=Q(status=TaskAssignment.AssignmentStatus.COMPLETED))
+                ).values('c')),
+                0
+            ),
+            overdue_flag=Case(
+                When(
+                    Q(due_date__lt=timezone.now()) & ~Q(status__in=Task.FINISHED_STATUSES),
+                    then=Value(True)
+                ),
+                default=Value(False),
+                output_field=BooleanField()
+            ),
+        )
+
+
 class Task(models.Model):
     """
     任务主表
@@ -38,6 +148,13 @@ class Task(models.Model):
         HIGH = 'high', '高'
         CRITICAL = 'critical', '紧急'
     
+    # 已结束状态，不再计入逾期
+    FINISHED_STATUSES = [
+        TaskStatus.COMPLETED,
+        TaskStatus.REVIEWED,
+        TaskStatus.CANCELLED,
+    ]
+    
     # 基本信息
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=200, verbose_name='任务标题')
@@ -111,12 +228,15 @@ class Task(models.Model):
     published_at = models.DateTimeField(null=True, blank=True, verbose_name='发布时间')
     completed_at = models.DateTimeField(null=True, blank=True, verbose_name='完成时间')
     
+    objects = TaskQuerySet.as_manager()
+    
     class Meta:
         db_table = 'tasks'
         verbose_name = '任务'
         verbose_name_plural = '任务'
         ordering = ['-created_at']
         indexes = [
+            models.Index(fields=['created_at']),
             models.Index(fields=['status', 'due_date']),
             models.Index(fields=['creator', 'status']),
             models.Index(fields=['creator_department', 'status']),
@@ -125,27 +245,109 @@ class Task(models.Model):
     def __str__(self):
         return self.title
     
+    # 统计计数器依赖的字段
+    STATS_FIELDS = ['status', 'priority', 'creator_id', 'creator_department_id']
+    
+    # 加载时记录原始值、用于脏字段检测的字段
+    TRACKED_FIELDS = STATS_FIELDS + ['due_date', 'published_at']
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """从数据库加载时记录跟踪字段的原始值"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance._get_tracked_values()
+        return instance
+    
+    def _get_tracked_values(self, fields=None):
+        """跟踪字段的当前取值（未加载的延迟字段不包含在内）"""
+        return {
+            field: self.__dict__[field]
+            for field in (self.TRACKED_FIELDS if fields is None else fields)
+            if field in self.__dict__
+        }
+    
+    def get_dirty_fields(self):
+        """与加载时相比发生变化的跟踪字段，返回 {字段: 原始值}，不需要查询数据库"""
+        loaded = getattr(self, '_loaded_values', None) or {}
+        return {
+            field: old_value
+            for field, old_value in loaded.items()
+            if self.__dict__.get(field) != old_value
+        }
+    
+    def get_stats_state(self, loaded=False):
+        """
+        统计相关字段的取值（未加载的字段为None）
+        loaded为True时返回加载时的原始值，实例不是从数据库加载的则返回None
+        """
+        if loaded:
+            values = getattr(self, '_loaded_values', None)
+            if values is None:
+                return None
+        else:
+            values = self.__dict__
+        return {field: values.get(field) for field in self.STATS_FIELDS}
+    
+    def save(self, *args, **kwargs):
+        """
+        保存任务
+        发布时间、更新时间与本次修改在同一条UPDATE中写入，保存后刷新跟踪字段的原始值
+        """
+        from django.utils import timezone
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+        
+        # 任务变为待接收（发布）时记录发布时间
+        if not self._state.adding and self.status == self.TaskStatus.PENDING and not self.published_at:
+            self.published_at = timezone.now()
+            if update_fields:
+                update_fields.add('published_at')
+        
+        # 指定更新字段时同时刷新更新时间
+        if update_fields:
+            update_fields.add('updated_at')
+            kwargs['update_fields'] = update_fields
+        
+        super().save(*args, **kwargs)
+        
+        if update_fields is None:
+            self._loaded_values = self._get_tracked_values()
+        else:
+            saved = {self._meta.get_field(name).attname for name in update_fields}
+            loaded = getattr(self, '_loaded_values', None) or {}
+            loaded.update(self._get_tracked_values(
+                [field for field in self.TRACKED_FIELDS if field in saved]
+            ))
+            self._loaded_values = loaded
+    
     @property
     def is_overdue(self):
         """是否已逾期"""
         from django.utils import timezone
-        return self.due_date < timezone.now() and self.status not in [
-            self.TaskStatus.COMPLETED, 
-            self.TaskStatus.REVIEWED, 
-            self.TaskStatus.CANCELLED
-        ]
+        return self.due_date < timezone.now() and self.status not in self.FINISHED_STATUSES
     
     @property
     def progress_percentage(self):
         """任务进度百分比"""
-        if self.status == self.TaskStatus.COMPLETED:
+        if self.status == self.TaskStatus.IN_PROGRESS:
+            # 根据子任务完成情况计算，复用已加载的分配列表
+            assignments = list(self.assignments.all())
+            completed_count = sum(
+                1 for assignment in assignments
+                if assignment.status == TaskAssignment.AssignmentStatus.COMPLETED
+            )
+            return self.calculate_progress(self.status, completed_count, len(assignments))
+        return self.calculate_progress(self.status, 0, 0)
+    
+    @classmethod
+    def calculate_progress(cls, status, completed_count, total_count):
+        """根据分配完成情况计算进度百分比"""
+        if status == cls.TaskStatus.COMPLETED:
             return 100
-        elif self.status == self.TaskStatus.IN_PROGRESS:
-            # 根据子任务完成情况计算
-            assignments = self.assignments.all()
-            if assignments:
-                completed_count = assignments.filter(status=TaskAssignment.AssignmentStatus.COMPLETED).count()
-                return int((completed_count / assignments.count()) * 100)
+        elif status == cls.TaskStatus.IN_PROGRESS and total_count:
+            return int((completed_count / total_count) * 100)
         return 0
     
     def get_all_assignees(self):
@@ -226,6 +428,10 @@ class TaskAssignment(models.Model):
         verbose_name_plural = '任务分配'
         unique_together = [['task', 'assignee']]
         ordering = ['-assigned_at']
+        indexes = [
+            # 按执行人取任务ID（可见性子查询）时使用覆盖索引
+            models.Index(fields=['assignee', 'task']),
+        ]
     
     def __str__(self):
         return f"{self.task.title} -> {self.assignee.real_name}"
@@ -576,3 +782,118 @@ class TaskTemplate(models.Model):
         self.save(update_fields=['usage_count'])
 
         return task
+
+
+class TaskStatsCounter(models.Model):
+    """
+    任务统计计数器
+    按范围(全局/部门/用户)、状态、优先级预先汇总任务数量，由信号增量维护
+    """
+    class ScopeType(models.TextChoices):
+        GLOBAL = 'global', '全局'
+        DEPARTMENT = 'department', '部门'
+        USER = 'user', '用户'
+    
+    # 统计范围
+    scope_type = models.CharField(
+        max_length=20,
+        choices=ScopeType.choices,
+        verbose_name='统计范围'
+    )
+    scope_id = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='范围ID',
+        help_text='部门ID或用户ID，全局范围为0'
+    )
+    
+    # 统计维度
+    status = models.CharField(
+        max_length=20,
+        choices=Task.TaskStatus.choices,
+        verbose_name='任务状态'
+    )
+    priority = models.CharField(
+        max_length=20,
+        choices=Task.Priority.choices,
+        verbose_name='优先级'
+    )
+    
+    # 计数
+    count = models.IntegerField(default=0, verbose_name='任务数量')
+    
+    class Meta:
+        db_table = 'task_stats_counters'
+        verbose_name = '任务统计计数器'
+        verbose_name_plural = '任务统计计数器'
+        unique_together = [['scope_type', 'scope_id', 'status', 'priority']]
+    
+    def __str__(self):
+        return f"{self.get_scope_type_display()}({self.scope_id}) - {self.status}/{self.priority}: {self.count}"
+
+
+class TaskImportJob(models.Model):
+    """
+    任务批量导入作业
+    上传的CSV/XLSX文件由Celery任务逐行解析、按块写入，作业记录导入进度和错误行
+    """
+    class JobStatus(models.TextChoices):
+        PENDING = 'pending', '等待处理'
+        PROCESSING = 'processing', '处理中'
+        COMPLETED = 'completed', '已完成'
+        FAILED = 'failed', '失败'
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file = models.FileField(upload_to='task_imports/%Y/%m/', verbose_name='导入文件')
+    original_name = models.CharField(max_length=255, verbose_name='原始文件名')
+    creator = models.ForeignKey(
+        'users.User',
+        on_delete=models.CASCADE,
+        related_name='task_import_jobs',
+        verbose_name='创建者'
+    )
+    
+    # 导入选项
+    chunk_size = models.PositiveIntegerField(default=500, verbose_name='每批行数')
+    publish = models.BooleanField(default=False, verbose_name='导入后直接发布')
+    
+    # 进度
+    status = models.CharField(
+        max_length=20,
+        choices=JobStatus.choices,
+        default=JobStatus.PENDING,
+        verbose_name='作业状态'
+    )
+    total_rows = models.PositiveIntegerField(default=0, verbose_name='总行数')
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name='已处理行数')
+    created_count = models.PositiveIntegerField(default=0, verbose_name='已创建任务数')
+    failed_count = models.PositiveIntegerField(default=0, verbose_name='失败行数')
+    errors = models.JSONField(
+        default=list,
+        blank=True,
+        verbose_name='错误行',
+        help_text='[{row: 行号, errors: [错误信息]}]，最多记录1000行'
+    )
+    error_message = models.TextField(blank=True, verbose_name='作业错误')
+    
+    # 时间戳
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='开始时间')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='结束时间')
+    
+    class Meta:
+        db_table = 'task_import_jobs'
+        verbose_name = '任务导入作业'
+        verbose_name_plural = '任务导入作业'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.original_name} - {self.get_status_display()}"
+    
+    @property
+    def progress_percentage(self):
+        """导入进度百分比"""
+        if self.status == self.JobStatus.COMPLETED:
+            return 100
+        if not self.total_rows:
+            return 0
+        return int(self.processed_rows / self.total_rows * 100)
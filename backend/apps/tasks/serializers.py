@@ -1,13 +1,15 @@
 """
 任务相关序列化器
 """
+from django.db import transaction
 from rest_framework import serializers
 from django.utils import timezone
 
 from .models import (
     Task, TaskAssignment, TaskExecution, TaskReview, 
-    TaskAttachment, TaskComment, TaskTemplate
+    TaskAttachment, TaskComment, TaskTemplate, TaskImportJob
 )
+from .services import TaskAssignmentService, UnknownAssigneeError
 from apps.users.serializers import UserSimpleSerializer
 from apps.departments.serializers import DepartmentSimpleSerializer, ProfessionSimpleSerializer
 
@@ -52,8 +54,11 @@ class TaskCommentSerializer(serializers.ModelSerializer):
     
     def get_replies(self, obj):
         """获取回复"""
-        if obj.parent is None:  # 只为顶级评论获取回复
-            replies = obj.replies.all().order_by('created_at')
+        if obj.parent_id is None:  # 只为顶级评论获取回复
+            # 任务详情已在内存中组装好回复树时直接使用
+            replies = getattr(obj, 'prefetched_replies', None)
+            if replies is None:
+                replies = obj.replies.select_related('author__department').order_by('created_at')
             return TaskCommentSerializer(replies, many=True, context=self.context).data
         return []
     
@@ -148,7 +153,28 @@ class TaskReviewSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskProgressMixin:
+    """
+    任务进度字段
+    查询集经过with_progress()注解时直接读取注解值，否则回退到模型属性
+    """
+    
+    def get_is_overdue(self, obj):
+        """是否逾期"""
+        overdue_flag = getattr(obj, 'overdue_flag', None)
+        if overdue_flag is None:
+            return obj.is_overdue
+        return overdue_flag
+    
+    def get_progress_percentage(self, obj):
+        """任务进度百分比"""
+        total_assignments = getattr(obj, 'total_assignments', None)
+        if total_assignments is None:
+            return obj.progress_percentage
+        return Task.calculate_progress(obj.status, obj.completed_assignments, total_assignments)
+
+
+class TaskSerializer(TaskProgressMixin, serializers.ModelSerializer):
     """任务序列化器"""
     creator = UserSimpleSerializer(read_only=True)
     creator_department = DepartmentSimpleSerializer(read_only=True)
@@ -159,8 +185,8 @@ class TaskSerializer(serializers.ModelSerializer):
     review = TaskReviewSerializer(read_only=True)
     
     # 计算字段
-    is_overdue = serializers.BooleanField(read_only=True)
-    progress_percentage = serializers.IntegerField(read_only=True)
+    is_overdue = serializers.SerializerMethodField()
+    progress_percentage = serializers.SerializerMethodField()
     
     class Meta:
         model = Task
@@ -185,6 +211,19 @@ class TaskSerializer(serializers.ModelSerializer):
         
         return super().create(validated_data)
     
+    def to_representation(self, instance):
+        """序列化前在内存中组装评论回复树"""
+        prefetched = getattr(instance, '_prefetched_objects_cache', {})
+        if 'comments' in prefetched:
+            replies_map = {}
+            for comment in prefetched['comments']:
+                if comment.parent_id is not None:
+                    replies_map.setdefault(comment.parent_id, []).append(comment)
+            for comment in prefetched['comments']:
+                comment.prefetched_replies = replies_map.get(comment.id, [])
+        
+        return super().to_representation(instance)
+    
     def validate(self, attrs):
         """验证任务数据"""
         start_date = attrs.get('start_date')
@@ -196,12 +235,12 @@ class TaskSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class TaskSimpleSerializer(serializers.ModelSerializer):
+class TaskSimpleSerializer(TaskProgressMixin, serializers.ModelSerializer):
     """任务简单序列化器"""
     creator_name = serializers.CharField(source='creator.real_name', read_only=True)
     department_name = serializers.CharField(source='creator_department.name', read_only=True)
-    is_overdue = serializers.BooleanField(read_only=True)
-    progress_percentage = serializers.IntegerField(read_only=True)
+    is_overdue = serializers.SerializerMethodField()
+    progress_percentage = serializers.SerializerMethodField()
     
     class Meta:
         model = Task
@@ -262,25 +301,13 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         validated_data['creator'] = user
         validated_data['creator_department'] = user.department
         
-        task = super().create(validated_data)
-        
-        # 创建任务分配
-        from apps.users.models import User
-        
-        for assignee_id in assignee_ids:
-            try:
-                assignee = User.objects.get(id=assignee_id)
-                is_primary = (assignee_id == primary_assignee_id)
-                
-                TaskAssignment.objects.create(
-                    task=task,
-                    assignee=assignee,
-                    assignee_department=assignee.department,
-                    role=TaskAssignment.AssignmentRole.PRIMARY if is_primary else TaskAssignment.AssignmentRole.COLLABORATOR,
-                    is_primary=is_primary
-                )
-            except User.DoesNotExist:
-                continue
+        # 任务和分配在同一事务中创建，执行人不存在时整体回滚
+        try:
+            with transaction.atomic():
+                task = super().create(validated_data)
+                TaskAssignmentService.bulk_assign(task, assignee_ids, primary_assignee_id)
+        except UnknownAssigneeError as e:
+            raise serializers.ValidationError({'assignee_ids': str(e)})
         
         return task
 
@@ -307,3 +334,19 @@ class TaskTemplateSerializer(serializers.ModelSerializer):
         validated_data['department'] = user.department
         
         return super().create(validated_data)
+
+
+class TaskImportJobSerializer(serializers.ModelSerializer):
+    """任务导入作业序列化器"""
+    creator = UserSimpleSerializer(read_only=True)
+    progress_percentage = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = TaskImportJob
+        fields = [
+            'id', 'original_name', 'creator', 'chunk_size', 'publish', 'status',
+            'total_rows', 'processed_rows', 'created_count', 'failed_count',
+            'progress_percentage', 'errors', 'error_message',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,684 @@
+"""
+任务服务
+封装任务统计等跨视图复用的业务逻辑
+"""
+import logging
+import os
+from typing import Dict, Any, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .importers import ImportFileError, TaskRowParser, count_import_rows, get_file_format, iter_import_rows
+from .models import Task, TaskAssignment, TaskImportJob, TaskStatsCounter
+
+logger = logging.getLogger(__name__)
+
+
+class TaskStatisticsService:
+    """
+    任务统计服务类
+    """
+
+    # 计入逾期统计的状态
+    OVERDUE_STATUSES = [
+        Task.TaskStatus.PENDING,
+        Task.TaskStatus.ACCEPTED,
+        Task.TaskStatus.IN_PROGRESS,
+        Task.TaskStatus.OVERDUE,
+    ]
+
+    # 计入"我的待办"的分配状态
+    PENDING_ASSIGNMENT_STATUSES = [
+        TaskAssignment.AssignmentStatus.PENDING,
+        TaskAssignment.AssignmentStatus.ACCEPTED,
+        TaskAssignment.AssignmentStatus.IN_PROGRESS,
+    ]
+
+    @staticmethod
+    def get_statistics(base_queryset, user) -> Dict[str, Any]:
+        """
+        单次分组聚合计算任务统计
+
+        Args:
+            base_queryset: 用户可见的任务查询集（可以带有连接和去重）
+            user: 当前用户
+
+        Returns:
+            与统计接口一致的统计数据字典
+        """
+        # 带连接去重的查询集改为主键子查询，避免连接放大分组计数
+        if base_queryset.query.distinct:
+            tasks = Task.objects.filter(pk__in=base_queryset.values('pk')).order_by()
+        else:
+            tasks = base_queryset.order_by()
+
+        my_pending_assignment = TaskAssignment.objects.filter(
+            task=OuterRef('pk'),
+            assignee=user,
+            status__in=TaskStatisticsService.PENDING_ASSIGNMENT_STATUSES
+        )
+
+        rows = tasks.values('status', 'priority').annotate(
+            count=Count('pk'),
+            overdue=Count('pk', filter=Q(
+                due_date__lt=timezone.now(),
+                status__in=TaskStatisticsService.OVERDUE_STATUSES
+            )),
+            my_pending=Count('pk', filter=Q(Exists(my_pending_assignment))),
+        )
+
+        status_counts = {}
+        priority_counts = {}
+        total_tasks = overdue_count = my_pending_tasks = 0
+
+        for row in rows:
+            status_counts[row['status']] = status_counts.get(row['status'], 0) + row['count']
+            priority_counts[row['priority']] = priority_counts.get(row['priority'], 0) + row['count']
+            total_tasks += row['count']
+            overdue_count += row['overdue']
+            my_pending_tasks += row['my_pending']
+
+        return TaskStatisticsService._build_response(
+            status_counts, priority_counts, total_tasks, overdue_count, my_pending_tasks
+        )
+
+    @staticmethod
+    def get_counter_statistics(scope_type: str, scope_id: int, user) -> Dict[str, Any]:
+        """
+        从统计计数器读取任务统计
+
+        逾期数量取计数器中"已逾期"状态的任务数，依赖逾期状态流转保持及时
+
+        Args:
+            scope_type: 统计范围类型
+            scope_id: 范围ID
+            user: 当前用户
+
+        Returns:
+            与统计接口一致的统计数据字典
+        """
+        counts = TaskStatisticsService.get_counter_counts(scope_type, scope_id)
+
+        status_counts = {}
+        priority_counts = {}
+        for (status, priority), count in counts.items():
+            status_counts[status] = status_counts.get(status, 0) + count
+            priority_counts[priority] = priority_counts.get(priority, 0) + count
+
+        # 执行人对同一任务只有一条分配，按分配计数即为任务数
+        my_pending_tasks = TaskAssignment.objects.filter(
+            assignee=user,
+            status__in=TaskStatisticsService.PENDING_ASSIGNMENT_STATUSES
+        ).count()
+
+        return TaskStatisticsService._build_response(
+            status_counts,
+            priority_counts,
+            sum(counts.values()),
+            status_counts.get(Task.TaskStatus.OVERDUE, 0),
+            my_pending_tasks
+        )
+
+    @staticmethod
+    def get_counter_counts(scope_type: str, scope_id: int) -> Dict[tuple, int]:
+        """读取指定范围的计数器，返回 {(状态, 优先级): 数量}"""
+        rows = TaskStatsCounter.objects.filter(
+            scope_type=scope_type,
+            scope_id=scope_id,
+            count__gt=0
+        ).values_list('status', 'priority', 'count')
+        return {(status, priority): count for status, priority, count in rows}
+
+    @staticmethod
+    def _build_response(status_counts, priority_counts, total_tasks, overdue_count, my_pending_tasks):
+        """按统计接口格式组装结果"""
+        return {
+            'total_tasks': total_tasks,
+            'status_stats': {
+                code: {'name': name, 'count': status_counts.get(code, 0)}
+                for code, name in Task.TaskStatus.choices
+            },
+            'priority_stats': {
+                code: {'name': name, 'count': priority_counts.get(code, 0)}
+                for code, name in Task.Priority.choices
+            },
+            'overdue_count': overdue_count,
+            'my_pending_tasks': my_pending_tasks
+        }
+
+    @staticmethod
+    def adjust_counters(
+        scope_type: str,
+        scope_ids: Iterable[int],
+        status: str,
+        priority: str,
+        delta: int
+    ):
+        """
+        原子增减一组计数器
+
+        Args:
+            scope_type: 统计范围类型
+            scope_ids: 范围ID列表
+            status: 任务状态
+            priority: 优先级
+            delta: 增量（可为负数）
+        """
+        scope_ids = [scope_id for scope_id in set(scope_ids) if scope_id is not None]
+        if not scope_ids or not delta:
+            return
+
+        if delta > 0:
+            # 先确保计数行存在，再统一用F()表达式自增，避免并发丢失计数
+            TaskStatsCounter.objects.bulk_create(
+                [
+                    TaskStatsCounter(
+                        scope_type=scope_type,
+                        scope_id=scope_id,
+                        status=status,
+                        priority=priority
+                    )
+                    for scope_id in scope_ids
+                ],
+                ignore_conflicts=True
+            )
+
+        TaskStatsCounter.objects.filter(
+            scope_type=scope_type,
+            scope_id__in=scope_ids,
+            status=status,
+            priority=priority
+        ).update(count=F('count') + delta)
+
+    @staticmethod
+    def collect_task_deltas(
+        deltas: Dict[tuple, int],
+        state: Dict[str, Any],
+        assignee_ids: Iterable[int] = (),
+        delta: int = 1
+    ):
+        """
+        将一个任务在各统计范围的计数增量累加到deltas，供apply_counter_deltas批量应用
+
+        Args:
+            deltas: {(范围类型, 范围ID, 状态, 优先级): 增量}
+            state: 任务统计字段取值
+            assignee_ids: 任务执行人ID（创建者本人也是执行人时只计一次）
+            delta: 增量
+        """
+        scopes = [
+            (TaskStatsCounter.ScopeType.GLOBAL, 0),
+            (TaskStatsCounter.ScopeType.DEPARTMENT, state['creator_department_id']),
+            (TaskStatsCounter.ScopeType.USER, state['creator_id']),
+        ] + [
+            (TaskStatsCounter.ScopeType.USER, assignee_id)
+            for assignee_id in set(assignee_ids) if assignee_id != state['creator_id']
+        ]
+        for scope_type, scope_id in scopes:
+            if scope_id is None:
+                continue
+            key = (scope_type, scope_id, state['status'], state['priority'])
+            deltas[key] = deltas.get(key, 0) + delta
+
+    @staticmethod
+    def apply_counter_deltas(deltas: Dict[tuple, int]):
+        """
+        批量应用计数器增量，增量相同的范围合并为一条UPDATE
+
+        Args:
+            deltas: {(范围类型, 范围ID, 状态, 优先级): 增量}
+        """
+        groups = {}
+        for (scope_type, scope_id, status, priority), delta in deltas.items():
+            if delta:
+                groups.setdefault((scope_type, status, priority, delta), []).append(scope_id)
+
+        for (scope_type, status, priority, delta), scope_ids in groups.items():
+            TaskStatisticsService.adjust_counters(scope_type, scope_ids, status, priority, delta)
+
+    @staticmethod
+    def apply_task_change(
+        old_state: Optional[Dict[str, Any]],
+        new_state: Optional[Dict[str, Any]],
+        assignee_ids: Iterable[int] = ()
+    ):
+        """
+        根据任务统计字段的前后取值增量更新计数器
+
+        Args:
+            old_state: 变更前的统计字段取值，新建任务为None
+            new_state: 变更后的统计字段取值，删除任务为None
+            assignee_ids: 任务执行人ID（创建者以外的用户范围成员）
+        """
+        if old_state == new_state:
+            return
+
+        assignee_ids = list(assignee_ids)
+
+        for state, delta in [(old_state, -1), (new_state, 1)]:
+            if state is None:
+                continue
+
+            key = (state['status'], state['priority'])
+            TaskStatisticsService.adjust_counters(
+                TaskStatsCounter.ScopeType.GLOBAL, [0], *key, delta
+            )
+            TaskStatisticsService.adjust_counters(
+                TaskStatsCounter.ScopeType.DEPARTMENT, [state['creator_department_id']], *key, delta
+            )
+            TaskStatisticsService.adjust_counters(
+                TaskStatsCounter.ScopeType.USER, [state['creator_id']] + assignee_ids, *key, delta
+            )
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_counters() -> int:
+        """
+        根据任务表和任务分配表全量重建统计计数器
+
+        Returns:
+            重建后的计数行数
+        """
+        totals = {}
+
+        def add(scope_type, scope_id, status, priority, count):
+            key = (scope_type, scope_id, status, priority)
+            totals[key] = totals.get(key, 0) + count
+
+        tasks = Task.objects.order_by()
+        for row in tasks.values('status', 'priority').annotate(count=Count('pk')):
+            add(TaskStatsCounter.ScopeType.GLOBAL, 0, row['status'], row['priority'], row['count'])
+
+        for row in tasks.values('creator_department_id', 'status', 'priority').annotate(count=Count('pk')):
+            add(
+                TaskStatsCounter.ScopeType.DEPARTMENT, row['creator_department_id'],
+                row['status'], row['priority'], row['count']
+            )
+
+        for row in tasks.values('creator_id', 'status', 'priority').annotate(count=Count('pk')):
+            add(
+                TaskStatsCounter.ScopeType.USER, row['creator_id'],
+                row['status'], row['priority'], row['count']
+            )
+
+        # 创建者本人也是执行人时只计一次
+        assignments = TaskAssignment.objects.exclude(
+            assignee_id=F('task__creator_id')
+        ).order_by().values('assignee_id', 'task__status', 'task__priority').annotate(count=Count('pk'))
+        for row in assignments:
+            add(
+                TaskStatsCounter.ScopeType.USER, row['assignee_id'],
+                row['task__status'], row['task__priority'], row['count']
+            )
+
+        TaskStatsCounter.objects.all().delete()
+        TaskStatsCounter.objects.bulk_create(
+            [
+                TaskStatsCounter(
+                    scope_type=scope_type,
+                    scope_id=scope_id,
+                    status=status,
+                    priority=priority,
+                    count=count
+                )
+                for (scope_type, scope_id, status, priority), count in totals.items()
+            ],
+            batch_size=1000
+        )
+
+        logger.info(f"任务统计计数器已重建: {len(totals)} 行")
+        return len(totals)
+
+
+class UnknownAssigneeError(ValueError):
+    """执行人ID不存在"""
+
+    def __init__(self, missing_ids):
+        self.missing_ids = missing_ids
+        super().__init__(f"执行人不存在: {', '.join(str(user_id) for user_id in missing_ids)}")
+
+
+class TaskAssignmentService:
+    """
+    任务分配服务
+    批量创建分配，避免逐个查询执行人和逐行触发信号
+    """
+
+    @staticmethod
+    @transaction.atomic
+    def bulk_assign(
+        task: Task,
+        assignee_ids: Iterable[int],
+        primary_assignee_id: Optional[int] = None
+    ) -> List[TaskAssignment]:
+        """
+        为任务批量创建分配
+
+        一次查询取出全部执行人、一次批量插入分配；bulk_create不触发post_save信号，
+        执行人统计计数器和任务分配通知在这里批量处理
+
+        Args:
+            task: 任务
+            assignee_ids: 执行人ID列表（重复ID只分配一次）
+            primary_assignee_id: 牵头人ID
+
+        Returns:
+            创建的任务分配列表
+
+        Raises:
+            UnknownAssigneeError: 存在不存在的执行人ID，此时不创建任何分配
+        """
+        from apps.users.models import User
+
+        assignee_ids = list(dict.fromkeys(assignee_ids))
+        assignees = User.objects.select_related('department').in_bulk(assignee_ids)
+
+        missing_ids = [user_id for user_id in assignee_ids if user_id not in assignees]
+        if missing_ids:
+            raise UnknownAssigneeError(missing_ids)
+
+        assignments = TaskAssignment.objects.bulk_create([
+            TaskAssignment(
+                task=task,
+                assignee=assignees[user_id],
+                assignee_department=assignees[user_id].department,
+                role=(
+                    TaskAssignment.AssignmentRole.PRIMARY if user_id == primary_assignee_id
+                    else TaskAssignment.AssignmentRole.COLLABORATOR
+                ),
+                is_primary=(user_id == primary_assignee_id)
+            )
+            for user_id in assignee_ids
+        ])
+
+        # 创建者本人也是执行人时只计一次
+        TaskStatisticsService.adjust_counters(
+            TaskStatsCounter.ScopeType.USER,
+            [user_id for user_id in assignee_ids if user_id != task.creator_id],
+            task.status, task.priority, 1
+        )
+
+        TaskAssignmentService.enqueue_assigned_notifications(assignments)
+
+        logger.info(f"任务分配已批量创建: {task.title} -> {len(assignments)} 人")
+        return assignments
+
+    @staticmethod
+    def enqueue_assigned_notifications(assignments: List[TaskAssignment]):
+        """按任务和分配角色合并任务分配通知，每组一个发件箱事件"""
+        from apps.notifications.services import NotificationService
+
+        groups = {}
+        task_sizes = {}
+        for assignment in assignments:
+            groups.setdefault((assignment.task_id, assignment.role), []).append(assignment)
+            task_sizes[assignment.task_id] = task_sizes.get(assignment.task_id, 0) + 1
+
+        NotificationService.enqueue_task_notifications([
+            {
+                'task_id': task_id,
+                'notification_type': 'task_assigned',
+                'recipient_ids': [assignment.assignee_id for assignment in role_assignments],
+                'sender_id': role_assignments[0].task.creator_id,
+                'extra_context': {
+                    'assignment_role': role_assignments[0].get_role_display(),
+                    'is_primary': role_assignments[0].is_primary,
+                    'assignee_count': task_sizes[task_id],
+                },
+            }
+            for (task_id, _), role_assignments in groups.items()
+        ])
+
+
+class TaskOverdueService:
+    """
+    任务逾期处理服务
+    由定时任务按块批量标记逾期，普通保存不再检查逾期
+    """
+    # 已发布且未完成的任务才会逾期
+    CANDIDATE_STATUSES = [
+        Task.TaskStatus.PENDING,
+        Task.TaskStatus.ACCEPTED,
+        Task.TaskStatus.IN_PROGRESS,
+    ]
+
+    # 每块处理的任务数量
+    CHUNK_SIZE = 1000
+
+    @staticmethod
+    def mark_overdue_tasks(chunk_size: Optional[int] = None) -> int:
+        """
+        将已过截止时间的未完成任务批量标记为逾期
+
+        按(status, due_date)索引每次取一块任务ID，用一条UPDATE改为逾期，
+        同一事务中批量调整统计计数器并写入逾期通知；已逾期的任务不会再次处理，可重复执行
+
+        Args:
+            chunk_size: 每块处理的任务数量
+
+        Returns:
+            标记为逾期的任务数
+        """
+        chunk_size = chunk_size or TaskOverdueService.CHUNK_SIZE
+        now = timezone.now()
+        candidates = Task.objects.filter(
+            status__in=TaskOverdueService.CANDIDATE_STATUSES,
+            due_date__lt=now
+        ).order_by()
+
+        marked = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    candidates.select_for_update(skip_locked=True).values(
+                        'id', 'status', 'priority', 'creator_id', 'creator_department_id', 'due_date'
+                    )[:chunk_size]
+                )
+                if not rows:
+                    break
+
+                task_ids = [row['id'] for row in rows]
+                Task.objects.filter(pk__in=task_ids).update(
+                    status=Task.TaskStatus.OVERDUE,
+                    updated_at=now
+                )
+                TaskOverdueService._apply_chunk(rows, now)
+
+            marked += len(rows)
+
+        if marked:
+            logger.info(f"已标记逾期任务: {marked} 个")
+        return marked
+
+    @staticmethod
+    def _apply_chunk(rows, now):
+        """调整一块逾期任务的统计计数器并写入逾期通知"""
+        from apps.notifications.services import NotificationService
+
+        assignee_map = {}
+        assignments = TaskAssignment.objects.filter(
+            task_id__in=[row['id'] for row in rows]
+        ).order_by().values_list('task_id', 'assignee_id')
+        for task_id, assignee_id in assignments:
+            assignee_map.setdefault(task_id, []).append(assignee_id)
+
+        deltas = {}
+        events = []
+        for row in rows:
+            assignee_ids = assignee_map.get(row['id'], [])
+            TaskStatisticsService.collect_task_deltas(deltas, row, assignee_ids, -1)
+            TaskStatisticsService.collect_task_deltas(
+                deltas, dict(row, status=Task.TaskStatus.OVERDUE), assignee_ids, 1
+            )
+
+            if assignee_ids:
+                events.append({
+                    'task_id': row['id'],
+                    'notification_type': 'task_overdue',
+                    'recipient_ids': assignee_ids + [row['creator_id']],
+                    'extra_context': {
+                        'overdue_duration': str(now - row['due_date'])
+                    },
+                })
+
+        TaskStatisticsService.apply_counter_deltas(deltas)
+        NotificationService.enqueue_task_notifications(events)
+
+
+class TaskImportService:
+    """
+    任务批量导入服务
+    上传文件先保存为导入作业，由Celery任务逐行解析，按块校验并批量写入任务和分配
+    """
+    # 每块行数上限
+    MAX_CHUNK_SIZE = 5000
+
+    # 作业中记录的错误行数上限
+    MAX_ERRORS = 1000
+
+    @staticmethod
+    def create_job(
+        creator,
+        uploaded_file,
+        chunk_size: Optional[int] = None,
+        publish: bool = False,
+        run_async: bool = True
+    ) -> TaskImportJob:
+        """
+        保存上传文件并创建导入作业
+
+        Args:
+            run_async: 是否在当前事务提交后提交到Celery处理（为False时由调用方执行run）
+
+        Raises:
+            ImportFileError: 文件格式不支持
+        """
+        get_file_format(uploaded_file.name)
+
+        job = TaskImportJob(
+            creator=creator,
+            original_name=os.path.basename(uploaded_file.name),
+            publish=publish
+        )
+        if chunk_size:
+            job.chunk_size = min(max(chunk_size, 1), TaskImportService.MAX_CHUNK_SIZE)
+        job.file.save(job.original_name, uploaded_file, save=False)
+        job.save()
+
+        if run_async:
+            transaction.on_commit(lambda: TaskImportService._dispatch(job.pk))
+        return job
+
+    @staticmethod
+    def _dispatch(job_id):
+        """提交导入作业到Celery，消息队列不可用时将作业标记为失败"""
+        from .tasks import process_task_import
+
+        try:
+            process_task_import.delay(str(job_id))
+        except Exception as e:
+            logger.error(f"提交任务导入作业失败: {e}")
+            TaskImportJob.objects.filter(pk=job_id).update(
+                status=TaskImportJob.JobStatus.FAILED,
+                error_message=f'提交导入作业失败: {e}',
+                finished_at=timezone.now()
+            )
+
+    @staticmethod
+    def run(job_id) -> TaskImportJob:
+        """
+        处理导入作业
+
+        逐行读取文件，每chunk_size行校验一次并在一个事务中批量写入，每块提交后更新作业进度；
+        校验失败的行记录到作业错误中，不影响其他行。只处理等待中的作业，重复执行不会重复导入
+
+        Returns:
+            处理后的导入作业
+        """
+        started = TaskImportJob.objects.filter(
+            pk=job_id, status=TaskImportJob.JobStatus.PENDING
+        ).update(status=TaskImportJob.JobStatus.PROCESSING, started_at=timezone.now())
+
+        job = TaskImportJob.objects.select_related('creator').get(pk=job_id)
+        if not started:
+            return job
+
+        try:
+            file_format = get_file_format(job.original_name)
+            parser = TaskRowParser(job.creator, publish=job.publish)
+
+            with job.file.open('rb') as fileobj:
+                job.total_rows = count_import_rows(fileobj, file_format)
+                TaskImportJob.objects.filter(pk=job.pk).update(total_rows=job.total_rows)
+
+            with job.file.open('rb') as fileobj:
+                chunk = []
+                for row in iter_import_rows(fileobj, file_format):
+                    chunk.append(row)
+                    if len(chunk) >= job.chunk_size:
+                        TaskImportService._import_chunk(job, parser, chunk)
+                        chunk = []
+                if chunk:
+                    TaskImportService._import_chunk(job, parser, chunk)
+
+            job.status = TaskImportJob.JobStatus.COMPLETED
+
+        except ImportFileError as e:
+            job.status = TaskImportJob.JobStatus.FAILED
+            job.error_message = str(e)
+        except Exception as e:
+            logger.error(f"任务导入作业失败: {job.pk}: {e}", exc_info=True)
+            job.status = TaskImportJob.JobStatus.FAILED
+            job.error_message = str(e)
+
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error_message', 'finished_at'])
+
+        logger.info(
+            f"任务导入作业结束: {job.original_name}, 创建 {job.created_count} 个任务, "
+            f"失败 {job.failed_count} 行"
+        )
+        return job
+
+    @staticmethod
+    def _import_chunk(job: TaskImportJob, parser: TaskRowParser, rows):
+        """校验一块导入行，在一个事务中批量写入任务和分配并更新作业进度"""
+        parsed, errors = parser.parse_chunk(rows)
+
+        with transaction.atomic():
+            tasks = Task.objects.bulk_create([
+                Task(**task_fields) for _, task_fields, _, _ in parsed
+            ])
+
+            assignments = []
+            deltas = {}
+            for task, (_, _, assignees, primary_id) in zip(tasks, parsed):
+                for user_id, department_id in assignees:
+                    is_primary = (user_id == primary_id)
+                    assignments.append(TaskAssignment(
+                        task=task,
+                        assignee_id=user_id,
+                        assignee_department_id=department_id,
+                        role=(
+                            TaskAssignment.AssignmentRole.PRIMARY if is_primary
+                            else TaskAssignment.AssignmentRole.COLLABORATOR
+                        ),
+                        is_primary=is_primary
+                    ))
+                TaskStatisticsService.collect_task_deltas(
+                    deltas, task.get_stats_state(), [user_id for user_id, _ in assignees]
+                )
+
+            TaskAssignment.objects.bulk_create(assignments)
+
+            # bulk_create不触发信号，统计计数器和分配通知在这里批量处理
+            TaskStatisticsService.apply_counter_deltas(deltas)
+            TaskAssignmentService.enqueue_assigned_notifications(assignments)
+
+            job.processed_rows += len(rows)
+            job.created_count += len(tasks)
+            job.failed_count += len(errors)
+            job.errors.extend(errors[:max(TaskImportService.MAX_ERRORS - len(job.errors), 0)])
+            job.save(update_fields=['processed_rows', 'created_count', 'failed_count', 'errors'])
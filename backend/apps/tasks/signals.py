@@ -1,13 +1,15 @@
 """
 任务相关信号处理器
-自动发送通知和石化通消息
+通知写入发件箱，事务提交后由Celery异步发送
 """
 import logging
-from django.db.models.signals import post_save, pre_save
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import Task, TaskAssignment, TaskExecution, TaskReview
+from .models import Task, TaskAssignment, TaskExecution, TaskReview, TaskStatsCounter
+from .services import TaskStatisticsService
 from apps.notifications.services import NotificationService
 
 logger = logging.getLogger(__name__)
@@ -21,11 +23,11 @@ def handle_task_assignment_created(sender, instance, created, **kwargs):
     if created:
         try:
             # 发送任务分配通知
-            NotificationService.send_task_notification(
-                task_id=str(instance.task.id),
+            NotificationService.enqueue_task_notification(
+                task_id=str(instance.task_id),
                 notification_type='task_assigned',
-                recipient_ids=[instance.assignee.id],
-                sender_id=instance.task.creator.id,
+                recipient_ids=[instance.assignee_id],
+                sender_id=instance.task.creator_id,
                 extra_context={
                     'assignee_name': instance.assignee.real_name,
                     'assignment_role': instance.get_role_display(),
@@ -33,7 +35,7 @@ def handle_task_assignment_created(sender, instance, created, **kwargs):
                 }
             )
             
-            logger.info(f"任务分配通知已发送: {instance.task.title} -> {instance.assignee.real_name}")
+            logger.info(f"任务分配通知已加入发件箱: {instance.task.title} -> {instance.assignee.real_name}")
             
         except Exception as e:
             logger.error(f"发送任务分配通知失败: {e}", exc_info=True)
@@ -60,33 +62,33 @@ def handle_task_assignment_status_changed(sender, instance, created, **kwargs):
                     instance.task.save(update_fields=['status', 'completed_at'])
                     
                     # 发送任务完成通知给创建者
-                    NotificationService.send_task_notification(
-                        task_id=str(instance.task.id),
+                    NotificationService.enqueue_task_notification(
+                        task_id=str(instance.task_id),
                         notification_type='task_completed',
-                        recipient_ids=[instance.task.creator.id],
-                        sender_id=instance.assignee.id,
+                        recipient_ids=[instance.task.creator_id],
+                        sender_id=instance.assignee_id,
                         extra_context={
                             'completed_by': instance.assignee.real_name,
                             'completed_at': instance.completed_at
                         }
                     )
                     
-                    logger.info(f"任务完成通知已发送: {instance.task.title}")
+                    logger.info(f"任务完成通知已加入发件箱: {instance.task.title}")
             
             # 检查状态是否变为已拒绝
             elif instance.status == TaskAssignment.AssignmentStatus.REJECTED:
                 # 发送任务拒绝通知给创建者
-                NotificationService.create_notification(
-                    recipient_id=instance.task.creator.id,
+                NotificationService.enqueue_notification(
+                    recipient_id=instance.task.creator_id,
                     notification_type='task_updated',
                     title=f"任务被拒绝：{instance.task.title}",
                     content=f"{instance.assignee.real_name} 拒绝了任务：{instance.task.title}",
-                    sender_id=instance.assignee.id,
-                    related_task_id=str(instance.task.id),
+                    sender_id=instance.assignee_id,
+                    related_task_id=str(instance.task_id),
                     channels=['system', 'shihuatong']
                 )
                 
-                logger.info(f"任务拒绝通知已发送: {instance.task.title}")
+                logger.info(f"任务拒绝通知已加入发件箱: {instance.task.title}")
                 
         except Exception as e:
             logger.error(f"处理任务分配状态变更失败: {e}", exc_info=True)
@@ -103,17 +105,17 @@ def handle_task_execution_updated(sender, instance, created, **kwargs):
             # 只在特定进度节点发送通知（25%, 50%, 75%）
             milestones = [25, 50, 75]
             if instance.progress_percentage in milestones:
-                NotificationService.create_notification(
-                    recipient_id=instance.assignment.task.creator.id,
+                NotificationService.enqueue_notification(
+                    recipient_id=instance.assignment.task.creator_id,
                     notification_type='task_updated',
                     title=f"任务进度更新：{instance.assignment.task.title}",
                     content=f"{instance.assignment.assignee.real_name} 更新了任务进度：{instance.progress_percentage}%",
-                    sender_id=instance.assignment.assignee.id,
-                    related_task_id=str(instance.assignment.task.id),
+                    sender_id=instance.assignment.assignee_id,
+                    related_task_id=str(instance.assignment.task_id),
                     channels=['system']
                 )
                 
-                logger.info(f"任务进度通知已发送: {instance.assignment.task.title} - {instance.progress_percentage}%")
+                logger.info(f"任务进度通知已加入发件箱: {instance.assignment.task.title} - {instance.progress_percentage}%")
         
     except Exception as e:
         logger.error(f"处理任务执行更新失败: {e}", exc_info=True)
@@ -134,11 +136,11 @@ def handle_task_review_created(sender, instance, created, **kwargs):
             assignee_ids = list(instance.task.assignments.values_list('assignee_id', flat=True))
             
             # 发送评价通知给所有执行人
-            NotificationService.send_task_notification(
-                task_id=str(instance.task.id),
+            NotificationService.enqueue_task_notification(
+                task_id=str(instance.task_id),
                 notification_type='task_reviewed',
                 recipient_ids=assignee_ids,
-                sender_id=instance.reviewer.id,
+                sender_id=instance.reviewer_id,
                 extra_context={
                     'reviewer_name': instance.reviewer.real_name,
                     'rating': instance.rating,
@@ -148,61 +150,111 @@ def handle_task_review_created(sender, instance, created, **kwargs):
                 }
             )
             
-            logger.info(f"任务评价通知已发送: {instance.task.title}")
+            logger.info(f"任务评价通知已加入发件箱: {instance.task.title}")
             
         except Exception as e:
             logger.error(f"发送任务评价通知失败: {e}", exc_info=True)
 
 
-@receiver(pre_save, sender=Task)
-def handle_task_status_change(sender, instance, **kwargs):
+@receiver(post_save, sender=Task)
+def update_task_stats_on_save(sender, instance, created, **kwargs):
     """
-    处理任务状态变更事件
+    任务保存后增量更新统计计数器
     """
     try:
-        if instance.pk:  # 只处理更新，不处理创建
-            old_instance = Task.objects.get(pk=instance.pk)
-            
-            # 检查是否逾期
-            if (instance.status != Task.TaskStatus.OVERDUE and 
-                old_instance.status != Task.TaskStatus.OVERDUE and
-                instance.is_overdue):
-                
-                instance.status = Task.TaskStatus.OVERDUE
-                
-                # 发送逾期通知
-                assignee_ids = list(instance.assignments.values_list('assignee_id', flat=True))
-                if assignee_ids:
-                    NotificationService.send_task_notification(
-                        task_id=str(instance.id),
-                        notification_type='task_overdue',
-                        recipient_ids=assignee_ids + [instance.creator.id],
-                        extra_context={
-                            'overdue_duration': timezone.now() - instance.due_date
-                        }
-                    )
-                    
-                    logger.info(f"任务逾期通知已发送: {instance.title}")
-            
-    except Task.DoesNotExist:
-        pass  # 新创建的任务
+        new_state = instance.get_stats_state()
+        old_state = None if created else instance.get_stats_state(loaded=True)
+        
+        update_fields = kwargs.get('update_fields')
+        if old_state and update_fields:
+            # 只有本次写入的字段发生变化，其余字段仍为数据库中的原始值
+            saved = {sender._meta.get_field(name).attname for name in update_fields}
+            new_state = {
+                field: new_state[field] if field in saved else old_state[field]
+                for field in new_state
+            }
+        
+        if not created and (old_state is None or None in old_state.values()):
+            # 未从数据库完整加载的实例无法计算增量，交由重建命令校正
+            logger.warning(f"任务统计字段原始值缺失，跳过计数器更新: {instance.pk}")
+        elif old_state != new_state:
+            assignee_ids = [] if created else list(
+                instance.assignments.exclude(
+                    assignee_id=new_state['creator_id']
+                ).values_list('assignee_id', flat=True)
+            )
+            TaskStatisticsService.apply_task_change(old_state, new_state, assignee_ids)
+        
     except Exception as e:
-        logger.error(f"处理任务状态变更失败: {e}", exc_info=True)
+        logger.error(f"更新任务统计计数器失败: {e}", exc_info=True)
 
 
-@receiver(post_save, sender=Task)
-def handle_task_published(sender, instance, created, **kwargs):
+def _is_task_deletion(origin):
     """
-    处理任务发布事件
+    删除是否由任务本身发起（任务实例或任务查询集的delete()）
+    此时任务分配随任务级联删除，执行人统计由任务的删除处理统一扣减
     """
-    if not created:
+    if isinstance(origin, QuerySet):
+        return origin.model is Task
+    return isinstance(origin, Task)
+
+
+@receiver(pre_delete, sender=Task)
+def update_task_stats_on_delete(sender, instance, origin=None, **kwargs):
+    """
+    任务删除前扣减统计计数器
+    由任务发起的删除一次查询执行人并批量扣减，其他级联删除的执行人范围由任务分配的删除处理
+    """
+    try:
+        old_state = instance.get_stats_state(loaded=True) or instance.get_stats_state()
+        assignee_ids = []
+        if _is_task_deletion(origin):
+            # 信号在执行DELETE之前统一发送，此时任务分配仍在数据库中
+            assignee_ids = list(
+                instance.assignments.exclude(
+                    assignee_id=old_state['creator_id']
+                ).values_list('assignee_id', flat=True)
+            )
+        TaskStatisticsService.apply_task_change(old_state, None, assignee_ids)
+        
+    except Exception as e:
+        logger.error(f"扣减任务统计计数器失败: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=TaskAssignment)
+def update_assignee_stats_on_assignment_created(sender, instance, created, **kwargs):
+    """
+    新增任务分配时将任务计入执行人的统计
+    """
+    if created:
         try:
-            # 检查任务是否从草稿状态变为待接收状态
-            if instance.status == Task.TaskStatus.PENDING and not instance.published_at:
-                instance.published_at = timezone.now()
-                instance.save(update_fields=['published_at'])
-                
-                logger.info(f"任务已发布: {instance.title}")
+            task = instance.task
+            if instance.assignee_id != task.creator_id:
+                TaskStatisticsService.adjust_counters(
+                    TaskStatsCounter.ScopeType.USER, [instance.assignee_id],
+                    task.status, task.priority, 1
+                )
                 
         except Exception as e:
-            logger.error(f"处理任务发布失败: {e}", exc_info=True)
+            logger.error(f"更新执行人任务统计失败: {e}", exc_info=True)
+
+
+@receiver(pre_delete, sender=TaskAssignment)
+def update_assignee_stats_on_assignment_deleted(sender, instance, origin=None, **kwargs):
+    """
+    删除任务分配时从执行人的统计中扣除任务
+    随任务级联删除时跳过，避免逐条查询任务
+    """
+    if _is_task_deletion(origin):
+        return
+    
+    try:
+        task = instance.task
+        if instance.assignee_id != task.creator_id:
+            TaskStatisticsService.adjust_counters(
+                TaskStatsCounter.ScopeType.USER, [instance.assignee_id],
+                task.status, task.priority, -1
+            )
+            
+    except Exception as e:
+        logger.error(f"扣减执行人任务统计失败: {e}", exc_info=True)
@@ -0,0 +1,36 @@
+"""
+任务异步任务
+"""
+import logging
+from celery import shared_task
+
+from .services import TaskImportService, TaskOverdueService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def mark_overdue_tasks():
+    """
+    按块批量标记已过截止时间的任务为逾期并发送逾期通知
+    由Celery Beat定时调度
+    """
+    try:
+        return TaskOverdueService.mark_overdue_tasks()
+    except Exception as e:
+        logger.error(f"标记逾期任务失败: {e}", exc_info=True)
+        raise
+
+
+@shared_task
+def process_task_import(job_id):
+    """
+    处理任务批量导入作业
+    由导入接口在事务提交后触发
+    """
+    try:
+        job = TaskImportService.run(job_id)
+        return job.created_count
+    except Exception as e:
+        logger.error(f"处理任务导入作业失败: {e}", exc_info=True)
+        raise
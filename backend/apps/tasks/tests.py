@@ -0,0 +1,215 @@
+"""
+任务模块测试
+"""
+from datetime import timedelta
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.departments.models import Department
+from apps.users.models import User
+from .management.commands.benchmark_task_list import DISTINCT_PLAN_MARKERS, legacy_visible_tasks
+from .models import Task, TaskAssignment, TaskComment, TaskStatsCounter
+from .services import TaskStatisticsService
+
+
+class TaskTestMixin:
+    """测试数据构建"""
+
+    user_seq = 0
+
+    @classmethod
+    def create_department(cls, code='D1'):
+        return Department.objects.create(name=f'部门{code}', code=code)
+
+    @classmethod
+    def create_user(cls, department, role=User.UserRole.EXECUTOR):
+        cls.user_seq += 1
+        return User.objects.create_user(
+            username=f'user{cls.user_seq}',
+            employee_id=f'E{cls.user_seq:05d}',
+            real_name=f'用户{cls.user_seq}',
+            department=department,
+            role=role,
+            password='password'
+        )
+
+    @classmethod
+    def create_task(cls, creator, assignees=0, comments=0, **kwargs):
+        """创建任务，附带指定数量的执行人和评论（每条评论一条回复）"""
+        now = timezone.now()
+        task = Task.objects.create(
+            title='测试任务',
+            description='测试任务描述',
+            creator=creator,
+            creator_department=creator.department,
+            start_date=now - timedelta(days=1),
+            due_date=now + timedelta(days=1),
+            **kwargs
+        )
+        for _ in range(assignees):
+            assignee = cls.create_user(creator.department)
+            TaskAssignment.objects.create(
+                task=task, assignee=assignee, assignee_department=assignee.department
+            )
+        for _ in range(comments):
+            comment = TaskComment.objects.create(task=task, author=creator, content='评论')
+            TaskComment.objects.create(task=task, author=creator, content='回复', parent=comment)
+        return task
+
+
+class TaskDetailQueryCountTests(TaskTestMixin, TestCase):
+    """任务详情的查询次数不随执行人和评论数量增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = cls.create_department()
+        cls.admin = cls.create_user(department, role=User.UserRole.ADMIN)
+        cls.small_task = cls.create_task(cls.admin, assignees=1, comments=1)
+        cls.large_task = cls.create_task(cls.admin, assignees=15, comments=40)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def retrieve(self, task):
+        """请求任务详情，返回(响应, 查询次数)"""
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/v1/tasks/tasks/{task.id}/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_query_count_is_constant(self):
+        # 预热请求级以外的缓存，避免首次请求的额外查询影响比较
+        self.retrieve(self.small_task)
+
+        small_response, small_queries = self.retrieve(self.small_task)
+        large_response, large_queries = self.retrieve(self.large_task)
+
+        self.assertEqual(len(small_response.json()['assignments']), 1)
+        self.assertEqual(len(large_response.json()['assignments']), 15)
+        # 评论列表包含回复，每条评论的replies另外列出其回复
+        comments = large_response.json()['comments']
+        self.assertEqual(len(comments), 80)
+        self.assertEqual(sum(len(comment['replies']) for comment in comments), 40)
+        self.assertEqual(large_queries, small_queries)
+
+
+class TaskStatusUpdateQueryTests(TaskTestMixin, TestCase):
+    """只更新状态时不再先查询原记录"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = cls.create_department()
+        cls.manager = cls.create_user(department, role=User.UserRole.DEPT_MANAGER)
+        cls.task = cls.create_task(cls.manager, assignees=2, status=Task.TaskStatus.DRAFT)
+
+    def test_status_only_update_issues_one_update(self):
+        task = Task.objects.get(pk=self.task.pk)
+
+        with CaptureQueriesContext(connection) as context:
+            task.status = Task.TaskStatus.PENDING
+            task.save(update_fields=['status'])
+
+        # 统计计数器信号会查询执行人，这里只检查任务表
+        task_table = connection.ops.quote_name(Task._meta.db_table)
+        task_queries = [query['sql'] for query in context.captured_queries if task_table in query['sql']]
+
+        self.assertEqual(len(task_queries), 1, task_queries)
+        self.assertTrue(task_queries[0].startswith('UPDATE'), task_queries[0])
+        self.assertEqual(task.get_dirty_fields(), {})
+
+
+class TaskDeleteStatsTests(TaskTestMixin, TestCase):
+    """删除任务时执行人统计批量扣减，查询次数不随执行人数量增长"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = cls.create_department()
+        cls.manager = cls.create_user(department, role=User.UserRole.DEPT_MANAGER)
+        cls.small_task = cls.create_task(cls.manager, assignees=1)
+        cls.large_task = cls.create_task(cls.manager, assignees=15)
+        cls.other_task = cls.create_task(cls.manager, assignees=3)
+        cls.kept_task = cls.create_task(cls.manager, assignees=2)
+
+    def counters(self):
+        return set(TaskStatsCounter.objects.exclude(count=0).values_list(
+            'scope_type', 'scope_id', 'status', 'priority', 'count'
+        ))
+
+    def delete(self, task):
+        """删除任务，返回统计计数器表上的查询次数"""
+        with CaptureQueriesContext(connection) as context:
+            Task.objects.get(pk=task.pk).delete()
+        counter_table = connection.ops.quote_name(TaskStatsCounter._meta.db_table)
+        return len([query for query in context.captured_queries if counter_table in query['sql']])
+
+    def test_counters_match_rebuild_after_delete(self):
+        small_queries = self.delete(self.small_task)
+        large_queries = self.delete(self.large_task)
+        self.assertEqual(large_queries, small_queries)
+
+        Task.objects.filter(pk=self.other_task.pk).delete()
+        # 单独删除任务分配仍由任务分配的删除处理扣减
+        self.kept_task.assignments.first().delete()
+        counters = self.counters()
+        self.assertTrue(counters)
+        TaskStatisticsService.rebuild_counters()
+        self.assertEqual(counters, self.counters())
+
+
+class TaskVisibilityQueryPlanTests(TaskTestMixin, TestCase):
+    """非管理员的任务可见性查询走任务分配(assignee, task)索引，执行计划中没有去重临时表"""
+
+    @classmethod
+    def setUpTestData(cls):
+        department = cls.create_department()
+        cls.manager = cls.create_user(department, role=User.UserRole.DEPT_MANAGER)
+        cls.executors = [cls.create_user(department) for _ in range(5)]
+
+        # 数据量过小时数据库可能放弃索引，批量写入一些任务和分配
+        now = timezone.now()
+        tasks = Task.objects.bulk_create([
+            Task(
+                title=f'任务{i}',
+                description='描述',
+                creator=cls.manager,
+                creator_department=department,
+                start_date=now,
+                due_date=now + timedelta(days=1)
+            )
+            for i in range(200)
+        ])
+        TaskAssignment.objects.bulk_create([
+            TaskAssignment(task=task, assignee=executor, assignee_department=department)
+            for i, task in enumerate(tasks)
+            for executor in cls.executors[i % 3:i % 3 + 2]
+        ])
+
+        cls.assignment_index = next(
+            index.name for index in TaskAssignment._meta.indexes if index.fields == ['assignee', 'task']
+        )
+
+    def get_plan(self, queryset):
+        """列表第一页的执行计划，以及SQL中是否含DISTINCT"""
+        queryset = queryset.order_by('-created_at')
+        return queryset[:20].explain(), 'DISTINCT' in str(queryset.query)
+
+    def test_visible_to_uses_assignment_index_without_distinct(self):
+        for user in [self.manager, self.executors[0]]:
+            with self.subTest(role=user.role):
+                plan, uses_distinct = self.get_plan(Task.objects.visible_to(user))
+
+                self.assertFalse(uses_distinct)
+                self.assertIn(self.assignment_index, plan)
+                for marker in DISTINCT_PLAN_MARKERS:
+                    self.assertNotIn(marker, plan)
+
+    def test_legacy_query_is_detected(self):
+        """旧实现（OR连接+DISTINCT）应被上面的检查识别出来"""
+        plan, uses_distinct = self.get_plan(legacy_visible_tasks(self.executors[0]))
+
+        self.assertTrue(uses_distinct or any(marker in plan for marker in DISTINCT_PLAN_MARKERS))
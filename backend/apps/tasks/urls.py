@@ -7,7 +7,7 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     TaskViewSet, TaskAssignmentViewSet, TaskExecutionViewSet,
     TaskReviewViewSet, TaskAttachmentViewSet, TaskCommentViewSet,
-    TaskTemplateViewSet
+    TaskTemplateViewSet, TaskImportJobViewSet
 )
 
 router = DefaultRouter()
@@ -18,6 +18,7 @@ router.register(r'reviews', TaskReviewViewSet)
 router.register(r'attachments', TaskAttachmentViewSet)
 router.register(r'comments', TaskCommentViewSet)
 router.register(r'templates', TaskTemplateViewSet)
+router.register(r'import-jobs', TaskImportJobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
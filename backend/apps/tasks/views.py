@@ -2,24 +2,37 @@
 任务相关视图
 """
 import logging
+from django.db import transaction
 from django.db.models import Q, Count, Avg
+from django.http import FileResponse, StreamingHttpResponse
 from django.utils import timezone
 from rest_framework import status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.viewsets import ModelViewSet
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
 from .models import (
     Task, TaskAssignment, TaskExecution, TaskReview, 
-    TaskAttachment, TaskComment, TaskTemplate
+    TaskAttachment, TaskComment, TaskTemplate, TaskStatsCounter, TaskImportJob
 )
 from .serializers import (
     TaskSerializer, TaskSimpleSerializer, TaskCreateSerializer,
     TaskAssignmentSerializer, TaskExecutionSerializer, TaskReviewSerializer,
-    TaskAttachmentSerializer, TaskCommentSerializer, TaskTemplateSerializer
+    TaskAttachmentSerializer, TaskCommentSerializer, TaskTemplateSerializer,
+    TaskImportJobSerializer
 )
+from .exporters import (
+    ASSIGNMENT_EXPORT_COLUMNS, EXPORT_FORMATS, TASK_EXPORT_COLUMNS,
+    get_export_headers, iter_assignment_rows, iter_task_rows, stream_csv, write_xlsx
+)
+from .importers import ImportFileError
+from .services import (
+    TaskAssignmentService, TaskImportService, TaskStatisticsService, UnknownAssigneeError
+)
+from todo_system.pagination import OptionalKeysetPagination
 from apps.users.permissions import (
     CanCreateTask, IsTaskCreatorOrAssignee, IsTaskAssignee
 )
@@ -40,14 +53,15 @@ class TaskViewSet(ModelViewSet):
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'due_date', 'priority', 'status']
     ordering = ['-created_at']
+    pagination_class = OptionalKeysetPagination
     
     def get_permissions(self):
         """根据操作类型设置权限"""
-        if self.action == 'create':
+        if self.action in ['create', 'bulk_import']:
             permission_classes = [CanCreateTask]
         elif self.action in ['update', 'partial_update', 'destroy']:
             permission_classes = [IsTaskCreatorOrAssignee]
-        elif self.action in ['retrieve', 'list']:
+        elif self.action in ['retrieve', 'list', 'export']:
             permission_classes = [permissions.IsAuthenticated]
         else:
             permission_classes = [IsTaskCreatorOrAssignee]
@@ -64,42 +78,30 @@ class TaskViewSet(ModelViewSet):
     
     def get_queryset(self):
         """根据用户权限过滤查询集"""
-        user = self.request.user
-        
-        if user.is_admin:
-            return Task.objects.all()
-        
-        # 构建查询条件
-        q_objects = Q()
-        
-        # 用户创建的任务
-        q_objects |= Q(creator=user)
-        
-        # 用户被分配的任务
-        q_objects |= Q(assignments__assignee=user)
+        queryset = Task.objects.visible_to(self.request.user)
         
-        # 部门负责人可以看到本部门的任务
-        if user.is_dept_manager and user.department:
-            q_objects |= Q(creator_department=user.department)
+        # 详情接口一次性加载完整关联图，避免逐条查询
+        if self.action == 'retrieve':
+            queryset = queryset.with_detail_relations()
+        elif self.action == 'list':
+            queryset = self.get_list_queryset(queryset)
         
-        return Task.objects.filter(q_objects).distinct()
+        return queryset
+    
+    def get_list_queryset(self, queryset):
+        """列表接口查询集：预加载创建者信息并在SQL中计算进度和逾期标记"""
+        return queryset.select_related('creator', 'creator_department').with_progress()
     
     @action(detail=False, methods=['get'])
     def my_tasks(self, request):
         """获取我的任务"""
         user = request.user
         
-        # 我创建的任务
-        created_tasks = Task.objects.filter(creator=user)
-        
-        # 分配给我的任务
-        assigned_tasks = Task.objects.filter(assignments__assignee=user)
-        
-        # 合并并去重
-        all_tasks = (created_tasks | assigned_tasks).distinct()
+        # 我创建的和分配给我的任务（按索引取ID合并，无需去重）
+        all_tasks = Task.objects.related_to(user)
         
         # 应用过滤和排序
-        filtered_tasks = self.filter_queryset(all_tasks)
+        filtered_tasks = self.filter_queryset(self.get_list_queryset(all_tasks))
         
         page = self.paginate_queryset(filtered_tasks)
         if page is not None:
@@ -114,16 +116,14 @@ class TaskViewSet(ModelViewSet):
         """获取分配给我的任务"""
         user = request.user
         
-        tasks = Task.objects.filter(
-            assignments__assignee=user
-        ).distinct()
-        
         # 根据状态过滤
         status_filter = request.query_params.get('status')
         if status_filter:
-            tasks = tasks.filter(assignments__assignee=user, assignments__status=status_filter)
+            tasks = Task.objects.assigned_to(user, status=status_filter)
+        else:
+            tasks = Task.objects.assigned_to(user)
         
-        filtered_tasks = self.filter_queryset(tasks)
+        filtered_tasks = self.filter_queryset(self.get_list_queryset(tasks))
         
         page = self.paginate_queryset(filtered_tasks)
         if page is not None:
@@ -139,7 +139,7 @@ class TaskViewSet(ModelViewSet):
         user = request.user
         
         tasks = Task.objects.filter(creator=user)
-        filtered_tasks = self.filter_queryset(tasks)
+        filtered_tasks = self.filter_queryset(self.get_list_queryset(tasks))
         
         page = self.paginate_queryset(filtered_tasks)
         if page is not None:
@@ -166,7 +166,7 @@ class TaskViewSet(ModelViewSet):
             ]
         )
         
-        filtered_tasks = self.filter_queryset(overdue_tasks)
+        filtered_tasks = self.filter_queryset(self.get_list_queryset(overdue_tasks))
         
         page = self.paginate_queryset(filtered_tasks)
         if page is not None:
@@ -225,62 +225,106 @@ class TaskViewSet(ModelViewSet):
     def statistics(self, request):
         """获取任务统计信息"""
         user = request.user
-        base_queryset = self.get_queryset()
         
-        # 总任务数
-        total_tasks = base_queryset.count()
-        
-        # 按状态统计
-        status_stats = {}
-        for status_choice in Task.TaskStatus.choices:
-            status_code = status_choice[0]
-            status_name = status_choice[1]
-            count = base_queryset.filter(status=status_code).count()
-            status_stats[status_code] = {
-                'name': status_name,
-                'count': count
-            }
-        
-        # 按优先级统计
-        priority_stats = {}
-        for priority_choice in Task.Priority.choices:
-            priority_code = priority_choice[0]
-            priority_name = priority_choice[1]
-            count = base_queryset.filter(priority=priority_code).count()
-            priority_stats[priority_code] = {
-                'name': priority_name,
-                'count': count
-            }
-        
-        # 逾期任务数
-        overdue_count = base_queryset.filter(
-            due_date__lt=timezone.now(),
-            status__in=[
-                Task.TaskStatus.PENDING,
-                Task.TaskStatus.ACCEPTED,
-                Task.TaskStatus.IN_PROGRESS,
-                Task.TaskStatus.OVERDUE
-            ]
-        ).count()
-        
-        # 我的任务统计
-        my_assigned_tasks = base_queryset.filter(assignments__assignee=user).distinct()
-        my_pending_tasks = my_assigned_tasks.filter(
-            assignments__assignee=user,
-            assignments__status__in=[
-                TaskAssignment.AssignmentStatus.PENDING,
-                TaskAssignment.AssignmentStatus.ACCEPTED,
-                TaskAssignment.AssignmentStatus.IN_PROGRESS
-            ]
-        ).count()
+        if user.is_admin:
+            stats = TaskStatisticsService.get_counter_statistics(
+                TaskStatsCounter.ScopeType.GLOBAL, 0, user
+            )
+        elif user.is_dept_manager and user.department:
+            # 部门负责人可见范围是本部门任务与个人任务的并集，无法由计数器直接得出
+            stats = TaskStatisticsService.get_statistics(self.get_queryset(), user)
+        else:
+            stats = TaskStatisticsService.get_counter_statistics(
+                TaskStatsCounter.ScopeType.USER, user.id, user
+            )
+        
+        return Response(stats)
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        导出任务或任务分配（CSV/XLSX）
+        与列表接口使用相同的权限范围和过滤条件，按创建时间倒序；
+        content=assignments 导出任务分配，export_format=xlsx 导出Excel文件
+        """
+        content = request.query_params.get('content', 'tasks')
+        export_format = request.query_params.get('export_format', 'csv')
+        if content not in ['tasks', 'assignments'] or export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': '导出内容必须为tasks或assignments，格式必须为csv或xlsx'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        tasks = self.filter_queryset(self.get_queryset())
+        if content == 'assignments':
+            headers = get_export_headers(ASSIGNMENT_EXPORT_COLUMNS)
+            rows = iter_assignment_rows(tasks)
+        else:
+            headers = get_export_headers(TASK_EXPORT_COLUMNS)
+            rows = iter_task_rows(tasks)
+        
+        filename = f"{content}_{timezone.localtime().strftime('%Y%m%d%H%M%S')}.{export_format}"
+        if export_format == 'xlsx':
+            try:
+                output = write_xlsx(headers, rows)
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return FileResponse(output, as_attachment=True, filename=filename)
+        
+        response = StreamingHttpResponse(
+            stream_csv(headers, rows),
+            content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser])
+    def bulk_import(self, request):
+        """
+        批量导入任务（CSV/XLSX）
+        文件保存后由后台作业处理，返回导入作业，进度通过导入作业接口查询
+        """
+        uploaded_file = request.FILES.get('file')
+        if not uploaded_file:
+            return Response(
+                {'error': '请上传导入文件'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        return Response({
-            'total_tasks': total_tasks,
-            'status_stats': status_stats,
-            'priority_stats': priority_stats,
-            'overdue_count': overdue_count,
-            'my_pending_tasks': my_pending_tasks
-        })
+        try:
+            chunk_size = int(request.data.get('chunk_size') or 0)
+        except (TypeError, ValueError):
+            return Response(
+                {'error': '每批行数必须为整数'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        publish = str(request.data.get('publish', '')).lower() in ['1', 'true', 'yes']
+        
+        try:
+            job = TaskImportService.create_job(request.user, uploaded_file, chunk_size, publish)
+        except ImportFileError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response(TaskImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class TaskImportJobViewSet(ReadOnlyModelViewSet):
+    """任务导入作业视图集（查询导入进度和错误行）"""
+    queryset = TaskImportJob.objects.all()
+    serializer_class = TaskImportJobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get_queryset(self):
+        """用户只能查看自己的导入作业"""
+        user = self.request.user
+        queryset = TaskImportJob.objects.select_related('creator__department')
+        
+        if user.is_admin:
+            return queryset
+        return queryset.filter(creator=user)
 
 
 class TaskAssignmentViewSet(ModelViewSet):
@@ -643,34 +687,37 @@ class TaskTemplateViewSet(ModelViewSet):
             )
 
         try:
-            # 使用模板创建任务
-            task = template.create_task_from_template(
-                creator=request.user,
-                title=title,
-                description=description,
-                start_date=start_date,
-                due_date=due_date
+            assignee_ids = [int(assignee_id) for assignee_id in assignee_ids]
+        except (TypeError, ValueError):
+            return Response(
+                {'error': '执行人ID必须为整数'},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-            # 创建任务分配
-            from apps.users.models import User
-            for assignee_id in assignee_ids:
-                try:
-                    assignee = User.objects.get(id=assignee_id)
-                    TaskAssignment.objects.create(
-                        task=task,
-                        assignee=assignee,
-                        assignee_department=assignee.department
-                    )
-                except User.DoesNotExist:
-                    continue
-
-            # 返回创建的任务
+        try:
+            # 使用模板创建任务，任务和分配在同一事务中创建
+            with transaction.atomic():
+                task = template.create_task_from_template(
+                    creator=request.user,
+                    title=title,
+                    description=description,
+                    start_date=start_date,
+                    due_date=due_date
+                )
+                TaskAssignmentService.bulk_assign(task, assignee_ids)
+
+            # 返回创建的任务（重新读取以加载关联数据并转换请求中的日期字符串）
+            task = Task.objects.with_detail_relations().get(pk=task.pk)
             task_serializer = TaskSerializer(task)
             return Response(task_serializer.data, status=status.HTTP_201_CREATED)
 
+        except UnknownAssigneeError as e:
+            return Response(
+                {'error': str(e), 'missing_ids': e.missing_ids},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         except Exception as e:
-            logger.error(f"使用模板创建任务失败: {e}")
+            logger.error(f"使用模板创建任务失败: {e}", exc_info=True)
             return Response(
                 {'error': '创建任务失败'},
                 status=status.HTTP_400_BAD_REQUEST
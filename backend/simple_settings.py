@@ -38,6 +38,7 @@ LOCAL_APPS = [
     'apps.tasks',
     'apps.notifications',
     'apps.integrations',
+    'apps.reports',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
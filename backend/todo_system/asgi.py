@@ -13,4 +13,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_system.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# 通知推送流是长连接，直接由ASGI应用处理，其余请求交给Django
+from apps.notifications.stream import STREAM_PATH, notification_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        return await notification_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -0,0 +1,159 @@
+"""
+分页配置
+默认使用页码分页，可按请求参数或视图设置切换为按(created_at, id)的键集分页
+键集分页固定按创建时间倒序，不能与其他ordering排序同时使用
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    键集分页
+    按(created_at, id)倒序取下一页，每页代价与翻页深度无关，不统计总数，适用于无限滚动列表
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = '无效的游标'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by('-created_at', '-pk')
+        position = self.decode_cursor(request, queryset)
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+            )
+
+        # 多取一条用于判断是否还有下一页
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        last = results[-1] if results else None
+        self.next_cursor = self.encode_cursor(last.created_at, last.pk) if self.has_next else None
+        return results
+
+    def get_page_size(self, request):
+        """获取每页数量"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def encode_cursor(self, created_at, pk):
+        """将位置编码为游标字符串"""
+        data = json.dumps({'c': created_at.isoformat(), 'i': str(pk)})
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, request, queryset):
+        """解析请求中的游标，未提供时返回None；主键按查询集模型的主键类型校验"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            created_at = parse_datetime(data['c'])
+            pk = queryset.model._meta.pk.to_python(data['i'])
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class OptionalKeysetPagination(PageNumberPagination):
+    """
+    可选键集分页
+    默认与全局页码分页一致；请求带 pagination=cursor 或 cursor 参数，
+    或视图设置 pagination_mode = 'cursor' 时改用键集分页
+
+    键集分页只支持按创建时间倒序（ordering为空或-created_at）：
+    请求显式要求键集分页又指定了其他ordering时返回400；
+    仅由视图默认启用键集分页时，其他ordering改用页码分页
+    """
+    mode_query_param = 'pagination'
+    ordering_query_param = api_settings.ORDERING_PARAM
+    keyset_orderings = ('-created_at',)
+    keyset_class = KeysetPagination
+    ordering_conflict_message = '键集分页只支持按创建时间倒序排列，不能与该排序同时使用'
+
+    def use_keyset(self, request, view):
+        """判断本次请求是否使用键集分页"""
+        ordering = request.query_params.get(self.ordering_query_param)
+        compatible = not ordering or ordering in self.keyset_orderings
+
+        requested = (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+        if requested:
+            if not compatible:
+                raise ValidationError({self.ordering_query_param: [self.ordering_conflict_message]})
+            return True
+
+        mode = request.query_params.get(self.mode_query_param) or getattr(view, 'pagination_mode', 'page')
+        return mode == 'cursor' and compatible
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request, view):
+            self.keyset_paginator = self.keyset_class()
+            return self.keyset_paginator.paginate_queryset(queryset, request, view)
+
+        self.keyset_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset_paginator is not None:
+            return None
+        return super().get_previous_link()
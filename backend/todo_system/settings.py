@@ -46,6 +46,7 @@ LOCAL_APPS = [
     'apps.tasks',
     'apps.notifications',
     'apps.integrations',
+    'apps.reports',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -115,6 +116,15 @@ else:
 # Redis配置
 REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/0')
 
+# 缓存配置（多进程共享，部门树等缓存通过版本号失效）
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_URL', default=REDIS_URL),
+        'KEY_PREFIX': 'todo_system',
+    }
+}
+
 # Celery配置
 CELERY_BROKER_URL = REDIS_URL
 CELERY_RESULT_BACKEND = REDIS_URL
@@ -122,6 +132,38 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Shanghai'
+CELERY_BEAT_SCHEDULE = {
+    # 每分钟补发通知发件箱中未及时分发的事件
+    'dispatch-notification-outbox': {
+        'task': 'apps.notifications.tasks.dispatch_notification_outbox',
+        'schedule': 60.0,
+    },
+    # 每5分钟增量刷新任务日汇总表
+    'refresh-task-rollups': {
+        'task': 'apps.reports.tasks.refresh_task_rollups',
+        'schedule': 300.0,
+    },
+    # 每5分钟标记逾期任务
+    'mark-overdue-tasks': {
+        'task': 'apps.tasks.tasks.mark_overdue_tasks',
+        'schedule': 300.0,
+    },
+    # 每10分钟从数据库校准未读通知数和通知统计缓存
+    'reconcile-unread-counts': {
+        'task': 'apps.notifications.tasks.reconcile_unread_counts',
+        'schedule': 600.0,
+    },
+    # 每分钟合并发送未及时发送的石化通排队消息（启用异步发送器时只回收认领超时的消息）
+    'flush-shihuatong-queue': {
+        'task': 'apps.integrations.tasks.flush_shihuatong_queue',
+        'schedule': 60.0,
+    },
+    # 每分钟将累加的石化通发送统计写回数据库
+    'flush-integration-stats': {
+        'task': 'apps.integrations.tasks.flush_integration_stats',
+        'schedule': 60.0,
+    },
+}
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -217,6 +259,24 @@ SHIHUATONG_CONFIG = {
     'AES_IV': config('SHT_AES_IV', default=''),
     'APP_KEY': config('SHT_APP_KEY', default=''),
     'APP_SECRET': config('SHT_APP_SECRET', default=''),
+    # Webhook请求的连接超时和读取超时（秒）
+    'CONNECT_TIMEOUT': config('SHT_CONNECT_TIMEOUT', default=5, cast=float),
+    'READ_TIMEOUT': config('SHT_READ_TIMEOUT', default=15, cast=float),
+    # 每个进程保持的长连接数，不小于Celery单进程内的并发线程数
+    'POOL_MAXSIZE': config('SHT_POOL_MAXSIZE', default=10, cast=int),
+    # 连接失败或连接被重置时的重试次数
+    'MAX_RETRIES': config('SHT_MAX_RETRIES', default=2, cast=int),
+    # 合并窗口（秒），窗口内发往同一Hook Token的相同消息合并为一次Webhook调用
+    'BATCH_WINDOW': config('SHT_BATCH_WINDOW', default=2, cast=float),
+    # 一次Webhook调用最多提醒的接收者数量
+    'BATCH_MAX_RECIPIENTS': config('SHT_BATCH_MAX_RECIPIENTS', default=100, cast=int),
+    # 认领超时（秒），认领后超过该时间仍在发送中的消息由定时任务重新排队
+    'CLAIM_TIMEOUT': config('SHT_CLAIM_TIMEOUT', default=300, cast=float),
+    # 由异步发送器（run_shihuatong_sender）发送排队消息时开启，合并窗口结束后不再安排Celery发送任务
+    'ASYNC_SENDER': config('SHT_ASYNC_SENDER', default=False, cast=bool),
+    # 异步发送器的最大在途调用数，以及每个集成配置每秒最多的Webhook调用数
+    'SENDER_CONCURRENCY': config('SHT_SENDER_CONCURRENCY', default=50, cast=int),
+    'SENDER_RATE_LIMIT': config('SHT_SENDER_RATE_LIMIT', default=20, cast=float),
 }
 
 # 日志配置
@@ -23,6 +23,7 @@ def api_info(request):
             'tasks': '/api/v1/tasks/',
             'notifications': '/api/v1/notifications/',
             'integrations': '/api/v1/integrations/',
+            'reports': '/api/v1/reports/',
         },
         'frontend_url': 'http://127.0.0.1:5173/',
         'note': '这是后端API服务，请访问前端界面: http://127.0.0.1:5173/'
@@ -46,6 +47,7 @@ urlpatterns = [
     path('api/v1/tasks/', include('apps.tasks.urls')),
     path('api/v1/notifications/', include('apps.notifications.urls')),
     path('api/v1/integrations/', include('apps.integrations.urls')),
+    path('api/v1/reports/', include('apps.reports.urls')),
 ]
 
 # 开发环境下提供媒体文件服务
@@ -1,4 +1,5 @@
 import { request } from '@/utils/request'
+import { getToken } from '@/utils/auth'
 
 // 通知相关API
 
@@ -76,6 +77,27 @@ export function getUnreadCount() {
   return request.get('/v1/notifications/unread_count/')
 }
 
+/**
+ * 打开通知推送流（Server-Sent Events），替代轮询未读数量
+ * 重连时服务端会重新发送当前未读数量；令牌在打开时写入URL，非200响应（如令牌过期）浏览器不会重试，
+ * 调用方应在error事件中关闭并重新打开
+ * @param {object} handlers 事件处理函数，键为事件名称
+ * @param {function} handlers.notification 新通知
+ * @param {function} handlers.unread_count 未读数量变化 { delta, unread_count }
+ * @param {function} handlers.resync 推送中断过，需要重新获取数据
+ * @returns {EventSource}
+ */
+export function openNotificationStream(handlers = {}) {
+  const baseURL = import.meta.env.VITE_PUSH_BASE_URL || import.meta.env.VITE_API_BASE_URL || '/api'
+  const source = new EventSource(
+    `${baseURL}/v1/notifications/stream/?token=${encodeURIComponent(getToken() || '')}`
+  )
+  Object.entries(handlers).forEach(([event, handler]) => {
+    source.addEventListener(event, (e) => handler(JSON.parse(e.data)))
+  })
+  return source
+}
+
 /**
  * 获取通知统计信息
  * @returns {Promise}
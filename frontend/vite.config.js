@@ -42,6 +42,11 @@ export default defineConfig({
       honorCipherOrder: true
     },
     proxy: {
+      // 通知推送流由ASGI推送服务处理
+      '/api/v1/notifications/stream': {
+        target: 'http://127.0.0.1:8001',
+        changeOrigin: true
+      },
       '/api': {
         target: 'http://127.0.0.1:8000', // 开发环境使用HTTP连接Django
         changeOrigin: true,